@@ -59,6 +59,7 @@ classes = (
     collider_tools.VMDL_OT_toggle_collider_shading,
     mountpoint_tools.VMDL_OT_create_mountpoint,
     export_vmdl.VMDL_OT_export_vmdl,
+    export_vmdl.VMDL_OT_export_vmdl_batch,
     import_vmdl.VMDL_OT_import_vmdl,
     texture_utils.VMDL_OT_extract_textures,
 
@@ -0,0 +1,85 @@
+"""
+Benchmark kompresních politik .vmdl archivů (nepotřebuje Blender).
+
+Každý zadaný archiv se přebalí všemi politikami z vmdl_archive.COMPRESSION_PRESETS
+a pro každou se změří velikost, čas zabalení a čas rozbalení všech členů.
+
+    python benchmarks/bench_compression.py assets/*.vmdl --repeat 3 --json vysledky.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vmdl_archive import COMPRESSION_PRESETS, VmdlArchiveWriter  # noqa: E402
+
+
+def pack(members, dst, policy):
+    start = time.perf_counter()
+    with VmdlArchiveWriter(dst, policy) as archive:
+        for name, path in members:
+            archive.write_file(name, path)
+    return time.perf_counter() - start
+
+
+def unpack(path):
+    start = time.perf_counter()
+    with zipfile.ZipFile(path) as zf:
+        for zinfo in zf.infolist():
+            with zf.open(zinfo) as f:
+                while f.read(1024 * 1024):
+                    pass
+    return time.perf_counter() - start
+
+
+def bench_archive(src, repeat):
+    results = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        # Členy rozbalíme jednou předem, aby se do času balení nepočítalo čtení zdroje
+        with zipfile.ZipFile(src) as zf:
+            members = [(zinfo.filename, zf.extract(zinfo, os.path.join(tempdir, "src")))
+                       for zinfo in zf.infolist() if not zinfo.is_dir()]
+        raw_size = sum(os.path.getsize(path) for _, path in members)
+        for policy_name, policy in COMPRESSION_PRESETS.items():
+            dst = os.path.join(tempdir, policy_name + ".vmdl")
+            pack_time = min(pack(members, dst, policy) for _ in range(repeat))
+            unpack_time = min(unpack(dst) for _ in range(repeat))
+            results.append({
+                'archive': src,
+                'policy': policy_name,
+                'raw_bytes': raw_size,
+                'archive_bytes': os.path.getsize(dst),
+                'pack_s': round(pack_time, 4),
+                'unpack_s': round(unpack_time, 4),
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archives", nargs='+', help="Cesty k .vmdl archivům")
+    parser.add_argument("--repeat", type=int, default=3, help="Počet opakování, bere se nejlepší čas")
+    parser.add_argument("--json", dest="json_path", help="Uloží výsledky jako JSON")
+    args = parser.parse_args(argv)
+
+    all_results = []
+    for src in args.archives:
+        print(f"\n{src}")
+        print(f"  {'politika':<14} {'velikost MB':>12} {'poměr':>7} {'balení s':>10} {'rozbalení s':>12}")
+        for r in bench_archive(src, args.repeat):
+            ratio = r['archive_bytes'] / r['raw_bytes'] if r['raw_bytes'] else 0.0
+            print(f"  {r['policy']:<14} {r['archive_bytes'] / 1048576:12.2f} {ratio:7.3f} {r['pack_s']:10.3f} {r['unpack_s']:12.3f}")
+            all_results.append(r)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(all_results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
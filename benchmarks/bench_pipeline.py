@@ -0,0 +1,240 @@
+"""
+Benchmark exportu, importu a vertex color operátorů na syntetických scénách
+(spouští se v Blenderu bez UI).
+
+Pro každou kombinaci parametrů se postaví VMDL hierarchie se stejnou strukturou,
+jakou vytváří VMDL_OT_create_vmdl_object (ROOT Empty, '.model' meshe s vrstvami
+Color1/Color2, '.col' collider), M materiálů pro každý shader ze SHADER_DEFINITIONS
+a K textur zadaného rozlišení. Měří se fáze exportu (bez cache i s teplou build
+cache), fáze importu a vertex color operátory. Výsledky jdou do JSON souboru,
+aby se daly porovnat mezi verzemi.
+
+    blender -b --factory-startup -P benchmarks/bench_pipeline.py -- \\
+        --meshes 1,8 --materials 1,4 --textures 0,8 --resolutions 512,2048 \\
+        --loops 10000,200000 --repeat 3 --json vysledky.json
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import bmesh
+import bpy
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vmdl_cli  # noqa: E402
+
+VERTEX_COLOR_OPERATORS = [
+    ('fill_vertex_color', 'OBJECT', lambda: bpy.ops.vmdl.fill_vertex_color()),
+    ('set_default_vertex_colors', 'OBJECT', lambda: bpy.ops.vmdl.set_default_vertex_colors()),
+    ('apply_global_vertex_data', 'OBJECT', lambda: bpy.ops.vmdl.apply_global_vertex_data()),
+    ('apply_tint_to_object', 'OBJECT', lambda: bpy.ops.vmdl.apply_tint_to_object(tint_value=0.5)),
+    ('set_selection_vertex_color', 'EDIT', lambda: bpy.ops.vmdl.set_selection_vertex_color()),
+]
+
+
+def int_list(text):
+    return [int(value) for value in text.split(",") if value]
+
+
+DATA_COLLECTIONS = ('objects', 'meshes', 'materials', 'images')
+
+
+def clear_scene():
+    for name in DATA_COLLECTIONS:
+        bpy.data.batch_remove(list(getattr(bpy.data, name)))
+
+
+def snapshot_data():
+    return {name: set(getattr(bpy.data, name)) for name in DATA_COLLECTIONS}
+
+
+def remove_new_data(snapshot):
+    """Odstraní datablocky vzniklé po snapshot_data() (např. z importu)."""
+    bpy.data.batch_remove([item for name in DATA_COLLECTIONS
+                           for item in getattr(bpy.data, name) if item not in snapshot[name]])
+
+
+def make_grid_mesh(name, loop_count):
+    """Mřížka čtyřúhelníků s přibližně loop_count loopy."""
+    segments = max(1, math.ceil(math.sqrt(loop_count / 4)))
+    mesh = bpy.data.meshes.new(name)
+    bm = bmesh.new()
+    bmesh.ops.create_grid(bm, x_segments=segments, y_segments=segments, size=1.0)
+    bm.to_mesh(mesh)
+    bm.free()
+    return mesh
+
+
+def make_texture(name, resolution, directory):
+    """Obrázek uložený jako PNG na disk, jako běžná textura odkazující na soubor."""
+    image = bpy.data.images.new(name, resolution, resolution, alpha=True)
+    rng = np.random.default_rng(len(name) * resolution)
+    gradient = np.linspace(0.0, 1.0, resolution, dtype=np.float32)
+    pixels = np.empty((resolution, resolution, 4), dtype=np.float32)
+    pixels[..., 0] = gradient[None, :]
+    pixels[..., 1] = gradient[:, None]
+    pixels[..., 2] = rng.random((resolution, resolution), dtype=np.float32) * 0.25
+    pixels[..., 3] = 1.0
+    image.pixels.foreach_set(pixels.ravel())
+    image.filepath_raw = os.path.join(directory, name + ".png")
+    image.file_format = 'PNG'
+    image.save()
+    return image
+
+
+def build_scene(addon, context, meshes, materials_per_shader, textures, resolution, loops, directory):
+    """Postaví jednu VMDL hierarchii a vrátí její ROOT."""
+    clear_scene()
+    collection = context.scene.collection
+    root = bpy.data.objects.new("Bench_VMDL", None)
+    collection.objects.link(root)
+    root.vmdl_enum_type = "ROOT"
+
+    materials = []
+    for shader_name in sorted(addon.shader_definitions.SHADER_DEFINITIONS):
+        for index in range(materials_per_shader):
+            mat = bpy.data.materials.new(f"M_{shader_name.split('.')[0]}_{index}")
+            mat.use_nodes = True
+            mat.vmdl_shader.shader_name = shader_name
+            # Časovač z update_shader_name v režimu bez UI neproběhne
+            addon.shader_materials.delayed_shader_update(mat.vmdl_shader, context)
+            materials.append(mat)
+
+    images = [make_texture(f"bench_tex_{index}", resolution, directory) for index in range(textures)]
+    if images:
+        slots = [slot for mat in materials for slot in mat.vmdl_shader.textures]
+        for index, slot in enumerate(slots):
+            slot.image = images[index % len(images)]
+
+    models = []
+    for index in range(meshes):
+        obj = bpy.data.objects.new(f"Bench{index}.model", make_grid_mesh(f"Bench{index}", loops // meshes))
+        collection.objects.link(obj)
+        obj.parent = root
+        obj.vmdl_enum_type = "MESH"
+        mesh = obj.data
+        own_materials = materials[index::meshes] or materials[:1]
+        for mat in own_materials:
+            mesh.materials.append(mat)
+        mesh.polygons.foreach_set('material_index', np.arange(len(mesh.polygons), dtype=np.int32) % len(own_materials))
+        models.append(obj)
+
+    col = models[0].copy()
+    col.data = models[0].data.copy()
+    col.name = "Bench.col"
+    collection.objects.link(col)
+    col.parent = root
+    col.vmdl_enum_type = "COLLIDER"
+
+    for obj in models + [col]:
+        for layer_name in ("Color1", "Color2"):
+            if layer_name not in obj.data.vertex_colors:
+                obj.data.vertex_colors.new(name=layer_name)
+    return root, models
+
+
+def time_vertex_color_operators(context, models):
+    timings = {}
+    for name, mode, run in VERTEX_COLOR_OPERATORS:
+        elapsed = 0.0
+        for obj in models:
+            with context.temp_override(active_object=obj, object=obj, selected_objects=[obj]):
+                context.view_layer.objects.active = obj
+                bpy.ops.object.mode_set(mode=mode)
+                if mode == 'EDIT':
+                    bpy.ops.mesh.select_all(action='SELECT')
+                start = time.perf_counter()
+                run()
+                elapsed += time.perf_counter() - start
+                bpy.ops.object.mode_set(mode='OBJECT')
+        timings[name] = round(elapsed, 6)
+    return timings
+
+
+def run_case(addon, context, params, repeat, directory):
+    root, models = build_scene(addon, context, directory=directory, **params)
+    export_vmdl = addon.export_vmdl
+    settings = context.scene.vmdl_export
+    settings.cache_dir = os.path.join(directory, "cache")
+    archive_path = os.path.join(directory, "bench.vmdl")
+    runs = []
+    for _ in range(repeat):
+        run = {}
+        settings.use_build_cache = False
+        run['export'] = export_vmdl.export_root(context, root, archive_path)
+        settings.use_build_cache = True
+        export_vmdl.export_root(context, root, archive_path)
+        run['export_warm_cache'] = export_vmdl.export_root(context, root, archive_path)
+        run['vertex_color'] = time_vertex_color_operators(context, models)
+        snapshot = snapshot_data()
+        run['import'] = addon.import_vmdl.import_archive(context, archive_path, deferred=False)
+        remove_new_data(snapshot)
+        runs.append(run)
+
+    def summary(key):
+        elapsed = [run[key]['elapsed'] for run in runs]
+        phases = {name: round(statistics.median(run[key]['phases'].get(name, 0.0) for run in runs), 6)
+                  for name in runs[0][key]['phases']}
+        return {'median_s': round(statistics.median(elapsed), 6), 'min_s': round(min(elapsed), 6), 'phases': phases}
+
+    loop_count = sum(len(obj.data.loops) for obj in models)
+    return {
+        'params': params,
+        'actual_loops': loop_count,
+        'archive_bytes': os.path.getsize(archive_path),
+        'export': summary('export'),
+        'export_warm_cache': summary('export_warm_cache'),
+        'import': summary('import'),
+        'vertex_color': {name: round(statistics.median(run['vertex_color'][name] for run in runs), 6)
+                         for name in runs[0]['vertex_color']},
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="blender -b --factory-startup -P benchmarks/bench_pipeline.py --",
+                                     description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meshes", type=int_list, default=[1, 8], help="počty '.model' meshů (N)")
+    parser.add_argument("--materials", type=int_list, default=[1], help="materiálů na každý shader (M)")
+    parser.add_argument("--textures", type=int_list, default=[0, 8], help="počty textur (K)")
+    parser.add_argument("--resolutions", type=int_list, default=[1024], help="rozlišení textur")
+    parser.add_argument("--loops", type=int_list, default=[20000, 200000], help="celkový počet loopů")
+    parser.add_argument("--repeat", type=int, default=3, help="počet opakování, ukládá se medián")
+    parser.add_argument("--json", dest="json_path", help="uloží výsledky jako JSON")
+    args = parser.parse_args(vmdl_cli.script_args(argv))
+
+    addon = vmdl_cli.load_addon()
+    context = bpy.context
+    cases = []
+    for meshes, materials, textures, resolution, loops in itertools.product(
+            args.meshes, args.materials, args.textures, args.resolutions, args.loops):
+        params = {'meshes': meshes, 'materials_per_shader': materials, 'textures': textures,
+                  'resolution': resolution, 'loops': loops}
+        with tempfile.TemporaryDirectory(prefix="vmdl_bench_") as directory:
+            result = run_case(addon, context, params, args.repeat, directory)
+        cases.append(result)
+        print(f"N={meshes:<3} M={materials:<2} K={textures:<3} {resolution:>5}px {result['actual_loops']:>8} loopů   "
+              f"export {result['export']['median_s']:7.3f} s   s cache {result['export_warm_cache']['median_s']:7.3f} s   "
+              f"import {result['import']['median_s']:7.3f} s")
+
+    results = {
+        'blender': bpy.app.version_string,
+        'addon_version': ".".join(str(v) for v in addon.bl_info['version']),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'repeat': args.repeat,
+        'cases': cases,
+    }
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,153 @@
+"""
+Benchmark vertex color operací: původní zápis loop po loopu proti
+vertex_color_engine (foreach_get/foreach_set a NumPy). Spouští se v Blenderu bez UI.
+
+Pro každý počet loopů se na mřížce s vrstvami Color1/Color2 změří čtyři operace
+(tint, globální hodnoty, vyplnění vrstvy, výchozí barvy) oběma způsoby
+a ověří se, že výsledky jsou stejné.
+
+    blender -b --factory-startup -P benchmarks/bench_vertex_colors.py -- \\
+        --loops 10000,200000,2000000 --repeat 3 --json vysledky.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import bpy
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vmdl_cli  # noqa: E402
+from bench_pipeline import int_list, make_grid_mesh  # noqa: E402
+
+DEFAULT_COLOR_1 = (0.0, 0.8, 1.0, 1.0)
+DEFAULT_COLOR_2 = (0.0, 0.0, 0.0, 1.0)
+
+
+def legacy_tint(mesh, tint):
+    for loop_color in mesh.vertex_colors['Color1'].data:
+        color = loop_color.color
+        loop_color.color = (tint, color[1], color[2], color[3])
+    mesh.update()
+
+
+def legacy_global(mesh, roughness, normal):
+    for loop_color in mesh.vertex_colors['Color1'].data:
+        color = loop_color.color
+        loop_color.color = (color[0], roughness, normal, color[3])
+    mesh.update()
+
+
+def legacy_fill(mesh, color):
+    layer = mesh.vertex_colors['Color2']
+    for loop in mesh.loops: layer.data[loop.index].color = color
+    mesh.update()
+
+
+def legacy_defaults(mesh):
+    for name, color in (('Color1', DEFAULT_COLOR_1), ('Color2', DEFAULT_COLOR_2)):
+        layer = mesh.vertex_colors[name]
+        for loop in mesh.loops: layer.data[loop.index].color = color
+    mesh.update()
+
+
+def engine_operations(engine):
+    mask = engine.channel_mask
+
+    def tint(mesh, value):
+        engine.set_layer_channels(mesh, 'Color1', (value, 0, 0, 0), mask(g=False, b=False, a=False))
+
+    def global_values(mesh, roughness, normal):
+        engine.set_layer_channels(mesh, 'Color1', (0, roughness, normal, 0), mask(r=False, a=False))
+
+    def fill(mesh, color):
+        engine.set_layer_channels(mesh, 'Color2', color)
+
+    def defaults(mesh):
+        colors = engine.VertexColorBuffer(mesh)
+        colors.set_channels('Color1', DEFAULT_COLOR_1)
+        colors.set_channels('Color2', DEFAULT_COLOR_2)
+        colors.flush()
+
+    return {
+        'tint': lambda mesh: tint(mesh, 0.5),
+        'global_values': lambda mesh: global_values(mesh, 0.3, 0.7),
+        'fill': lambda mesh: fill(mesh, (0.1, 0.2, 0.3, 1.0)),
+        'defaults': defaults,
+    }
+
+
+LEGACY_OPERATIONS = {
+    'tint': lambda mesh: legacy_tint(mesh, 0.5),
+    'global_values': lambda mesh: legacy_global(mesh, 0.3, 0.7),
+    'fill': lambda mesh: legacy_fill(mesh, (0.1, 0.2, 0.3, 1.0)),
+    'defaults': legacy_defaults,
+}
+
+
+def layer_values(mesh):
+    values = []
+    for name in ('Color1', 'Color2'):
+        data = np.empty(len(mesh.loops) * 4, dtype=np.float32)
+        mesh.vertex_colors[name].data.foreach_get('color', data)
+        values.append(data)
+    return values
+
+
+def make_mesh(loops):
+    mesh = make_grid_mesh("BenchVC", loops)
+    rng = np.random.default_rng(loops)
+    for name in ('Color1', 'Color2'):
+        layer = mesh.vertex_colors.new(name=name)
+        layer.data.foreach_set('color', rng.random(len(mesh.loops) * 4, dtype=np.float32))
+    return mesh
+
+
+def time_operation(operation, loops, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        mesh = make_mesh(loops)
+        start = time.perf_counter()
+        operation(mesh)
+        timings.append(time.perf_counter() - start)
+        result = layer_values(mesh)
+        bpy.data.meshes.remove(mesh)
+    return statistics.median(timings), result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="blender -b --factory-startup -P benchmarks/bench_vertex_colors.py --",
+                                     description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loops", type=int_list, default=[10000, 200000, 2000000], help="počty loopů")
+    parser.add_argument("--repeat", type=int, default=3, help="počet opakování, ukládá se medián")
+    parser.add_argument("--json", dest="json_path", help="uloží výsledky jako JSON")
+    args = parser.parse_args(vmdl_cli.script_args(argv))
+
+    addon = vmdl_cli.load_addon()
+    engine_ops = engine_operations(addon.vertex_color_engine)
+    cases = []
+    for loops in args.loops:
+        for name, legacy in LEGACY_OPERATIONS.items():
+            legacy_s, legacy_result = time_operation(legacy, loops, args.repeat)
+            engine_s, engine_result = time_operation(engine_ops[name], loops, args.repeat)
+            # Barevné vrstvy jsou 8bitové, výsledky se mohou lišit nejvýš o zaokrouhlení
+            same = all(np.allclose(a, b, atol=1 / 255) for a, b in zip(legacy_result, engine_result))
+            cases.append({'loops': loops, 'operation': name, 'legacy_s': round(legacy_s, 6),
+                          'engine_s': round(engine_s, 6), 'speedup': round(legacy_s / max(engine_s, 1e-9), 1),
+                          'same_result': same})
+            print(f"{loops:>9} loopů  {name:<14} po loopech {legacy_s:8.3f} s   NumPy {engine_s:8.4f} s   "
+                  f"{legacy_s / max(engine_s, 1e-9):7.1f}x{'' if same else '   ROZDÍLNÝ VÝSLEDEK'}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'blender': bpy.app.version_string, 'repeat': args.repeat, 'cases': cases}, f, indent=2)
+    return 0 if all(case['same_result'] for case in cases) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
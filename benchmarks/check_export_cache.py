@@ -0,0 +1,74 @@
+"""
+Kontrola build cache při změně kompresní politiky (spouští se v Blenderu bez UI).
+
+Syntetická scéna se exportuje nejdřív s politikou BALANCED (GLB se uloží do cache
+jako DEFLATE), pak s teplou cache postupně dalšími politikami, každou dvakrát
+(druhý export musí GLB vzít z cache). U každého exportu
+se ověří, že model.glb má metodu komprese podle aktuální politiky a že u MMAP
+začínají data nekomprimovaných členů na násobku 4 KiB.
+
+    blender -b --factory-startup -P benchmarks/check_export_cache.py
+"""
+import os
+import sys
+import tempfile
+import zipfile
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vmdl_cli  # noqa: E402
+from bench_pipeline import build_scene  # noqa: E402
+from vmdl_archive import COMPRESSION_PRESETS, GLB_NAME, VmdlArchive, member_data_offset  # noqa: E402
+
+POLICIES = ('BALANCED', 'MMAP', 'FASTEST_LOAD', 'SMALLEST', 'LEGACY', 'BALANCED')
+
+
+def check_archive(path, policy_name):
+    """Vrací seznam nesrovnalostí mezi archivem a politikou."""
+    problems = []
+    policy = COMPRESSION_PRESETS[policy_name]
+    with VmdlArchive(path) as archive, open(path, 'rb') as fp:
+        zinfo = archive.info(GLB_NAME)
+        expected = policy.for_member(GLB_NAME)[0]
+        if zinfo.compress_type != expected:
+            problems.append(f"{policy_name}: {GLB_NAME} má metodu {zinfo.compress_type}, čeká se {expected}.")
+        for zinfo in archive.infolist():
+            offset = member_data_offset(fp, zinfo)
+            if policy.alignment and zinfo.compress_type == zipfile.ZIP_STORED and offset % policy.alignment:
+                problems.append(f"{policy_name}: data '{zinfo.filename}' na pozici {offset} nejsou zarovnaná.")
+        problems += [f"{policy_name}: {problem}" for problem in archive.verify_mapped()]
+    return problems
+
+
+def main(argv):
+    vmdl_cli.script_args(argv)
+    addon = vmdl_cli.load_addon()
+    context = bpy.context
+    problems = []
+    with tempfile.TemporaryDirectory(prefix="vmdl_cache_check_") as directory:
+        root, _ = build_scene(addon, context, meshes=2, materials_per_shader=1, textures=2,
+                              resolution=64, loops=2000, directory=directory)
+        settings = context.scene.vmdl_export
+        settings.use_build_cache = True
+        settings.cache_dir = os.path.join(directory, "cache")
+        archive_path = os.path.join(directory, "check.vmdl")
+        for policy_name in POLICIES:
+            settings.compression_policy = policy_name
+            # Každá politika dvakrát: po přepnutí (cache z předchozí politiky) a s vlastní teplou cache
+            for attempt in range(2):
+                stats = addon.export_vmdl.export_root(context, root, archive_path)
+                found = check_archive(archive_path, policy_name)
+                if attempt and not stats['glb_reused']:
+                    found.append(f"{policy_name}: opakovaný export nevzal GLB z cache.")
+                print(f"{policy_name:<13} GLB z cache {'ano' if stats['glb_reused'] else 'ne '}   "
+                      f"{'OK' if not found else 'CHYBA'}")
+                problems += found
+    for problem in problems:
+        print(f"  {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
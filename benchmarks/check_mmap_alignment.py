@@ -0,0 +1,118 @@
+"""
+Kontrola archivů zarovnaných pro mmap (nepotřebuje Blender).
+
+Zapíše syntetický archiv s politikou MMAP všemi cestami zápisu (soubor, data
+z paměti, JSON, připravený člen), znovu ho otevře a u každého nekomprimovaného
+členu ověří, že jeho data začínají na násobku 4 KiB a VmdlArchive.verify_mapped()
+nehlásí chyby. Totéž po přepsání jen metadat (copy_members_raw a archive_policy,
+jako export_vmdl.update_archive_metadata), i když je zvolená jiná politika.
+Přepsání archivu BALANCED s politikou MMAP nesmí do manifestu dostat zarovnání.
+
+    python benchmarks/check_mmap_alignment.py
+"""
+import os
+import sys
+import tempfile
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vmdl_archive import (  # noqa: E402
+    COMPRESSION_PRESETS, GLB_NAME, METADATA_NAME, PAGE_ALIGNMENT, TEXTURE_DIR,
+    VmdlArchive, VmdlArchiveWriter, archive_policy, member_data_offset, prepare_member, verify_archive,
+)
+
+
+def write_sources(directory):
+    """Zdrojové soubory různých délek, aby se výplň před každým členem lišila."""
+    paths = {}
+    for name, size in ((GLB_NAME, 12345), ("a.png", 5000), ("texture_with_long_name.tga", 70001)):
+        path = os.path.join(directory, name)
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+        paths[name] = path
+    return paths
+
+
+def write_archive(path, sources, policy):
+    metadata = {'vmdl_version': 3.0, 'materials': {}, 'textures': {}, 'objects': {}}
+    with VmdlArchiveWriter(path, policy) as archive:
+        archive.write_file(GLB_NAME, sources[GLB_NAME])
+        member = prepare_member(None, sources["a.png"], *policy.for_extension(".png"))
+        member.name = TEXTURE_DIR + member.digest + ".png"
+        archive.write_prepared(member)
+        with open(sources["texture_with_long_name.tga"], 'rb') as f:
+            archive.write_bytes(TEXTURE_DIR + "b.tga", f.read())
+        archive.write_json(METADATA_NAME, metadata)
+        archive.write_manifest()
+
+
+def rewrite_metadata(path, preferred):
+    with VmdlArchive(path) as archive:
+        metadata = archive.metadata
+    metadata['objects']['Root'] = {'vmdl_type': 'ROOT'}
+    with zipfile.ZipFile(path) as zf:
+        policy = archive_policy(zf, preferred)
+    with VmdlArchiveWriter(path, policy) as archive:
+        archive.copy_members_raw(path, skip={METADATA_NAME})
+        archive.write_json(METADATA_NAME, metadata)
+        archive.write_manifest()
+
+
+def alignment_problems(path):
+    problems = []
+    with VmdlArchive(path) as archive, open(path, 'rb') as fp:
+        for zinfo in archive.infolist():
+            offset = member_data_offset(fp, zinfo)
+            if zinfo.compress_type == zipfile.ZIP_STORED and offset % PAGE_ALIGNMENT:
+                problems.append(f"'{zinfo.filename}': data na pozici {offset} nejsou zarovnaná na {PAGE_ALIGNMENT} B.")
+            elif zinfo.compress_type != zipfile.ZIP_STORED:
+                problems.append(f"'{zinfo.filename}': člen je komprimovaný.")
+        problems += archive.verify_mapped()
+        if archive.alignment != PAGE_ALIGNMENT:
+            problems.append(f"Manifest uvádí zarovnání {archive.alignment}.")
+    return problems
+
+
+def main():
+    mmap_policy = COMPRESSION_PRESETS['MMAP']
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="vmdl_mmap_check_") as directory:
+        sources = write_sources(directory)
+        path = os.path.join(directory, "check.vmdl")
+
+        write_archive(path, sources, mmap_policy)
+        failures += [f"zápis: {problem}" for problem in alignment_problems(path)]
+        # Archiv MMAP zůstane zarovnaný, i když je ve scéně zvolená jiná politika
+        rewrite_metadata(path, COMPRESSION_PRESETS['BALANCED'])
+        failures += [f"jen metadata: {problem}" for problem in alignment_problems(path)]
+        with VmdlArchive(path) as archive:
+            if 'Root' not in archive.metadata['objects']:
+                failures.append("jen metadata: nová metadata se nezapsala.")
+
+        # Archiv BALANCED přepsaný s politikou MMAP nesmí tvrdit, že je zarovnaný
+        write_archive(path, sources, COMPRESSION_PRESETS['BALANCED'])
+        rewrite_metadata(path, mmap_policy)
+        with VmdlArchive(path) as archive:
+            if archive.alignment is not None:
+                failures.append("BALANCED po přepsání metadat: manifest uvádí zarovnání.")
+        failures += [f"BALANCED po přepsání metadat: {problem}" for problem in verify_archive(path)]
+
+        # Komprimovaný člen v archivu, jehož manifest uvádí zarovnání, verify_mapped() ohlásí
+        with zipfile.ZipFile(path) as zf:
+            policy = archive_policy(zf)
+        policy.alignment = PAGE_ALIGNMENT
+        with VmdlArchiveWriter(path, policy) as archive:
+            archive.copy_members_raw(path)
+            archive.write_manifest()
+        with VmdlArchive(path) as archive:
+            if not any(GLB_NAME in problem for problem in archive.verify_mapped()):
+                failures.append("verify_mapped() neohlásil komprimovaný GLB v zarovnaném archivu.")
+
+    for failure in failures:
+        print(f"CHYBA {failure}")
+    print("OK" if not failures else f"{len(failures)} chyb")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
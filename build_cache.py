@@ -0,0 +1,364 @@
+# ================================================
+# FILE: build_cache.py
+# ================================================
+"""
+Trvalá cache artefaktů exportu pro jednotlivé VMDL rooty.
+
+Při opakovaném exportu se znovu použije GLB a připravené (zkomprimované)
+textury, pokud se nezměnila data, ze kterých vznikly. Klíč GLB je hash
+meshů (včetně tvarových klíčů, vah skupin vrcholů a vlastních normál),
+transformací, armatur a materiálů; klíč textury je otisk
+zdrojového souboru nebo hash zabalených dat.
+"""
+import array
+import json
+import os
+import tempfile
+import threading
+import bpy
+from .vmdl_archive import PreparedMember, content_hasher, file_stamp
+
+CACHE_FORMAT = 1
+INDEX_NAME = "index.json"
+
+# Jak přečíst data atributu meshe přes foreach_get: (pole, typecode, počet složek)
+_ATTRIBUTE_LAYOUT = {
+    'FLOAT': ('value', 'f', 1),
+    'INT': ('value', 'i', 1),
+    'INT8': ('value', 'i', 1),
+    'FLOAT_VECTOR': ('vector', 'f', 3),
+    'FLOAT_COLOR': ('color', 'f', 4),
+    'BYTE_COLOR': ('color', 'f', 4),
+    'FLOAT2': ('vector', 'f', 2),
+    'INT32_2D': ('value', 'i', 2),
+    'QUATERNION': ('value', 'f', 4),
+}
+# Typy atributů, které glTF exportér nezapisuje a foreach_get('value') je neumí přečíst
+_SKIPPED_ATTRIBUTE_TYPES = {'STRING'}
+
+
+class _UnhashableMesh(Exception):
+    """Data meshe nejde zahashovat; GLB se pak do cache neukládá."""
+
+
+def _hash_value(hasher, value):
+    hasher.update(repr(value).encode('utf-8'))
+    hasher.update(b"\0")
+
+
+def _hash_foreach(hasher, collection, attr, typecode, width):
+    count = len(collection) * width
+    buf = array.array(typecode, [0]) * count
+    if count:
+        collection.foreach_get(attr, buf)
+    _hash_value(hasher, count)
+    hasher.update(buf)
+
+
+def _hash_rna(hasher, struct):
+    """Zahashuje všechny jednoduché vlastnosti RNA struktury (modifikátor apod.)."""
+    for prop in struct.bl_rna.properties:
+        if prop.identifier == 'rna_type' or prop.type == 'COLLECTION':
+            continue
+        # show_expanded, is_active apod. jsou stav UI, výstup exportu nemění
+        if prop.identifier.startswith(('show_', 'is_')):
+            continue
+        value = getattr(struct, prop.identifier, None)
+        if prop.type == 'POINTER':
+            value = getattr(value, 'name', None)
+        elif getattr(prop, 'is_array', False):
+            value = tuple(value)
+        elif isinstance(value, set):
+            value = sorted(value)
+        _hash_value(hasher, (prop.identifier, value))
+
+
+def _hash_vertex_weights(hasher, mesh):
+    # Počet skupin se u vrcholů liší, foreach_get tu nejde použít
+    counts = array.array('i')
+    groups = array.array('i')
+    weights = array.array('f')
+    for vertex in mesh.vertices:
+        vertex_groups = vertex.groups
+        counts.append(len(vertex_groups))
+        for group in vertex_groups:
+            groups.append(group.group)
+            weights.append(group.weight)
+    for values in (counts, groups, weights):
+        _hash_value(hasher, len(values))
+        hasher.update(values)
+
+
+def _hash_mesh(hasher, mesh, with_weights=False):
+    _hash_foreach(hasher, mesh.vertices, 'co', 'f', 3)
+    _hash_foreach(hasher, mesh.edges, 'vertices', 'i', 2)
+    _hash_foreach(hasher, mesh.loops, 'vertex_index', 'i', 1)
+    _hash_foreach(hasher, mesh.polygons, 'loop_start', 'i', 1)
+    _hash_foreach(hasher, mesh.polygons, 'loop_total', 'i', 1)
+    _hash_foreach(hasher, mesh.polygons, 'material_index', 'i', 1)
+    for attr in sorted(mesh.attributes, key=lambda a: a.name):
+        # Interní atributy ('.select_vert' apod.) jsou stav UI, ne data modelu
+        if attr.name.startswith('.'):
+            continue
+        _hash_value(hasher, (attr.name, attr.domain, attr.data_type))
+        layout = _ATTRIBUTE_LAYOUT.get(attr.data_type)
+        if layout:
+            _hash_foreach(hasher, attr.data, *layout)
+        elif attr.data_type in _SKIPPED_ATTRIBUTE_TYPES:
+            _hash_value(hasher, len(attr.data))
+        else:
+            values = [0] * len(attr.data)
+            try:
+                attr.data.foreach_get('value', values)
+            except (TypeError, RuntimeError, AttributeError) as e:
+                raise _UnhashableMesh(f"atribut '{attr.name}' ({attr.data_type}): {e}")
+            _hash_value(hasher, values)
+    # Vlastní normály rohů (Blender 4.1+ corner_normals, starší loops.normal)
+    _hash_value(hasher, mesh.has_custom_normals)
+    if mesh.has_custom_normals:
+        if hasattr(mesh, 'corner_normals'):
+            _hash_foreach(hasher, mesh.corner_normals, 'vector', 'f', 3)
+        else:
+            mesh.calc_normals_split()
+            _hash_foreach(hasher, mesh.loops, 'normal', 'f', 3)
+    # Tvarové klíče exportuje glTF jako morph targety
+    if mesh.shape_keys:
+        for key_block in mesh.shape_keys.key_blocks:
+            _hash_value(hasher, (key_block.name, key_block.value, key_block.mute,
+                                 key_block.relative_key.name if key_block.relative_key else None))
+            _hash_foreach(hasher, key_block.data, 'co', 'f', 3)
+    if with_weights:
+        _hash_vertex_weights(hasher, mesh)
+    _hash_value(hasher, [mat.name if mat else None for mat in mesh.materials])
+
+
+def _hash_material(hasher, mat):
+    _hash_value(hasher, (mat.name, mat.use_nodes, tuple(mat.diffuse_color), getattr(mat, 'blend_method', None)))
+    if not mat.node_tree:
+        return
+    for node in sorted(mat.node_tree.nodes, key=lambda n: n.name):
+        _hash_value(hasher, (node.bl_idname, node.name, getattr(getattr(node, 'image', None), 'name', None)))
+        for socket in node.inputs:
+            value = getattr(socket, 'default_value', None)
+            if value is not None and not isinstance(value, (int, float, str, bool)):
+                value = tuple(value)
+            _hash_value(hasher, (socket.identifier, value, socket.is_linked))
+    for link in mat.node_tree.links:
+        _hash_value(hasher, (link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier))
+
+
+def _hash_modifiers(hasher, obj, apply_modifiers):
+    if apply_modifiers:
+        for mod in obj.modifiers:
+            _hash_rna(hasher, mod)
+        return
+    # Bez export_apply se modifikátory neaplikují; do skinu se promítne jen armatura
+    for mod in obj.modifiers:
+        if mod.type == 'ARMATURE':
+            _hash_value(hasher, (mod.name, mod.type, mod.object.name if mod.object else None, mod.show_viewport))
+
+
+def glb_cache_key(objects, export_options):
+    """
+    Klíč GLB: všechno, co ovlivní výstup glTF exportéru pro dané objekty.
+    Vrací None, pokud některý mesh nejde zahashovat (GLB se pak necachuje).
+    """
+    hasher = content_hasher()
+    _hash_value(hasher, (CACHE_FORMAT, bpy.app.version_string, sorted(export_options.items())))
+    apply_modifiers = export_options.get('export_apply', False)
+    hashed_data = set()
+    materials = set()
+    for obj in sorted(objects, key=lambda o: o.name):
+        _hash_value(hasher, (obj.name, obj.type, obj.vmdl_enum_type, obj.parent.name if obj.parent else None,
+                             obj.parent_type, obj.parent_bone))
+        # Světová matice zahrne i transformace předků mimo exportovanou hierarchii
+        _hash_value(hasher, [tuple(row) for row in obj.matrix_world])
+        _hash_modifiers(hasher, obj, apply_modifiers)
+        if obj.type != 'MESH':
+            continue
+        with_weights = len(obj.vertex_groups) > 0
+        _hash_value(hasher, (obj.data.name, [group.name for group in obj.vertex_groups]))
+        if (obj.data.name, with_weights) not in hashed_data:
+            hashed_data.add((obj.data.name, with_weights))
+            try:
+                _hash_mesh(hasher, obj.data, with_weights)
+            except _UnhashableMesh as e:
+                print(f"Build cache: mesh '{obj.data.name}' nejde zahashovat ({e}), GLB se exportuje bez cache.")
+                return None
+        materials.update(slot.material for slot in obj.material_slots if slot.material)
+    for mat in sorted(materials, key=lambda m: m.name):
+        _hash_material(hasher, mat)
+    return "glb:" + hasher.hexdigest()
+
+
+def image_cache_key(image):
+    """
+    Levný otisk zdroje obrázku, nebo None, pokud se obrázek cachovat nedá
+    (upravený v paměti). Odpovídá logice texture_utils.resolve_image_source().
+    """
+    if image.is_dirty:
+        return None
+    src_path = bpy.path.abspath(image.filepath_raw)
+    if image.packed_file:
+        hasher = content_hasher()
+        hasher.update(image.packed_file.data)
+        return "packed:" + hasher.hexdigest()
+    if os.path.exists(src_path):
+        stat = os.stat(src_path)
+        return f"file:{os.path.normcase(os.path.abspath(src_path))}:{stat.st_size}:{stat.st_mtime_ns}"
+    if image.source == 'GENERATED':
+        return "generated:" + repr((image.name, image.generated_type, tuple(image.generated_color),
+                                    image.generated_width, image.generated_height, image.use_generated_float,
+                                    image.file_format))
+    return None
+
+
+def _directory_tag(name, identity=None):
+    """
+    Jméno adresáře: očištěné jméno plus krátký hash původního (nebo identity),
+    aby různá jména, která se očistí na stejný text, nesdílela adresář.
+    """
+    hasher = content_hasher()
+    hasher.update((identity or name).encode('utf-8'))
+    return f"{bpy.path.clean_name(name)}_{hasher.hexdigest()[:8]}"
+
+
+def _source_unchanged(path, stamp):
+    try:
+        return file_stamp(path) == stamp
+    except OSError:
+        return False
+
+
+class BuildCache:
+    """
+    Adresář s indexem a daty připravených členů archivu. Data se ukládají
+    už zkomprimovaná, takže zásah do cache znamená jen jejich zkopírování do archivu.
+    Nekomprimované textury ze souborů se nekopírují, index si pamatuje jen
+    jejich zdroj (velikost a čas změny). Po exportu se z cache odstraní vše,
+    co export nepoužil.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._used = set()
+        os.makedirs(directory, exist_ok=True)
+        self._index = {'format': CACHE_FORMAT, 'entries': {}}
+        index_path = os.path.join(directory, INDEX_NAME)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('format') == CACHE_FORMAT:
+                    self._index = index
+            except (OSError, ValueError) as e:
+                print(f"VAROVÁNÍ: Index build cache '{index_path}' nelze načíst, začínám znovu: {e}")
+
+    @classmethod
+    def for_root(cls, settings, root_obj):
+        base_dir = bpy.path.abspath(settings.cache_dir) if settings.cache_dir else os.path.join(tempfile.gettempdir(), "vmdl_build_cache")
+        blend_path = bpy.data.filepath or "untitled"
+        return cls(os.path.join(base_dir, _directory_tag(os.path.basename(blend_path), blend_path),
+                                _directory_tag(root_obj.name)))
+
+    def load_member(self, key):
+        """Vrátí PreparedMember z cache, nebo None."""
+        with self._lock:
+            entry = self._index['entries'].get(key)
+        member = None
+        if entry and 'source' in entry:
+            if _source_unchanged(entry['source'], entry['stamp']):
+                member = PreparedMember.from_description(entry['member'], source=entry['source'])
+        elif entry and os.path.exists(os.path.join(self.directory, entry['blob'])):
+            member = PreparedMember.from_description(entry['member'], os.path.join(self.directory, entry['blob']))
+        with self._lock:
+            if member is None:
+                self.misses += 1
+            else:
+                self._used.add(key)
+                self.hits += 1
+        return member
+
+    def store_member(self, key, member):
+        """
+        Uloží připravený člen a vrátí cestu k jeho datům. Nekomprimovaný člen ze souboru
+        (member.file_backed) se nekopíruje, zapamatuje se jen jeho zdroj; pak vrací None.
+        Může běžet ve vlákně.
+        """
+        if member.file_backed:
+            with self._lock:
+                self._index['entries'][key] = {'source': member.source, 'stamp': file_stamp(member.source),
+                                               'member': member.describe()}
+                self._used.add(key)
+            return None
+        key_hasher = content_hasher()
+        key_hasher.update(key.encode('utf-8'))
+        blob_name = key_hasher.hexdigest() + ".bin"
+        member.save_payload(os.path.join(self.directory, blob_name))
+        with self._lock:
+            self._index['entries'][key] = {'blob': blob_name, 'member': member.describe()}
+            self._used.add(key)
+        return os.path.join(self.directory, blob_name)
+
+    def save(self):
+        """Zapíše index a smaže data, která poslední export nepoužil."""
+        entries = {key: entry for key, entry in self._index['entries'].items() if key in self._used}
+        self._index['entries'] = entries
+        keep = {entry['blob'] for entry in entries.values() if 'blob' in entry} | {INDEX_NAME}
+        for filename in os.listdir(self.directory):
+            if filename not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+        index_path = os.path.join(self.directory, INDEX_NAME)
+        with open(index_path + ".part", 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=1)
+        os.replace(index_path + ".part", index_path)
+
+
+class TextureMemo:
+    """
+    Sdílí připravené textury mezi exporty více rootů v jednom běhu (dávkový export),
+    takže textura použitá na více modelech se zakóduje a zkomprimuje jen jednou.
+    Data se berou z build cache, nebo se uloží do vlastního dočasného adresáře.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def load_member(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        description, blob_path, source, stamp = entry
+        # Zdroj file_backed členu mohl být dočasný soubor už uklizeného exportu
+        if source is not None and not _source_unchanged(source, stamp):
+            return None
+        with self._lock:
+            self.hits += 1
+        return PreparedMember.from_description(description, blob_path, source)
+
+    def remember(self, key, member, blob_path=None):
+        """
+        Zapamatuje si člen. Nekomprimovaný člen ze souboru jen odkazem na zdroj, jinak
+        bez blob_path uloží jeho data do vlastního adresáře. Může běžet ve vlákně.
+        """
+        if member.file_backed:
+            with self._lock:
+                self._entries[key] = (member.describe(), None, member.source, file_stamp(member.source))
+            return
+        if blob_path is None:
+            key_hasher = content_hasher()
+            key_hasher.update(key.encode('utf-8'))
+            blob_path = os.path.join(self.directory, key_hasher.hexdigest() + ".bin")
+            member.save_payload(blob_path)
+        with self._lock:
+            self._entries[key] = (member.describe(), blob_path, None, None)
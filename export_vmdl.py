@@ -1,14 +1,520 @@
 import bpy
 import json
 import os
-import shutil
 import tempfile
+import time
 import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from bpy_extras.io_utils import ExportHelper
+from .glb_quantize import quantize_glb_file
+from .instrumentation import OperationProbe, PhaseTimer
+from .vmdl_utils import find_export_root, root_of
+from .build_cache import BuildCache, TextureMemo, glb_cache_key, image_cache_key
+from .vertex_color_engine import LAYER_NAMES, convert_layer_to_point, corner_colors_per_vertex
+from .texture_utils import (
+    image_has_source, image_manifest_info, image_content_hash, read_image_header, resolve_image_source,
+    image_file_extension, print_texture_timings,
+)
+from .vmdl_archive import (
+    VmdlArchiveWriter, CompressionPolicy, COMPRESSION_PRESETS, prepare_member, read_manifest, archive_policy,
+    GLB_NAME, METADATA_NAME, TEXTURE_DIR,
+)
 
 class VMDLExportProperties(bpy.types.PropertyGroup):
     version: bpy.props.FloatProperty(name="VMDL Version", default=3.0, description="Version number for VMDL metadata")
     debug_show_extras: bpy.props.BoolProperty(name="Debug: Zobrazit Metadata", description="Po exportu vypíše obsah 'metadata.json' do systémové konzole pro kontrolu", default=False)
+    texture_workers: bpy.props.IntProperty(
+        name="Vlákna pro textury",
+        description="Počet vláken pro kopírování a kompresi textur při exportu a extrakci",
+        min=1, max=32, default=4
+    )
+    compression_policy: bpy.props.EnumProperty(
+        name="Komprese",
+        description="Jak komprimovat jednotlivé členy archivu",
+        items=[
+            ('BALANCED', "Vyvážená", "PNG/JPG bez komprese, ostatní DEFLATE úrovně 6"),
+            ('SMALLEST', "Nejmenší soubor", "PNG/JPG bez komprese, ostatní LZMA s presetem 9"),
+            ('FASTEST_LOAD', "Nejrychlejší načtení", "Vše bez komprese (ZIP_STORED)"),
+            ('MMAP', "Zarovnaný pro mmap", "Vše bez komprese, data členů zarovnaná na 4 KiB pro mapování přímo z archivu"),
+            ('LEGACY', "DEFLATE vše", "Původní chování: vše DEFLATE s výchozí úrovní"),
+            ('CUSTOM', "Vlastní", "PNG/JPG bez komprese, ostatní zvolenou metodou a úrovní"),
+        ],
+        default='BALANCED'
+    )
+    compression_method: bpy.props.EnumProperty(
+        name="Metoda",
+        items=[('DEFLATE', "DEFLATE", ""), ('LZMA', "LZMA", "")],
+        default='DEFLATE'
+    )
+    compression_level: bpy.props.IntProperty(name="Úroveň", min=1, max=9, default=6)
+    use_build_cache: bpy.props.BoolProperty(
+        name="Build cache",
+        description="Při opakovaném exportu znovu použije GLB a textury, které se nezměnily",
+        default=True
+    )
+    cache_dir: bpy.props.StringProperty(
+        name="Adresář cache",
+        description="Kam ukládat build cache (prázdné = systémový dočasný adresář)",
+        subtype='DIR_PATH',
+        default=""
+    )
+    compact_vertex_colors: bpy.props.BoolProperty(
+        name="Kompaktní Color1/Color2",
+        description="Vrstvy, jejichž rohy se u každého vrcholu shodují, exportuje v doméně vrcholů a barvy v GLB uloží jako normalizované uint8",
+        default=False
+    )
+    track_memory: bpy.props.BoolProperty(
+        name="Měřit paměť fází",
+        description="U exportu a importu měří špičku paměti alokované Pythonem v každé fázi (tracemalloc, operace se zpomalí)",
+        default=False
+    )
+    phase_log_path: bpy.props.StringProperty(
+        name="Log měření",
+        description="JSON Lines soubor, do kterého se po každém exportu a importu připíše řádek s časy a pamětí fází (prázdné = nelogovat)",
+        subtype='FILE_PATH',
+        default=""
+    )
+    profile_operators: bpy.props.BoolProperty(
+        name="cProfile",
+        description="Profiluje export a import pomocí cProfile a uloží .prof soubor (otevře ho např. snakeviz)",
+        default=False
+    )
+    profile_dir: bpy.props.StringProperty(
+        name="Adresář profilů",
+        description="Kam ukládat .prof soubory (prázdné = systémový dočasný adresář)",
+        subtype='DIR_PATH',
+        default=""
+    )
+
+
+def probe_from_settings(operation, settings, **details):
+    """OperationProbe podle nastavení měření ve scéně (VMDLExportProperties)."""
+    profile_dir = None
+    if settings.profile_operators:
+        profile_dir = bpy.path.abspath(settings.profile_dir) if settings.profile_dir else tempfile.gettempdir()
+    log_path = bpy.path.abspath(settings.phase_log_path) if settings.phase_log_path else None
+    return OperationProbe(operation, settings.track_memory, log_path, profile_dir, details)
+
+
+def compression_policy_from_settings(settings):
+    if settings.compression_policy == 'CUSTOM':
+        method = zipfile.ZIP_LZMA if settings.compression_method == 'LZMA' else zipfile.ZIP_DEFLATED
+        return CompressionPolicy(method, settings.compression_level)
+    return COMPRESSION_PRESETS[settings.compression_policy]
+
+
+class VMDLExportError(Exception):
+    """Chyba exportu, kterou má operátor nahlásit uživateli."""
+
+
+# Nastavení glTF exportéru; je součástí klíče GLB v build cache
+GLTF_EXPORT_OPTIONS = {
+    'export_format': 'GLB',
+    'use_selection': True,
+    'export_attributes': True,
+    'export_image_format': 'NONE',
+    'export_extras': False,
+}
+
+
+@contextmanager
+def compact_vertex_color_meshes(objects):
+    """
+    Po dobu exportu nahradí meshe objektů dočasnými kopiemi, ve kterých jsou
+    Color1/Color2 v doméně vrcholů, pokud se rohy každého vrcholu shodují.
+    Kopie dostanou jméno původního meshe, aby se v GLB nic nepřejmenovalo.
+    Vrací počet převedených vrstev; původní meshe se nemění.
+    """
+    copies = {}
+    swapped = []
+    converted = 0
+    try:
+        for obj in objects:
+            if obj.type != 'MESH': continue
+            mesh = obj.data
+            if mesh not in copies:
+                copies[mesh] = None
+                point_layers = {name: corner_colors_per_vertex(mesh, name) for name in LAYER_NAMES}
+                point_layers = {name: values for name, values in point_layers.items() if values is not None}
+                if point_layers:
+                    name = mesh.name
+                    copy = mesh.copy()
+                    mesh.name = name + ".vmdl_original"
+                    copy.name = name
+                    for layer_name, values in point_layers.items():
+                        convert_layer_to_point(copy, layer_name, values)
+                    copies[mesh] = copy
+                    converted += len(point_layers)
+            if copies[mesh] is not None:
+                obj.data = copies[mesh]
+                swapped.append((obj, mesh))
+        yield converted
+    finally:
+        for obj, mesh in swapped:
+            obj.data = mesh
+        for mesh, copy in copies.items():
+            if copy is None: continue
+            name = copy.name
+            bpy.data.meshes.remove(copy)
+            mesh.name = name
+
+
+def find_export_roots(context, selected_only=False):
+    """Všechny ROOT objekty ve scéně, případně jen rooty vybraných objektů."""
+    if selected_only:
+        roots = {root_of(obj) for obj in context.selected_objects}
+        roots.discard(None)
+    else:
+        roots = {obj for obj in context.scene.objects if obj.vmdl_enum_type == "ROOT"}
+    return sorted(roots, key=lambda o: o.name)
+
+
+def root_archive_name(root_obj):
+    return root_obj.name.replace("_VMDL", "") + ".vmdl"
+
+
+def gather_export_objects(root_obj):
+    all_objs_to_export = []
+    def gather_objects(obj):
+        all_objs_to_export.append(obj)
+        for child in obj.children: gather_objects(child)
+    gather_objects(root_obj)
+    return all_objs_to_export
+
+
+def build_metadata(context, all_objs_to_export):
+    """
+    Sestaví metadata materiálů a objektů. Vrací (metadata, texture_slots, obrázky);
+    odkazy na textury v materiálech se doplní až podle hashe obsahu.
+    """
+    vmdl_metadata = {
+        'vmdl_version': context.scene.vmdl_export.version,
+        'materials': {},
+        'textures': {},
+        'objects': {}
+        # Odebrána logika s indexy, není potřeba
+    }
+    unique_materials = set(mat for o in all_objs_to_export if o.type == 'MESH' for mat in o.data.materials if mat)
+    unique_images = set()
+    # (data materiálu, slot, obrázek) – odkaz na texturu se doplní až podle hashe obsahu
+    texture_slots = []
+
+    for mat in unique_materials:
+        props = getattr(mat, 'vmdl_shader', None)
+        if not props or not props.shader_name: continue
+        mat_data = {'shader_name': props.shader_name, 'parameters': {}, 'textures': {}}
+        for p in props.parameters:
+            if p.type == 'float': val = p.float_value
+            elif p.type == 'vector4': val = list(p.vector_value)
+            elif p.type == 'bool': val = p.bool_value
+            else: continue
+            mat_data['parameters'][p.name] = val
+        for t in props.textures:
+            if t.image:
+                texture_slots.append((mat_data, t.name, t.image))
+                unique_images.add(t.image)
+        # Ukládáme data pod původním jménem materiálu
+        vmdl_metadata['materials'][mat.name] = mat_data
+
+    for obj in all_objs_to_export:
+        obj_type = obj.vmdl_enum_type
+        if obj_type == 'NONE': continue
+        obj_data = {'vmdl_type': obj_type}
+        if obj_type == 'COLLIDER': obj_data['collider_type'] = obj.vmdl_collider.collider_type
+        elif obj_type == 'MOUNTPOINT':
+            obj_data['forward_vector'] = list(obj.vmdl_mountpoint.forward_vector)
+            obj_data['up_vector'] = list(obj.vmdl_mountpoint.up_vector)
+        vmdl_metadata['objects'][obj.name] = obj_data
+    return vmdl_metadata, texture_slots, unique_images
+
+
+def validate_root(context, root_obj):
+    """Kontrola rootu před exportem, bez zápisu archivu. Vrací seznam nalezených problémů."""
+    problems = []
+    all_objs_to_export = gather_export_objects(root_obj)
+    if not any(o.type == 'MESH' and o.vmdl_enum_type == "MESH" for o in all_objs_to_export):
+        problems.append("VMDL Root neobsahuje žádný viditelný MESH objekt.")
+    materials = set()
+    for obj in all_objs_to_export:
+        if obj.type != 'MESH' or obj.vmdl_enum_type != "MESH": continue
+        if not any(slot.material for slot in obj.material_slots):
+            problems.append(f"Objekt '{obj.name}' nemá žádný materiál.")
+        materials.update(mat for mat in obj.data.materials if mat)
+    for mat in sorted(materials, key=lambda m: m.name):
+        props = getattr(mat, 'vmdl_shader', None)
+        if not props or not props.shader_name:
+            problems.append(f"Materiál '{mat.name}' nemá nastavený VMDL shader.")
+    _, texture_slots, _ = build_metadata(context, all_objs_to_export)
+    for mat_data, slot_name, image in texture_slots:
+        if not image_has_source(image):
+            problems.append(f"Textura '{image.name}' (slot '{slot_name}') nemá data ani soubor na disku.")
+    return problems
+
+
+def _prepare_texture(source, compress_type, level, cache, texture_memo, cache_key):
+    # Běží ve vlákně: příprava členu a případně uložení do build cache / sdílení v dávce
+    member = prepare_member(None, source, compress_type, level)
+    # Rozměry z hlavičky souboru, aby se obrázek nemusel dekódovat na hlavním vlákně
+    member.info = read_image_header(source)
+    blob_path = None
+    if cache and cache_key:
+        blob_path = cache.store_member(cache_key, member)
+    if texture_memo is not None and cache_key:
+        texture_memo.remember(cache_key, member, blob_path)
+    return member
+
+
+def export_root(context, root_obj, filepath, texture_memo=None, timer=None):
+    """
+    Exportuje jeden VMDL root do .vmdl archivu. Vrací slovník se statistikami
+    (včetně časů fází v 'phases'), při chybě vstupních dat vyhodí VMDLExportError.
+    S texture_memo (TextureMemo) se připravené textury sdílí mezi více exporty v jednom běhu.
+    Bez timer si export založí vlastní měření a po dokončení ho ukončí (i tracemalloc).
+    """
+    if timer is not None:
+        return _export_root(context, root_obj, filepath, texture_memo, timer)
+    timer = PhaseTimer("export", context.scene.vmdl_export.track_memory)
+    try:
+        return _export_root(context, root_obj, filepath, texture_memo, timer)
+    finally:
+        timer.stop()
+
+
+def _export_root(context, root_obj, filepath, texture_memo, timer):
+    settings = context.scene.vmdl_export
+    with timer.phase('gather'):
+        all_objs_to_export = gather_export_objects(root_obj)
+
+    if not any(o.type == 'MESH' and o.vmdl_enum_type == "MESH" for o in all_objs_to_export):
+        raise VMDLExportError("VMDL Root neobsahuje žádný viditelný MESH objekt.")
+
+    with timer.phase('materials'):
+        vmdl_metadata, texture_slots, unique_images = build_metadata(context, all_objs_to_export)
+
+    if context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    bpy.ops.object.select_all(action='DESELECT')
+    for obj in all_objs_to_export: obj.select_set(True)
+    context.view_layer.objects.active = root_obj
+
+    texture_timings = []
+    vertex_colors = None
+    policy = compression_policy_from_settings(settings)
+    cache = BuildCache.for_root(settings, root_obj) if settings.use_build_cache else None
+    glb_reused = False
+
+    # Na disk se ukládá jen GLB (glTF exportér potřebuje cestu) a obrázky,
+    # které existují pouze v paměti Blenderu. Vše ostatní jde rovnou do archivu.
+    with tempfile.TemporaryDirectory() as tempdir, VmdlArchiveWriter(filepath, policy) as archive, \
+            ThreadPoolExecutor(max_workers=settings.texture_workers) as pool:
+        # Na hlavním vlákně jen to, co musí sahat na bpy; čtení, hashování a komprese
+        # textur běží ve vláknech souběžně s glTF exportem. Obrázky ukazující na
+        # stejný soubor na disku se zpracují jen jednou, obrázky z build cache vůbec.
+        with timer.phase('texture_staging'):
+            texture_jobs = {}
+            for image in sorted(unique_images, key=lambda img: img.name):
+                if not image_has_source(image): continue
+                bpy_start = time.perf_counter()
+                src_path = bpy.path.abspath(image.filepath_raw)
+                ext = image_file_extension(image, src_path if not image.packed_file and os.path.exists(src_path) else None)
+                compression = policy.for_extension(ext)
+                image_key = image_cache_key(image) if cache or texture_memo is not None else None
+                cache_key = f"{image_key}|{ext}|{compression}" if image_key else None
+                if cache_key in texture_jobs:
+                    texture_jobs[cache_key][3].append(image)
+                    continue
+                member = texture_memo.load_member(cache_key) if cache_key and texture_memo is not None else None
+                if member is None and cache_key and cache:
+                    member = cache.load_member(cache_key)
+                    if member and texture_memo is not None:
+                        texture_memo.remember(cache_key, member, member.payload.name if member.payload else None)
+                if member:
+                    future = Future()
+                    future.set_result(member)
+                    job_key = cache_key
+                else:
+                    source = resolve_image_source(image, tempdir, f"staged_{len(texture_jobs)}")
+                    job_key = cache_key or (os.path.normcase(os.path.abspath(source)) if isinstance(source, str) else image.name)
+                    if job_key in texture_jobs:
+                        texture_jobs[job_key][3].append(image)
+                        continue
+                    future = pool.submit(_prepare_texture, source, *compression, cache, texture_memo, cache_key)
+                texture_jobs[job_key] = (time.perf_counter() - bpy_start, ext, future, [image])
+
+        with timer.phase('gltf_export'):
+            glb_member = None
+            temp_glb_path = None
+            # Kompaktní barvy mění obsah GLB a v cache je člen už zkomprimovaný,
+            # proto do klíče patří i metoda a úroveň komprese GLB
+            key_options = dict(GLTF_EXPORT_OPTIONS, vmdl_compact_vertex_colors=settings.compact_vertex_colors,
+                               vmdl_glb_compression=policy.for_member(GLB_NAME))
+            glb_key = glb_cache_key(all_objs_to_export, key_options) if cache else None
+            if glb_key:
+                glb_member = cache.load_member(glb_key)
+                glb_reused = glb_member is not None
+            if glb_member is None:
+                temp_glb_path = os.path.join(tempdir, GLB_NAME)
+                if settings.compact_vertex_colors:
+                    with compact_vertex_color_meshes(all_objs_to_export) as point_layers:
+                        bpy.ops.export_scene.gltf(filepath=temp_glb_path, **GLTF_EXPORT_OPTIONS)
+                    size_before, size_after, quantized = quantize_glb_file(temp_glb_path)
+                    vertex_colors = {'point_layers': point_layers, 'quantized_accessors': quantized,
+                                     'glb_bytes_before': size_before, 'glb_bytes': size_after,
+                                     'saved_bytes': size_before - size_after}
+                    print(f"Kompaktní vertex barvy '{root_obj.name}': {point_layers} vrstev v doméně vrcholů, "
+                          f"{quantized} atributů uint8, GLB {size_before} -> {size_after} B "
+                          f"(ušetřeno {size_before - size_after} B)")
+                else:
+                    bpy.ops.export_scene.gltf(filepath=temp_glb_path, **GLTF_EXPORT_OPTIONS)
+                if glb_key:
+                    glb_member = prepare_member(GLB_NAME, temp_glb_path, *policy.for_member(GLB_NAME))
+                    cache.store_member(glb_key, glb_member)
+        with timer.phase('zip_writing'):
+            if glb_member is not None:
+                archive.write_prepared(glb_member)
+            else:
+                archive.write_file(GLB_NAME, temp_glb_path)
+
+            # Textury se ukládají pod hashem obsahu: stejná data pod různými jmény
+            # se uloží jednou a různé obrázky se stejným jménem se nepřepíší.
+            image_refs = {}
+            for bpy_time, ext, future, images in texture_jobs.values():
+                member = future.result()
+                for image in images: image_refs[image] = member.digest
+                if member.digest in vmdl_metadata['textures']:
+                    member.release()
+                    continue
+                member.name = TEXTURE_DIR + member.digest + ext
+                vmdl_metadata['textures'][member.digest] = {'file': member.name, 'name': images[0].name}
+                texture_timings.append((member.name, member.file_size, bpy_time, member.elapsed))
+                archive.write_prepared(member)
+                archive.annotate(member.name, image={**member.info, **image_manifest_info(images[0])})
+            for mat_data, slot_name, image in texture_slots:
+                if image in image_refs:
+                    mat_data['textures'][slot_name] = image_refs[image]
+            archive.write_json(METADATA_NAME, vmdl_metadata)
+            archive.write_manifest()
+
+    if cache:
+        with timer.phase('cache_save'):
+            cache.save()
+
+    print_texture_timings("Export textur:", texture_timings)
+    if settings.debug_show_extras:
+        print("\n================= DEBUG VMDL METADATA ==================")
+        print(json.dumps(vmdl_metadata, indent=2, ensure_ascii=False))
+        print("============== KONEC DEBUG VMDL METADATA ===============\n")
+
+    return {
+        'root': root_obj.name,
+        'filepath': filepath,
+        'elapsed': timer.elapsed,
+        'textures': len(vmdl_metadata['textures']),
+        'glb_reused': glb_reused,
+        'cache_hits': cache.hits if cache else 0,
+        'cache_misses': cache.misses if cache else 0,
+        'phases': timer.as_dict()['phases'],
+        'memory': timer.memory,
+        'vertex_colors': vertex_colors,
+    }
+
+
+def update_archive_metadata(context, root_obj, filepath):
+    """
+    Přepíše jen 'metadata.json' v existujícím archivu. Ostatní členy se zkopírují
+    bez dekomprese, glTF export ani textury se neřeší. Komprese a zarovnání zůstanou
+    podle původního archivu, ne podle aktuálního nastavení. Hodí se pro změny parametrů
+    shaderů, typů colliderů a vektorů mountpointů; změnu hierarchie, materiálů,
+    texturových slotů nebo dat textur odmítne s VMDLExportError.
+    """
+    if not os.path.exists(filepath):
+        raise VMDLExportError(f"Archiv '{filepath}' neexistuje, je potřeba plný export.")
+    start_time = time.perf_counter()
+    with zipfile.ZipFile(filepath, 'r') as zf:
+        old_metadata = json.loads(zf.read(METADATA_NAME).decode('utf-8'))
+        old_manifest = read_manifest(zf)
+        # Zkopírované členy si nechají svou kompresi a zarovnání, nové musí odpovídat
+        policy = archive_policy(zf, compression_policy_from_settings(context.scene.vmdl_export))
+
+    all_objs_to_export = gather_export_objects(root_obj)
+    vmdl_metadata, texture_slots, _ = build_metadata(context, all_objs_to_export)
+
+    if set(vmdl_metadata['objects']) != set(old_metadata.get('objects', {})):
+        raise VMDLExportError("Hierarchie objektů se od posledního exportu změnila, je potřeba plný export.")
+    old_materials = old_metadata.get('materials', {})
+    if set(vmdl_metadata['materials']) != set(old_materials):
+        raise VMDLExportError("Materiály se od posledního exportu změnily, je potřeba plný export.")
+
+    # Odkazy na textury přebíráme z původního archivu; sloty musí zůstat stejné
+    # a obrázky musí mít stejná data (odkaz na texturu je hash jejího obsahu)
+    slots_by_material = {}
+    for mat_data, slot_name, image in texture_slots:
+        slots_by_material.setdefault(id(mat_data), {})[slot_name] = image
+    old_textures = old_metadata.get('textures', {})
+    for mat_name, mat_data in vmdl_metadata['materials'].items():
+        slots = slots_by_material.get(id(mat_data), {})
+        old_slots = old_materials[mat_name].get('textures', {})
+        if set(slots) != set(old_slots):
+            raise VMDLExportError(f"Texturové sloty materiálu '{mat_name}' se změnily, je potřeba plný export.")
+        for slot_name, image in slots.items():
+            old_ref = old_slots[slot_name]
+            old_entry = old_textures.get(old_ref)
+            old_hash = old_manifest.get(old_entry['file'], {}).get('hash') if old_entry else None
+            if image_content_hash(image) != (old_hash or old_ref):
+                raise VMDLExportError(f"Textura '{slot_name}' materiálu '{mat_name}' se změnila, je potřeba plný export.")
+            mat_data['textures'][slot_name] = old_ref
+    vmdl_metadata['textures'] = old_textures
+
+    with VmdlArchiveWriter(filepath, policy) as archive:
+        copied = archive.copy_members_raw(filepath, skip={METADATA_NAME})
+        archive.write_json(METADATA_NAME, vmdl_metadata)
+        archive.write_manifest()
+
+    return {
+        'root': root_obj.name,
+        'filepath': filepath,
+        'elapsed': time.perf_counter() - start_time,
+        'copied_members': copied,
+    }
+
+
+def export_roots(context, roots, directory, timer=None):
+    """
+    Exportuje více rootů do adresáře v jednom běhu. Textury sdílené mezi rooty
+    se připraví jen jednou. Vrací seznam (jméno rootu, statistiky nebo None, chyba nebo None).
+    S timer se do něj přičtou časy fází všech rootů.
+    """
+    os.makedirs(directory, exist_ok=True)
+    track_memory = context.scene.vmdl_export.track_memory
+    results = []
+    with tempfile.TemporaryDirectory(prefix="vmdl_batch_") as memo_dir:
+        texture_memo = TextureMemo(memo_dir)
+        for root_obj in roots:
+            filepath = os.path.join(directory, root_archive_name(root_obj))
+            root_timer = PhaseTimer("export", track_memory)
+            try:
+                results.append((root_obj.name, export_root(context, root_obj, filepath, texture_memo, root_timer), None))
+                if timer: timer.merge(root_timer)
+            except VMDLExportError as e:
+                results.append((root_obj.name, None, str(e)))
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                results.append((root_obj.name, None, f"Export selhal: {e}"))
+            finally:
+                root_timer.stop()
+
+    print("\n============== DÁVKOVÝ EXPORT VMDL ==============")
+    for root_name, stats, error in results:
+        if stats:
+            print(f"  {root_name:<40} {stats['elapsed']:8.2f} s   textur {stats['textures']:3d}   "
+                  f"GLB z cache {'ano' if stats['glb_reused'] else 'ne'}")
+        else:
+            print(f"  {root_name:<40} CHYBA: {error}")
+    print(f"  Celkem: {sum(s['elapsed'] for _, s, _ in results if s):.2f} s, "
+          f"sdílených textur použito znovu: {texture_memo.hits}")
+    return results
 
 
 class VMDL_OT_export_vmdl(bpy.types.Operator, ExportHelper):
@@ -16,6 +522,11 @@ class VMDL_OT_export_vmdl(bpy.types.Operator, ExportHelper):
     bl_label = "Export VMDL Archive"
     filename_ext = ".vmdl"
     filter_glob: bpy.props.StringProperty(default="*.vmdl", options={'HIDDEN'})
+    metadata_only: bpy.props.BoolProperty(
+        name="Jen metadata",
+        description="Přepíše pouze metadata.json v existujícím archivu (parametry shaderů, collidery, mountpointy), bez glTF exportu a textur",
+        default=False
+    )
 
     def invoke(self, context, event):
         root_obj = None
@@ -29,122 +540,72 @@ class VMDL_OT_export_vmdl(bpy.types.Operator, ExportHelper):
         return super().invoke(context, event)
 
     def execute(self, context):
-        start_obj = context.active_object
-        root_obj = None
-        if start_obj:
-            if start_obj.vmdl_enum_type == "ROOT": root_obj = start_obj
-            else:
-                node = start_obj
-                while node.parent:
-                    node = node.parent
-                    if node.vmdl_enum_type == "ROOT": root_obj = node; break
-        if not root_obj:
-            for obj in bpy.context.scene.objects:
-                if obj.vmdl_enum_type == "ROOT": root_obj = obj; break
+        root_obj = find_export_root(context)
         if not root_obj:
             self.report({'ERROR'}, "Nelze najít žádný VMDL Root objekt pro export."); return {'CANCELLED'}
 
-        vmdl_metadata = {
-            'vmdl_version': context.scene.vmdl_export.version,
-            'materials': {},
-            'objects': {}
-            # Odebrána logika s indexy, není potřeba
-        }
-        all_objs_to_export = []
-        def gather_objects(obj):
-            all_objs_to_export.append(obj)
-            for child in obj.children: gather_objects(child)
-        gather_objects(root_obj)
-
-        if not any(o.type == 'MESH' and o.vmdl_enum_type == "MESH" for o in all_objs_to_export):
-            self.report({'ERROR'}, "VMDL Root neobsahuje žádný viditelný MESH objekt."); return {'CANCELLED'}
-        
-        unique_materials = set(mat for o in all_objs_to_export if o.type == 'MESH' for mat in o.data.materials if mat)
-        unique_images = set()
-
-        for mat in unique_materials:
-            props = getattr(mat, 'vmdl_shader', None)
-            if not props or not props.shader_name: continue
-            mat_data = {'shader_name': props.shader_name, 'parameters': {}, 'textures': {}}
-            for p in props.parameters:
-                if p.type == 'float': val = p.float_value
-                elif p.type == 'vector4': val = list(p.vector_value)
-                elif p.type == 'bool': val = p.bool_value
-                else: continue
-                mat_data['parameters'][p.name] = val
-            for t in props.textures:
-                if t.image:
-                    mat_data['textures'][t.name] = os.path.basename(t.image.name)
-                    unique_images.add(t.image)
-            # Ukládáme data pod původním jménem materiálu
-            vmdl_metadata['materials'][mat.name] = mat_data
-            
-        for obj in all_objs_to_export:
-            obj_type = obj.vmdl_enum_type
-            if obj_type == 'NONE': continue
-            obj_data = {'vmdl_type': obj_type}
-            if obj_type == 'COLLIDER': obj_data['collider_type'] = obj.vmdl_collider.collider_type
-            elif obj_type == 'MOUNTPOINT':
-                obj_data['forward_vector'] = list(obj.vmdl_mountpoint.forward_vector)
-                obj_data['up_vector'] = list(obj.vmdl_mountpoint.up_vector)
-            vmdl_metadata['objects'][obj.name] = obj_data
-        if bpy.context.mode != 'OBJECT':
-            bpy.ops.object.mode_set(mode='OBJECT')
-        bpy.ops.object.select_all(action='DESELECT')
-        for obj in all_objs_to_export: obj.select_set(True)
-        context.view_layer.objects.active = root_obj
-
+        settings = context.scene.vmdl_export
+        probe = probe_from_settings('export', settings, root=root_obj.name, filepath=self.filepath)
         try:
-            with tempfile.TemporaryDirectory() as tempdir:
-                temp_glb_path = os.path.join(tempdir, 'model.glb')
-                temp_json_path = os.path.join(tempdir, 'metadata.json')
-                
-                temp_tex_dir = os.path.join(tempdir, 'tex')
-                os.makedirs(temp_tex_dir)
-
-                for image in unique_images:
-                    if not image.has_data: continue
-                    dest_filename = os.path.basename(image.name)
-                    dest_filepath = os.path.join(temp_tex_dir, dest_filename)
-                    
-                    if image.packed_file or not os.path.exists(bpy.path.abspath(image.filepath_raw)):
-                        temp_img = image.copy()
-                        temp_img.filepath_raw = dest_filepath
-                        temp_img.file_format = image.file_format or 'PNG'
-                        temp_img.save()
-                        bpy.data.images.remove(temp_img)
-                    else:
-                        shutil.copy(bpy.path.abspath(image.filepath_raw), dest_filepath)
-
-                bpy.ops.export_scene.gltf(
-                    filepath=temp_glb_path,
-                    export_format='GLB',
-                    use_selection=True,
-                    export_attributes=True,
-                    export_image_format='NONE',
-                    export_extras=False
-                )
-
-                with open(temp_json_path, 'w', encoding='utf-8') as f:
-                    json.dump(vmdl_metadata, f, ensure_ascii=False, indent=4)
-                
-                with zipfile.ZipFile(self.filepath, 'w', zipfile.ZIP_DEFLATED) as zf:
-                    zf.write(temp_glb_path, arcname='model.glb')
-                    zf.write(temp_json_path, arcname='metadata.json')
-                    for filename in os.listdir(temp_tex_dir):
-                        zf.write(os.path.join(temp_tex_dir, filename), arcname=f'tex/{filename}')
-
+            if self.metadata_only:
+                with probe.timer.phase('metadata_update'):
+                    stats = update_archive_metadata(context, root_obj, self.filepath)
+                self.report({'INFO'}, f"Metadata v {self.filepath} aktualizována ({stats['elapsed']:.2f} s).")
+                return {'FINISHED'}
+            stats = export_root(context, root_obj, self.filepath, timer=probe.timer)
+        except VMDLExportError as e:
+            self.report({'ERROR'}, str(e)); return {'CANCELLED'}
         except Exception as e:
             self.report({'ERROR'}, f"Export VMDL archivu selhal: {e}")
             import traceback
             traceback.print_exc()
             return {'CANCELLED'}
+        finally:
+            result = probe.finish()
+
+        if result.get('profile'):
+            self.report({'INFO'}, f"Profil uložen do {result['profile']}")
+        self.report({'INFO'}, f"Fáze exportu: {probe.timer.summary()}")
+        if stats['vertex_colors']:
+            self.report({'INFO'}, f"Kompaktní vertex barvy: ušetřeno {stats['vertex_colors']['saved_bytes']} B GLB "
+                                  f"({stats['vertex_colors']['point_layers']} vrstev v doméně vrcholů).")
+        cache_info = f", cache {stats['cache_hits']}/{stats['cache_hits'] + stats['cache_misses']}" if context.scene.vmdl_export.use_build_cache else ""
+        self.report({'INFO'}, f"Export VMDL do {self.filepath} byl úspěšný ({stats['elapsed']:.2f} s{cache_info}).")
+        return {'FINISHED'}
+
 
-        self.report({'INFO'}, f"Export VMDL do {self.filepath} byl úspěšný.")
-        
-        if context.scene.vmdl_export.debug_show_extras:
-            print("\n================= DEBUG VMDL METADATA ==================")
-            print(json.dumps(vmdl_metadata, indent=2, ensure_ascii=False))
-            print("============== KONEC DEBUG VMDL METADATA ===============\n")
-        
-        return {'FINISHED'}
\ No newline at end of file
+class VMDL_OT_export_vmdl_batch(bpy.types.Operator):
+    """Exportuje všechny VMDL rooty (nebo rooty vybraných objektů) do adresáře, každý do vlastního .vmdl"""
+    bl_idname = "vmdl.export_vmdl_batch"
+    bl_label = "Export All VMDL Roots"
+    directory: bpy.props.StringProperty(name="Adresář", subtype='DIR_PATH')
+    selected_only: bpy.props.BoolProperty(
+        name="Jen vybrané",
+        description="Exportuje jen rooty vybraných objektů",
+        default=False
+    )
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        if not self.directory:
+            self.report({'ERROR'}, "Není zadán cílový adresář."); return {'CANCELLED'}
+        roots = find_export_roots(context, self.selected_only)
+        if not roots:
+            self.report({'ERROR'}, "Nelze najít žádný VMDL Root objekt pro export."); return {'CANCELLED'}
+
+        directory = bpy.path.abspath(self.directory)
+        probe = probe_from_settings('export_batch', context.scene.vmdl_export, directory=directory)
+        try:
+            results = export_roots(context, roots, directory, timer=probe.timer)
+        finally:
+            probe.finish()
+        failed = [name for name, stats, _ in results if stats is None]
+        elapsed = sum(stats['elapsed'] for _, stats, _ in results if stats)
+        if failed:
+            self.report({'WARNING'}, f"Exportováno {len(results) - len(failed)}/{len(results)} rootů, selhaly: {', '.join(failed)}")
+        else:
+            self.report({'INFO'}, f"Exportováno {len(results)} rootů do {directory} ({elapsed:.2f} s).")
+        return {'FINISHED'} if len(failed) < len(results) else {'CANCELLED'}
@@ -0,0 +1,147 @@
+# ================================================
+# FILE: glb_quantize.py
+# ================================================
+"""
+Úprava hotového GLB bez Blenderu: float barevné atributy vrcholů (Color1/Color2
+jako vlastní atributy '_COLOR1'/'_COLOR2', případně COLOR_n) se převedou na
+normalizované uint8. Hodnoty 0..1 z 8bitových vrstev tím nic neztratí a zabírají
+čtvrtinu místa. Mění se jen JSON a BIN chunk, ostatní data zůstanou.
+"""
+import json
+
+import numpy as np
+
+from .vmdl_archive import GLB_CHUNK_BIN, GLB_CHUNK_HEADER, GLB_CHUNK_JSON, GLB_HEADER, GLB_MAGIC
+
+GLTF_FLOAT = 5126
+GLTF_UNSIGNED_BYTE = 5121
+COMPONENTS = {'SCALAR': 1, 'VEC2': 2, 'VEC3': 3, 'VEC4': 4}
+# Prvky atributů vrcholů musí začínat na násobku 4 bajtů
+VERTEX_ALIGNMENT = 4
+
+
+def read_glb(data):
+    """Vrací (glTF JSON, BIN chunk jako bytes nebo b"")."""
+    magic, version, length = GLB_HEADER.unpack_from(data, 0)
+    if magic != GLB_MAGIC:
+        raise ValueError("Soubor není GLB.")
+    offset = GLB_HEADER.size
+    gltf, binary = None, b""
+    while offset < length:
+        chunk_length, chunk_type = GLB_CHUNK_HEADER.unpack_from(data, offset)
+        offset += GLB_CHUNK_HEADER.size
+        chunk = data[offset:offset + chunk_length]
+        if chunk_type == GLB_CHUNK_JSON:
+            gltf = json.loads(bytes(chunk).decode('utf-8'))
+        elif chunk_type == GLB_CHUNK_BIN:
+            binary = bytes(chunk)
+        offset += chunk_length
+    if gltf is None:
+        raise ValueError("GLB nemá JSON chunk.")
+    return gltf, binary
+
+
+def write_glb(gltf, binary):
+    json_chunk = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    binary += b"\0" * (-len(binary) % 4)
+    length = GLB_HEADER.size + GLB_CHUNK_HEADER.size + len(json_chunk)
+    if binary:
+        length += GLB_CHUNK_HEADER.size + len(binary)
+    parts = [GLB_HEADER.pack(GLB_MAGIC, 2, length), GLB_CHUNK_HEADER.pack(len(json_chunk), GLB_CHUNK_JSON), json_chunk]
+    if binary:
+        parts += [GLB_CHUNK_HEADER.pack(len(binary), GLB_CHUNK_BIN), binary]
+    return b"".join(parts)
+
+
+def _color_accessors(gltf, attribute_names):
+    """Indexy accessorů barevných atributů, které jde bezpečně převést na uint8."""
+    names = {name.upper() for name in attribute_names}
+    candidates = set()
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh.get('primitives', []):
+            for attr_name, accessor_index in primitive.get('attributes', {}).items():
+                if attr_name.upper() in names or attr_name.startswith('COLOR_'):
+                    candidates.add(accessor_index)
+    # Buffer view smí patřit jen jednomu accessoru, jinak by se přepsala cizí data
+    view_users = {}
+    for accessor in gltf.get('accessors', []):
+        if 'bufferView' in accessor:
+            view_users[accessor['bufferView']] = view_users.get(accessor['bufferView'], 0) + 1
+    result = []
+    for index in sorted(candidates):
+        accessor = gltf['accessors'][index]
+        view_index = accessor.get('bufferView')
+        if (accessor.get('componentType') != GLTF_FLOAT or accessor.get('type') not in ('VEC3', 'VEC4')
+                or 'sparse' in accessor or view_index is None or view_users.get(view_index) != 1):
+            continue
+        view = gltf['bufferViews'][view_index]
+        if view.get('byteStride', COMPONENTS[accessor['type']] * 4) != COMPONENTS[accessor['type']] * 4:
+            continue  # prokládaná data
+        result.append(index)
+    return result
+
+
+def quantize_colors(data, attribute_names=('_COLOR1', '_COLOR2')):
+    """
+    Převede float barevné atributy v GLB (bytes) na normalizované uint8.
+    Atributy s hodnotami mimo 0..1 se nechají beze změny. Vrací (nový GLB, počet
+    převedených accessorů); bez změny vrací původní data.
+    """
+    gltf, binary = read_glb(data)
+    converted = {}
+    for index in _color_accessors(gltf, attribute_names):
+        accessor = gltf['accessors'][index]
+        view = gltf['bufferViews'][accessor['bufferView']]
+        components = COMPONENTS[accessor['type']]
+        start = view.get('byteOffset', 0) + accessor.get('byteOffset', 0)
+        values = np.frombuffer(binary, dtype='<f4', count=accessor['count'] * components, offset=start)
+        if values.size and (values.min() < 0.0 or values.max() > 1.0):
+            continue
+        quantized = np.zeros((accessor['count'], VERTEX_ALIGNMENT), dtype=np.uint8)
+        quantized[:, :components] = np.rint(values.reshape(-1, components) * 255.0)
+        converted[accessor['bufferView']] = (index, quantized)
+    if not converted:
+        return data, 0
+
+    # BIN se složí znovu: převedené buffer view nahradí uint8 data, ostatní se zkopírují
+    chunks = []
+    size = 0
+    for view_index, view in enumerate(gltf['bufferViews']):
+        if view.get('buffer', 0) != 0:
+            continue
+        if view_index in converted:
+            index, quantized = converted[view_index]
+            accessor = gltf['accessors'][index]
+            view_bytes = quantized.tobytes()
+            accessor.update(componentType=GLTF_UNSIGNED_BYTE, normalized=True, byteOffset=0)
+            # min/max jsou u atributů barev nepovinné a v uint8 by měly jiný význam
+            accessor.pop('min', None)
+            accessor.pop('max', None)
+            if COMPONENTS[accessor['type']] != VERTEX_ALIGNMENT:
+                view['byteStride'] = VERTEX_ALIGNMENT
+            else:
+                view.pop('byteStride', None)
+        else:
+            view_bytes = binary[view.get('byteOffset', 0):view.get('byteOffset', 0) + view['byteLength']]
+        padding = -size % VERTEX_ALIGNMENT
+        chunks.append(b"\0" * padding)
+        size += padding
+        view['byteOffset'] = size
+        view['byteLength'] = len(view_bytes)
+        chunks.append(view_bytes)
+        size += len(view_bytes)
+    binary = b"".join(chunks)
+    gltf['buffers'][0]['byteLength'] = len(binary)
+    return write_glb(gltf, binary), len(converted)
+
+
+def quantize_glb_file(path, attribute_names=('_COLOR1', '_COLOR2')):
+    """Upraví GLB soubor na místě. Vrací (velikost před, velikost po, počet převedených accessorů)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    new_data, converted = quantize_colors(data, attribute_names)
+    if converted:
+        with open(path, 'wb') as f:
+            f.write(new_data)
+    return len(data), len(new_data), converted
@@ -1,11 +1,224 @@
 import bpy
 import json
 import os
+import re
+import shutil
 import tempfile
 import zipfile
 from bpy_extras.io_utils import ImportHelper
+from .export_vmdl import probe_from_settings
+from .instrumentation import PhaseTimer
+from .texture_utils import IMAGE_HASH_PROP, image_hash_index
+from .shader_materials import delayed_shader_update, setup_principled_node_graph, suspended_shader_updates
+from .vmdl_archive import (
+    COMPRESSION_NAMES, GLB_NAME, METADATA_NAME, content_hasher, member_data_offset, read_manifest,
+    referenced_textures, texture_member_name,
+)
 
-def apply_material_properties(mat, mat_data, temp_dir):
+# Blender při kolizi jmen přidá nebo zvýší číselnou příponu: 'Hull' -> 'Hull.001'
+NAME_SUFFIX = re.compile(r"^(.*)\.\d{3,}$")
+
+
+def base_name(name):
+    match = NAME_SUFFIX.match(name)
+    return match.group(1) if match else name
+
+
+def match_imported_names(original_names, new_items):
+    """
+    Přiřadí jména materiálů nebo objektů z metadat nově importovaným datablockům.
+    Nejdřív přesná shoda jména, pak shoda bez přípony '.001' (datablock
+    přejmenovaný kvůli kolizi s existujícím). Každý importovaný datablock se
+    použije nejvýš jednou. Vrací slovník původní jméno -> datablock.
+    """
+    by_name = {item.name: item for item in new_items}
+    by_base = {}
+    for item in sorted(new_items, key=lambda item: item.name):
+        by_base.setdefault(base_name(item.name), []).append(item)
+
+    matched = {}
+    claimed = set()
+    pending = []
+    for name in original_names:
+        datablock = by_name.get(name)
+        if datablock is None:
+            pending.append(name)
+        else:
+            matched[name] = datablock
+            claimed.add(datablock)
+    for name in pending:
+        candidates = by_base.get(base_name(name), [])
+        while candidates and candidates[0] in claimed:
+            candidates.pop(0)
+        if candidates:
+            matched[name] = candidates.pop(0)
+            claimed.add(matched[name])
+    return matched
+
+
+# Otisk importovaného modelu na ROOT objektu, podle kterého import jako instance najde předlohu
+INSTANCE_FINGERPRINT_PROP = "vmdl_glb_fingerprint"
+
+
+def archive_fingerprint(manifest, metadata_bytes, glb_path=None):
+    """
+    Otisk modelu z hashů model.glb a metadata.json. Hash GLB se bere z manifestu,
+    u starších archivů se spočítá z už rozbaleného souboru glb_path; bez něj vrací None.
+    Metadata jsou v otisku proto, aby instance nesdílela materiály s jinými
+    parametry shaderů.
+    """
+    glb_hash = manifest.get(GLB_NAME, {}).get('hash')
+    if not glb_hash:
+        if glb_path is None:
+            return None
+        hasher = content_hasher()
+        with open(glb_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        glb_hash = hasher.hexdigest()
+    metadata_hasher = content_hasher()
+    metadata_hasher.update(metadata_bytes)
+    fingerprint = content_hasher()
+    fingerprint.update(glb_hash.encode('ascii'))
+    fingerprint.update(metadata_hasher.hexdigest().encode('ascii'))
+    return fingerprint.hexdigest()
+
+
+def find_instance_source(fingerprint):
+    for obj in bpy.data.objects:
+        if obj.vmdl_enum_type == "ROOT" and obj.get(INSTANCE_FINGERPRINT_PROP) == fingerprint and obj.users_collection:
+            return obj
+    return None
+
+
+def instance_hierarchy(context, root_obj):
+    """
+    Zkopíruje ROOT a všechny jeho potomky (meshe, collidery, mountpointy) do aktivní
+    kolekce. Kopie sdílí data meshů, a tím i materiály, s předlohou.
+    """
+    originals = [root_obj] + list(root_obj.children_recursive)
+    copies = {orig: orig.copy() for orig in originals}
+    for orig, copy in copies.items():
+        context.collection.objects.link(copy)
+        if orig.parent in copies:
+            copy.parent = copies[orig.parent]
+    return copies[root_obj], list(copies.values())
+
+
+class ArchiveTextureSource:
+    """
+    Zpřístupňuje textury z .vmdl archivu pro apply_material_properties.
+    Odkazy z materiálů se překládají přes tabulku 'textures' v metadatech
+    (hash obsahu -> člen archivu); starší archivy odkazují přímo na 'tex/<jméno>'.
+    Komprimované členy se rozbalí do dočasného adresáře, nekomprimované (ZIP_STORED)
+    se předají Blenderu přímo z archivu jako zabalená data, bez zápisu na disk.
+    Každý člen se načte jen jednou, i když ho používá více materiálů, a obrázek
+    se stejným obsahem z dřívějšího importu (i z jiného archivu) se použije znovu.
+    Nové obrázky se zabalí do .blend, takže přežijí úklid dočasného adresáře.
+    S manifestem archivu se členy, které mu neodpovídají, přeskočí a místo
+    na disku i buffery pro data se vyhradí předem podle známých velikostí.
+    """
+
+    def __init__(self, archive_path, temp_dir, texture_table=None, manifest=None):
+        self.archive_path = archive_path
+        self.temp_dir = temp_dir
+        self._entries = texture_table or {}
+        self._manifest = manifest or {}
+        self._stored = {}
+        self._images = {}
+        self._hash_index = None
+
+    def member_name(self, texture_ref):
+        return texture_member_name(self._entries, texture_ref)
+
+    def image_name(self, texture_ref):
+        entry = self._entries.get(texture_ref)
+        return entry.get('name', texture_ref) if entry else texture_ref
+
+    def extract(self, zf, texture_refs):
+        to_extract = []
+        for member_name in {self.member_name(ref) for ref in texture_refs}:
+            try:
+                zinfo = zf.getinfo(member_name)
+            except KeyError:
+                continue
+            entry = self._manifest.get(member_name)
+            if entry and (entry.get('size'), entry.get('crc'), entry.get('method')) != \
+                    (zinfo.file_size, zinfo.CRC, COMPRESSION_NAMES.get(zinfo.compress_type)):
+                print(f"VAROVÁNÍ: Textura '{member_name}' neodpovídá manifestu archivu, přeskakuji ji.")
+                continue
+            if zinfo.compress_type == zipfile.ZIP_STORED:
+                self._stored[member_name] = zinfo
+            else:
+                to_extract.append(zinfo)
+        needed = sum(zinfo.file_size for zinfo in to_extract)
+        if needed > shutil.disk_usage(self.temp_dir).free:
+            raise OSError(f"Na disku pro dočasné soubory chybí místo pro textury ({needed / 1048576:.1f} MB).")
+        for zinfo in to_extract:
+            zf.extract(zinfo, self.temp_dir)
+
+    def path_for(self, texture_ref):
+        return self.path_for_member(self.member_name(texture_ref))
+
+    def exists(self, texture_ref):
+        return self.member_name(texture_ref) in self._stored or os.path.exists(self.path_for(texture_ref))
+
+    def _read_stored(self, zinfo):
+        # Nekomprimovaná data jedním čtením v plné velikosti, bez skládání bloků
+        with open(self.archive_path, 'rb') as f:
+            f.seek(member_data_offset(f, zinfo))
+            return f.read(zinfo.file_size)
+
+    def content_hash(self, member_name, data=None):
+        """Hash obsahu z manifestu, u starších archivů spočítaný z dat."""
+        entry = self._manifest.get(member_name)
+        if entry and entry.get('hash'):
+            return entry['hash']
+        hasher = content_hasher()
+        if data is not None:
+            hasher.update(data)
+        else:
+            with open(self.path_for_member(member_name), 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def path_for_member(self, member_name):
+        return os.path.join(self.temp_dir, *member_name.split('/'))
+
+    def load_image(self, texture_ref):
+        member_name = self.member_name(texture_ref)
+        image = self._images.get(member_name)
+        if image is not None:
+            return image
+        zinfo = self._stored.get(member_name)
+        data = None
+        if zinfo is not None and not self._manifest.get(member_name, {}).get('hash'):
+            data = self._read_stored(zinfo)
+        content_hash = self.content_hash(member_name, data)
+        if self._hash_index is None:
+            self._hash_index = image_hash_index()
+        image = self._hash_index.get(content_hash)
+        if image is not None:
+            print(f"INFO: Textura '{self.image_name(texture_ref)}' už je načtená jako '{image.name}', používám ji znovu.")
+        elif zinfo is None:
+            image = bpy.data.images.load(self.path_for(texture_ref))
+            image.name = self.image_name(texture_ref)
+            image.pack()
+        else:
+            if data is None:
+                data = self._read_stored(zinfo)
+            image = bpy.data.images.new(self.image_name(texture_ref), 1, 1)
+            image.pack(data=data, data_len=len(data))
+            image.source = 'FILE'
+        if IMAGE_HASH_PROP not in image:
+            image[IMAGE_HASH_PROP] = content_hash
+            self._hash_index[content_hash] = image
+        self._images[member_name] = image
+        return image
+
+
+def apply_material_properties(mat, mat_data, textures):
     if not mat or not mat_data:
         return
 
@@ -18,90 +231,130 @@ def apply_material_properties(mat, mat_data, temp_dir):
             elif param.type == 'vector4': param.vector_value = value
             elif param.type == 'bool': param.bool_value = value
     
-    for vmdl_slot_name, image_filename in mat_data.get('textures', {}).items():
-        if vmdl_slot_name in shader_props.textures and image_filename:
-            texture_path = os.path.join(temp_dir, 'tex', image_filename)
+    for vmdl_slot_name, texture_ref in mat_data.get('textures', {}).items():
+        if vmdl_slot_name in shader_props.textures and texture_ref:
+            texture_path = textures.path_for(texture_ref)
             
-            if os.path.exists(texture_path):
+            if textures.exists(texture_ref):
                 try:
-                    loaded_image = bpy.data.images.load(texture_path, check_existing=True)
+                    loaded_image = textures.load_image(texture_ref)
                     shader_props.textures[vmdl_slot_name].image = loaded_image
-                    print(f"INFO: Pro '{mat.name}' načtena textura '{image_filename}' do slotu '{vmdl_slot_name}'.")
+                    print(f"INFO: Pro '{mat.name}' načtena textura '{textures.image_name(texture_ref)}' do slotu '{vmdl_slot_name}'.")
                 except Exception as e:
                     print(f"CHYBA: Nepodařilo se načíst texturu '{texture_path}': {e}")
             else:
                 print(f"VAROVÁNÍ: Textura '{texture_path}' nebyla v archivu nalezena.")
 
-    from .shader_materials import setup_principled_node_graph
     setup_principled_node_graph(mat)
 
 
-class VMDL_OT_import_vmdl(bpy.types.Operator, ImportHelper):
-    bl_idname = "vmdl.import_vmdl"
-    bl_label = "Import VMDL Archive"
-    filename_ext = ".vmdl"
-    filter_glob: bpy.props.StringProperty(default="*.vmdl", options={'HIDDEN'})
+class VMDLImportError(Exception):
+    """Chyba vstupního archivu, kterou operátor jen nahlásí uživateli."""
 
-    def execute(self, context):
-        vmdl_metadata = None
-        
-        try:
-            temp_dir_obj = tempfile.TemporaryDirectory()
-            tempdir = temp_dir_obj.name
 
-            with zipfile.ZipFile(self.filepath, 'r') as zf:
-                zf.extractall(tempdir)
-            
-            temp_glb_path = os.path.join(tempdir, 'model.glb')
-            temp_json_path = os.path.join(tempdir, 'metadata.json')
+def import_archive(context, filepath, timer=None, deferred=True, on_finished=None, as_instance=False):
+    """
+    Importuje .vmdl archiv do scény. Vrací slovník se statistikami (časy fází
+    v 'phases'). Data materiálů se s deferred=True aplikují v jednom průchodu
+    z časovače, s deferred=False hned, např. v režimu bez UI, kde časovače neběží.
+    on_finished() se zavolá po aplikaci všech materiálů a úklidu dočasného adresáře.
+    S as_instance se model, který už je ve scéně importovaný (stejný otisk), jen
+    zkopíruje jako nové objekty sdílející jeho meshe a materiály.
+    Bez timer si import založí vlastní měření a ukončí ho (i tracemalloc) spolu
+    s on_finished, tedy až po odložené aplikaci materiálů.
+    """
+    if timer is not None:
+        return _import_archive(context, filepath, timer, deferred, on_finished, as_instance)
+    timer = PhaseTimer("import", context.scene.vmdl_export.track_memory)
+
+    def finished():
+        timer.stop()
+        if on_finished: on_finished()
+
+    try:
+        return _import_archive(context, filepath, timer, deferred, finished, as_instance)
+    except Exception:
+        timer.stop()
+        raise
+
+
+def _import_archive(context, filepath, timer, deferred, on_finished, as_instance):
+    temp_dir_obj = tempfile.TemporaryDirectory()
+    tempdir = temp_dir_obj.name
+    try:
+        # Nejdřív metadata, pak jen GLB a textury, které materiály opravdu použijí
+        with timer.phase('extraction'):
+            with zipfile.ZipFile(filepath, 'r') as zf:
+                metadata_bytes = zf.read(METADATA_NAME)
+                vmdl_metadata = json.loads(metadata_bytes.decode('utf-8'))
+                manifest = read_manifest(zf)
+                temp_glb_path = os.path.join(tempdir, GLB_NAME)
+                # Bez hashe GLB v manifestu se otisk spočítá až z rozbaleného souboru
+                fingerprint = archive_fingerprint(manifest, metadata_bytes)
+                source_root = None
+                if as_instance:
+                    if fingerprint is None:
+                        zf.extract(GLB_NAME, tempdir)
+                        fingerprint = archive_fingerprint(manifest, metadata_bytes, temp_glb_path)
+                    source_root = find_instance_source(fingerprint)
+                if source_root is None:
+                    if not os.path.exists(temp_glb_path):
+                        zf.extract(GLB_NAME, tempdir)
+                    textures = ArchiveTextureSource(filepath, tempdir, vmdl_metadata.get('textures'), manifest)
+                    textures.extract(zf, referenced_textures(vmdl_metadata))
 
-            # Zjistíme materiály PŘED importem
+        if source_root is not None:
+            with timer.phase('instancing'):
+                root_obj, new_objects = instance_hierarchy(context, source_root)
+            temp_dir_obj.cleanup()
+            if on_finished: on_finished()
+            print(f"INFO: '{os.path.basename(filepath)}' vložen jako instance '{source_root.name}'.")
+            return {
+                'filepath': filepath,
+                'elapsed': timer.elapsed,
+                'materials': 0,
+                'objects': len(new_objects),
+                'instance_of': source_root.name,
+                'root': root_obj.name,
+                'phases': timer.as_dict()['phases'],
+                'memory': timer.memory,
+            }
+
+        with timer.phase('gltf_import'):
+            # Zjistíme materiály a objekty PŘED importem
             mats_before = set(bpy.data.materials)
-            
+            objects_before = set(bpy.data.objects)
+
             bpy.ops.import_scene.gltf(filepath=temp_glb_path, loglevel=50, import_pack_images=False)
-            
+
             # Zjistíme materiály PO importu
             mats_after = set(bpy.data.materials)
-            
+
             # Získáme seznam právě vytvořených materiálů
             newly_imported_mats = list(mats_after - mats_before)
-            
-            with open(temp_json_path, 'r', encoding='utf-8') as f:
-                vmdl_metadata = json.load(f)
+            newly_imported_objects = list(set(bpy.data.objects) - objects_before)
+    except Exception:
+        temp_dir_obj.cleanup()
+        raise
 
-        except Exception as e:
-            self.report({'ERROR'}, f"Import VMDL archivu selhal: {e}")
-            import traceback
-            traceback.print_exc()
-            if 'temp_dir_obj' in locals(): temp_dir_obj.cleanup()
-            return {'CANCELLED'}
-        
-        if not vmdl_metadata:
-            self.report({'WARNING'}, "Metadata se nepodařilo načíst.")
-            temp_dir_obj.cleanup()
-            return {'FINISHED'}
+    if not vmdl_metadata:
+        temp_dir_obj.cleanup()
+        raise VMDLImportError("Metadata se nepodařilo načíst.")
 
+    with timer.phase('material_matching'):
         # Vytvoříme mapu: Původní jméno -> Skutečný Blender materiál
-        final_mat_map = {}
         original_mats_from_meta = vmdl_metadata.get('materials', {})
+        final_mat_map = match_imported_names(original_mats_from_meta.keys(), newly_imported_mats)
+        for orig_name in (name for name in original_mats_from_meta if name not in final_mat_map):
+            print(f"VAROVÁNÍ: Nepodařilo se v importovaných datech najít materiál pro '{orig_name}'.")
 
-        for orig_name in original_mats_from_meta.keys():
-            found_mat = None
-            # Prohledáme nově importované materiály
-            for new_mat in newly_imported_mats:
-                # Hledáme shodu na začátku jména, abychom pokryli případy jako ".001"
-                if new_mat.name.startswith(orig_name):
-                    found_mat = new_mat
-                    break # Našli jsme, bereme první shodu
-            
-            if found_mat:
-                final_mat_map[orig_name] = found_mat
-            else:
-                print(f"VAROVÁNÍ: Nepodařilo se v importovaných datech najít materiál pro '{orig_name}'.")
-
-        # Aplikace VMDL dat na objekty (zůstává stejná)
-        for obj_name, obj_data in vmdl_metadata.get('objects', {}).items():
-            obj = bpy.data.objects.get(obj_name)
+    with timer.phase('object_data'):
+        # Jen nově importované objekty; stejně pojmenované objekty z dřívějších importů se nemění
+        original_objs_from_meta = vmdl_metadata.get('objects', {})
+        final_obj_map = match_imported_names(original_objs_from_meta.keys(), newly_imported_objects)
+        root_obj = None
+        for obj_name, obj_data in original_objs_from_meta.items():
+            obj = final_obj_map.get(obj_name)
             if not obj: continue
             vmdl_type = obj_data.get('vmdl_type')
             if vmdl_type: obj.vmdl_enum_type = vmdl_type
@@ -110,31 +363,92 @@ class VMDL_OT_import_vmdl(bpy.types.Operator, ImportHelper):
             elif vmdl_type == 'MOUNTPOINT':
                 obj.vmdl_mountpoint.forward_vector = obj_data.get('forward_vector', (0,1,0))
                 obj.vmdl_mountpoint.up_vector = obj_data.get('up_vector', (0,0,1))
-        
-        # Aplikace VMDL dat na materiály pomocí naší nové mapy
-        for original_mat_name, mat_data in original_mats_from_meta.items():
-            final_blender_material = final_mat_map.get(original_mat_name)
-            
-            if not final_blender_material:
-                continue # Varování už bylo vypsáno výše
+            elif vmdl_type == 'ROOT':
+                root_obj = obj
+        if root_obj:
+            if fingerprint is None:
+                fingerprint = archive_fingerprint(manifest, metadata_bytes, temp_glb_path)
+            root_obj[INSTANCE_FINGERPRINT_PROP] = fingerprint
 
-            print(f"INFO: Aplikuji data na materiál '{final_blender_material.name}' (původně '{original_mat_name}').")
-            
-            shader_name = mat_data.get('shader_name')
-            if shader_name:
-                final_blender_material.vmdl_shader.shader_name = shader_name
-            
-            bpy.app.timers.register(lambda m=final_blender_material, md=mat_data, t_dir=tempdir: apply_material_properties(m, md, t_dir))
+    # Fronta materiálů; shader, parametry a textury se aplikují v jednom průchodu,
+    # graf každého materiálu se sestaví jen jednou a každá textura se načte jen jednou
+    queue = []
+    for original_mat_name, mat_data in original_mats_from_meta.items():
+        final_blender_material = final_mat_map.get(original_mat_name)
+        if not final_blender_material:
+            continue # Varování už bylo vypsáno výše
+        queue.append((original_mat_name, final_blender_material, mat_data))
 
-        def cleanup_temp_dir():
+    def drain_queue():
+        try:
+            with timer.phase('deferred_apply'), suspended_shader_updates():
+                for original_mat_name, mat, mat_data in queue:
+                    try:
+                        print(f"INFO: Aplikuji data na materiál '{mat.name}' (původně '{original_mat_name}').")
+                        shader_name = mat_data.get('shader_name')
+                        if shader_name:
+                            mat.vmdl_shader.shader_name = shader_name
+                            delayed_shader_update(mat.vmdl_shader, context, rebuild_graph=False)
+                        apply_material_properties(mat, mat_data, textures)
+                    except Exception as e:
+                        # Materiál mohl být mezitím smazán; ostatní se aplikují dál
+                        print(f"CHYBA: Data materiálu '{original_mat_name}' nelze aplikovat: {e}")
+        finally:
+            # Úklid až po vyprázdnění fronty, textury z dočasného adresáře jsou už načtené
             try:
                 temp_dir_obj.cleanup()
-                print("Dočasný adresář po importu uklizen.")
             except Exception as e:
                 print(f"Chyba při úklidu dočasného adresáře: {e}")
-            return None
+            if on_finished: on_finished()
+        return None
+
+    if deferred:
+        bpy.app.timers.register(drain_queue)
+    else:
+        drain_queue()
+
+    return {
+        'filepath': filepath,
+        'elapsed': timer.elapsed,
+        'materials': len(final_mat_map),
+        'objects': len(final_obj_map),
+        'root': root_obj.name if root_obj else None,
+        'phases': timer.as_dict()['phases'],
+        'memory': timer.memory,
+    }
+
 
-        bpy.app.timers.register(cleanup_temp_dir, first_interval=1.0)
+class VMDL_OT_import_vmdl(bpy.types.Operator, ImportHelper):
+    bl_idname = "vmdl.import_vmdl"
+    bl_label = "Import VMDL Archive"
+    filename_ext = ".vmdl"
+    filter_glob: bpy.props.StringProperty(default="*.vmdl", options={'HIDDEN'})
+    as_instance: bpy.props.BoolProperty(
+        name="Importovat jako instanci",
+        description="Pokud je stejný model už ve scéně importovaný, vytvoří jen nové objekty sdílející jeho meshe a materiály",
+        default=False
+    )
 
-        self.report({'INFO'}, f"VMDL soubor '{os.path.basename(self.filepath)}' úspěšně importován.")
-        return {'FINISHED'}
\ No newline at end of file
+    def execute(self, context):
+        # Měření končí až po odložené aplikaci materiálů, výsledek se pak ukáže v panelu a logu
+        probe = probe_from_settings('import', context.scene.vmdl_export, filepath=self.filepath)
+        try:
+            stats = import_archive(context, self.filepath, timer=probe.timer, on_finished=probe.finish,
+                                   as_instance=self.as_instance)
+        except VMDLImportError as e:
+            probe.finish(error=str(e))
+            self.report({'WARNING'}, str(e))
+            return {'FINISHED'}
+        except Exception as e:
+            probe.finish(error=str(e))
+            self.report({'ERROR'}, f"Import VMDL archivu selhal: {e}")
+            import traceback
+            traceback.print_exc()
+            return {'CANCELLED'}
+
+        if stats.get('instance_of'):
+            self.report({'INFO'}, f"VMDL soubor '{os.path.basename(self.filepath)}' vložen jako instance '{stats['instance_of']}' ({stats['elapsed']:.2f} s).")
+            return {'FINISHED'}
+        self.report({'INFO'}, f"VMDL soubor '{os.path.basename(self.filepath)}' úspěšně importován "
+                              f"({stats['elapsed']:.2f} s, {probe.timer.summary()}).")
+        return {'FINISHED'}
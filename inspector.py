@@ -1,20 +1,32 @@
-from pygltflib import GLTF2
+"""
+Hromadná inspekce .vmdl archivů (nepotřebuje Blender).
+
+Projde zadané soubory a adresáře (rekurzivně), archivy zpracuje paralelně
+v procesech a pro každý vypíše jeden řádek JSON (JSON Lines): materiály
+a shadery, textury a jejich velikosti, počty vrcholů a trojúhelníků z accessorů
+GLB, collidery a mountpointy.
+
+    python inspector.py assets/ --jobs 8 --output audit.jsonl
+    python inspector.py assets/ --headers-only       # jen adresář ZIPu a hlavička GLB
+    python inspector.py auto.vmdl --text             # čitelný výpis jednoho archivu
+"""
+import argparse
 import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+try:
+    from .vmdl_archive import GLB_NAME, VmdlArchive
+except ImportError:  # spuštěno přímo jako skript, mimo balík add-onu
+    from vmdl_archive import GLB_NAME, VmdlArchive
+
+# glTF režimy primitiv: 4 = TRIANGLES, 5 = TRIANGLE_STRIP, 6 = TRIANGLE_FAN
+GLTF_TRIANGLES = 4
+GLTF_TRIANGLE_STRIP = 5
+GLTF_TRIANGLE_FAN = 6
 
-def read_extras(gltf):
-    try:
-        # Extras bývají jako JSON string v gltf.extras
-        extras_data = gltf.extras
-        if isinstance(extras_data, str):
-            extras = json.loads(extras_data)
-        elif isinstance(extras_data, dict):
-            extras = extras_data
-        else:
-            extras = {}
-        return extras
-    except Exception as e:
-        print(f"[!] Chyba při čtení extras: {e}")
-        return {}
 
 def print_vmdl_metadata(extras):
     print("🧠 VMDL Metadata:")
@@ -39,17 +51,150 @@ def print_vmdl_metadata(extras):
             print(f"    - Forward: {obj_data.get('forward_vector')}")
             print(f"    - Up: {obj_data.get('up_vector')}")
 
-def main():
-    path = input("Zadej cestu k .glb souboru: ").strip()
+
+def primitive_triangles(gltf, primitive, vertex_count):
+    mode = primitive.get('mode', GLTF_TRIANGLES)
+    count = gltf['accessors'][primitive['indices']]['count'] if 'indices' in primitive else vertex_count
+    if mode == GLTF_TRIANGLES:
+        return count // 3
+    if mode in (GLTF_TRIANGLE_STRIP, GLTF_TRIANGLE_FAN):
+        return max(count - 2, 0)
+    return 0
+
+
+def mesh_stats(gltf):
+    """Počty vrcholů a trojúhelníků jen z accessorů (bez čtení bufferů), za unikátní meshe i za instance v uzlech."""
+    accessors = gltf.get('accessors', [])
+    meshes = []
+    for mesh in gltf.get('meshes', []):
+        vertices = triangles = 0
+        for primitive in mesh.get('primitives', []):
+            position = primitive.get('attributes', {}).get('POSITION')
+            vertex_count = accessors[position]['count'] if position is not None else 0
+            vertices += vertex_count
+            triangles += primitive_triangles(gltf, primitive, vertex_count)
+        meshes.append({'name': mesh.get('name'), 'vertices': vertices, 'triangles': triangles,
+                       'primitives': len(mesh.get('primitives', []))})
+    instanced = [meshes[node['mesh']] for node in gltf.get('nodes', []) if 'mesh' in node]
+    return {
+        'meshes': meshes,
+        'vertices': sum(m['vertices'] for m in meshes),
+        'triangles': sum(m['triangles'] for m in meshes),
+        'instanced_vertices': sum(m['vertices'] for m in instanced),
+        'instanced_triangles': sum(m['triangles'] for m in instanced),
+    }
+
+
+def inspect_archive(path, headers_only=False):
+    summary = {'archive': path, 'archive_bytes': os.path.getsize(path)}
+    with VmdlArchive(path) as archive:
+        members = archive.infolist()
+        summary['members'] = len(members)
+        summary['uncompressed_bytes'] = sum(zinfo.file_size for zinfo in members)
+        if archive.info(GLB_NAME):
+            summary['glb'] = archive.glb_layout
+        if headers_only:
+            summary['member_sizes'] = {zinfo.filename: [zinfo.file_size, zinfo.compress_size] for zinfo in members}
+            return summary
+
+        metadata = archive.metadata
+        summary['manifest'] = bool(archive.manifest)
+        summary['vmdl_version'] = metadata.get('vmdl_version')
+        shaders = {}
+        materials = {}
+        textures = {}
+        for mat_name, mat_data in metadata.get('materials', {}).items():
+            shader = mat_data.get('shader_name')
+            shaders[shader] = shaders.get(shader, 0) + 1
+            materials[mat_name] = {'shader': shader, 'textures': mat_data.get('textures', {})}
+            for texture_ref in mat_data.get('textures', {}).values():
+                if not texture_ref or texture_ref in textures: continue
+                zinfo = archive.texture_info(texture_ref)
+                entry = archive.manifest_entry(archive.texture_member(texture_ref)) or {}
+                textures[texture_ref] = {
+                    'member': archive.texture_member(texture_ref),
+                    'name': archive.texture_table.get(texture_ref, {}).get('name', texture_ref),
+                    'bytes': zinfo.file_size if zinfo else None,
+                    'compressed_bytes': zinfo.compress_size if zinfo else None,
+                    # Rozměry a formát zdrojového obrázku jen z manifestu, obrázek se nedekóduje
+                    'image': entry.get('image'),
+                }
+        summary['materials'] = materials
+        summary['shaders'] = shaders
+        summary['textures'] = textures
+        summary['texture_bytes'] = sum(t['bytes'] or 0 for t in textures.values())
+
+        objects = metadata.get('objects', {})
+        summary['colliders'] = {name: data.get('collider_type') for name, data in objects.items()
+                                if data.get('vmdl_type') == 'COLLIDER'}
+        summary['mountpoints'] = {name: {'forward': data.get('forward_vector'), 'up': data.get('up_vector')}
+                                  for name, data in objects.items() if data.get('vmdl_type') == 'MOUNTPOINT'}
+        summary['mesh'] = mesh_stats(archive.gltf) if archive.info(GLB_NAME) else None
+    return summary
+
+
+def inspect_path(path, headers_only=False):
+    # Běží v pracovním procesu; chyba jednoho archivu nesmí shodit celou dávku
     try:
-        gltf = GLTF2().load(path)
-        extras = read_extras(gltf)
-        if not extras:
-            print("⚠️  Žádné VMDL metadata ('extras') nebyly nalezeny.")
-            return
-        print_vmdl_metadata(extras)
+        return inspect_archive(path, headers_only)
     except Exception as e:
-        print(f"❌ Chyba při načítání .glb: {e}")
+        return {'archive': path, 'error': f"{type(e).__name__}: {e}"}
+
+
+def find_archives(paths):
+    archives = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                archives.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f.lower().endswith(".vmdl"))
+        else:
+            archives.append(path)
+    return archives
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspekce .vmdl archivů, výstup jako JSON Lines.")
+    parser.add_argument("paths", nargs="+", help=".vmdl soubory nebo adresáře (prochází se rekurzivně)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="počet procesů")
+    parser.add_argument("--headers-only", action="store_true", help="jen adresář ZIPu a hlavička GLB, bez metadat")
+    parser.add_argument("--output", help="soubor pro JSON Lines (výchozí stdout)")
+    parser.add_argument("--text", action="store_true", help="čitelný výpis metadat místo JSON")
+    args = parser.parse_args(argv)
+
+    archives = find_archives(args.paths)
+    if args.text:
+        for path in archives:
+            try:
+                with VmdlArchive(path) as archive:
+                    print(f"\n===== {path} =====")
+                    print_vmdl_metadata(archive.metadata)
+            except Exception as e:
+                print(f"❌ Chyba při načítání '{path}': {e}")
+        return 0
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    pool = ProcessPoolExecutor(max_workers=args.jobs) if args.jobs > 1 and len(archives) > 1 else None
+    inspect = partial(inspect_path, headers_only=args.headers_only)
+    failed = 0
+    try:
+        if pool:
+            # Po dávkách, aby se při tisících malých archivů neplatila režie za každý zvlášť
+            results = pool.map(inspect, archives, chunksize=max(1, min(64, len(archives) // (args.jobs * 4))))
+        else:
+            results = map(inspect, archives)
+        for summary in results:
+            failed += 'error' in summary
+            out.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    finally:
+        if pool:
+            pool.shutdown()
+        if out is not sys.stdout:
+            out.close()
+    if failed:
+        print(f"Chyba u {failed} z {len(archives)} archivů.", file=sys.stderr)
+    return 1 if failed else 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
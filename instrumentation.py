@@ -0,0 +1,150 @@
+# ================================================
+# FILE: instrumentation.py
+# ================================================
+"""
+Měření fází exportu a importu: čas, špičková paměť, volitelně cProfile.
+Nezávisí na bpy; napojení na nastavení scény je v export_vmdl.probe_from_settings().
+"""
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Poslední výsledek každé operace ('export', 'import'...) pro zobrazení v panelu
+LAST_RESULTS = {}
+
+
+def rss_peak_mb():
+    """Nejvyšší obsazená paměť procesu od jeho startu (MB), kde to systém umí zjistit."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux vrací kB, macOS bajty
+    return round(peak / (1048576 if os.uname().sysname == 'Darwin' else 1024), 1)
+
+
+class PhaseTimer:
+    """
+    Sbírá časy pojmenovaných fází jedné operace. Fáze se stejným jménem
+    se sčítají (např. opakovaný zápis členů archivu). S track_memory se pro
+    každou fázi měří i špička paměti alokované Pythonem (tracemalloc, zpomaluje)
+    a u všech fází se zaznamená špička paměti celého procesu.
+
+        timer = PhaseTimer("export")
+        with timer.phase("gltf_export"):
+            ...
+        print(timer.as_dict())
+    """
+
+    def __init__(self, operation, track_memory=False):
+        self.operation = operation
+        self.phases = {}
+        self.memory = {}
+        self.track_memory = track_memory
+        self._owns_tracing = track_memory and not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+        self._start = time.perf_counter()
+        self._end = None
+
+    @contextmanager
+    def phase(self, name):
+        if self.track_memory and tracemalloc.is_tracing():
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+            memory = self.memory.setdefault(name, {'python_peak_mb': None, 'rss_peak_mb': None})
+            if self.track_memory and tracemalloc.is_tracing():
+                peak = (tracemalloc.get_traced_memory()[1] - base) / 1048576
+                memory['python_peak_mb'] = round(max(peak, memory['python_peak_mb'] or 0.0), 2)
+            memory['rss_peak_mb'] = rss_peak_mb()
+
+    def merge(self, other):
+        """Přičte fáze jiného měření (např. jednoho rootu v dávkovém exportu)."""
+        for name, seconds in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        for name, memory in other.memory.items():
+            own = self.memory.setdefault(name, {'python_peak_mb': None, 'rss_peak_mb': None})
+            for key, value in memory.items():
+                if value is not None:
+                    own[key] = max(value, own[key] or 0.0)
+
+    def stop(self):
+        if self._end is None:
+            self._end = time.perf_counter()
+            if self._owns_tracing:
+                tracemalloc.stop()
+
+    @property
+    def elapsed(self):
+        return (self._end or time.perf_counter()) - self._start
+
+    def as_dict(self):
+        return {
+            'operation': self.operation,
+            'elapsed': round(self.elapsed, 6),
+            'phases': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            'memory': self.memory,
+        }
+
+    def summary(self):
+        """Krátký text pro self.report() operátoru."""
+        return ", ".join(f"{name} {seconds:.2f} s" for name, seconds in self.phases.items())
+
+
+class OperationProbe:
+    """
+    Instrumentace jednoho běhu operátoru: PhaseTimer, volitelný cProfile
+    a po dokončení zápis do LAST_RESULTS a JSON Lines logu. finish() se volá
+    až po poslední fázi, u importu tedy až po odložené aplikaci materiálů.
+    """
+
+    def __init__(self, operation, track_memory=False, log_path=None, profile_dir=None, details=None):
+        self.timer = PhaseTimer(operation, track_memory)
+        self.log_path = log_path
+        self.profile_dir = profile_dir
+        self.details = details or {}
+        self.profile_path = None
+        self._profiler = None
+        self._finished = False
+        if profile_dir:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def finish(self, **details):
+        """Ukončí měření a vrátí výsledek jako slovník. Další volání nic nedělají."""
+        if self._finished:
+            return LAST_RESULTS.get(self.timer.operation)
+        self._finished = True
+        self.timer.stop()
+        if self._profiler is not None:
+            self._profiler.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            self.profile_path = os.path.join(
+                self.profile_dir, f"vmdl_{self.timer.operation}_{time.strftime('%Y%m%d_%H%M%S')}.prof")
+            self._profiler.dump_stats(self.profile_path)
+        result = self.timer.as_dict()
+        result['timestamp'] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        result.update(self.details)
+        result.update(details)
+        if self.profile_path:
+            result['profile'] = self.profile_path
+        LAST_RESULTS[self.timer.operation] = result
+        if self.log_path:
+            try:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"VAROVÁNÍ: Log měření '{self.log_path}' nelze zapsat: {e}")
+        return result
@@ -4,8 +4,10 @@
 import bpy
 import json
 import os
+from contextlib import contextmanager
 from bpy_extras.io_utils import ImportHelper, ExportHelper
 from .shader_definitions import SHADER_DEFINITIONS
+from .vertex_color_engine import VertexColorBuffer, channel_mask
 
 class VMDL_OT_apply_tint_to_object(bpy.types.Operator):
     """Aplikuje vybraný tint na celý objekt úpravou Vertex Color."""
@@ -25,19 +27,14 @@ class VMDL_OT_apply_tint_to_object(bpy.types.Operator):
         obj = context.active_object
         mesh = obj.data
 
-        if 'Color1' not in mesh.vertex_colors:
-            mesh.vertex_colors.new(name="Color1")
+        # Vertex barvy meshe jdou zapsat jen v Object Mode
+        if context.mode != 'OBJECT': bpy.ops.object.mode_set(mode='OBJECT')
+        colors = VertexColorBuffer(mesh, ('Color1',))
+        if colors.created:
             self.report({'INFO'}, "Vytvořena chybějící vrstva 'Color1'.")
-        
-        color_layer = mesh.vertex_colors['Color1'].data
-        
-        for loop_color in color_layer:
-            original_g = loop_color.color[1]
-            original_b = loop_color.color[2]
-            original_a = loop_color.color[3]
-            loop_color.color = (self.tint_value, original_g, original_b, original_a)
 
-        mesh.update()
+        colors.set_channels('Color1', (self.tint_value, 0.0, 0.0, 0.0), channel_mask(g=False, b=False, a=False))
+        colors.flush()
         self.report({'INFO'}, f"Tint hodnota {self.tint_value:.2f} aplikována na objekt.")
         return {'FINISHED'}
 
@@ -207,7 +204,7 @@ class VMDLTextureProperty(bpy.types.PropertyGroup):
     image: bpy.props.PointerProperty(
         name="Image",
         type=bpy.types.Image,
-        update=lambda self, context: setup_principled_node_graph(self.id_data)
+        update=lambda self, context: None if shader_updates_suspended() else setup_principled_node_graph(self.id_data)
     )
 
 class VMDLParameterProperty(bpy.types.PropertyGroup):
@@ -222,7 +219,24 @@ def get_shader_enum_items(self, context):
     if not items: items.append(("NONE", "No Shaders Defined", ""))
     return items
 
-def delayed_shader_update(self, context):
+# Hromadné úpravy (import) potlačí přestavbu grafu po každé změně vlastnosti
+# a na konci zavolají setup_principled_node_graph jednou za materiál
+_suspend_depth = 0
+
+@contextmanager
+def suspended_shader_updates():
+    """Dokud trvá, změna shaderu neregistruje časovač a přiřazení textury nepřestaví graf."""
+    global _suspend_depth
+    _suspend_depth += 1
+    try:
+        yield
+    finally:
+        _suspend_depth -= 1
+
+def shader_updates_suspended():
+    return _suspend_depth > 0
+
+def delayed_shader_update(self, context, rebuild_graph=True):
     mat = self.id_data
     self.parameters.clear()
     self.textures.clear()
@@ -236,9 +250,10 @@ def delayed_shader_update(self, context):
         for t_def in shader_def.get("textures", []):
             new_t = self.textures.add(); new_t.name = t_def["name"]
     # Zavoláme hlavní funkci pro sestavení grafu po změně shaderu
-    setup_principled_node_graph(mat)
+    if rebuild_graph: setup_principled_node_graph(mat)
 
 def update_shader_name(self, context):
+    if shader_updates_suspended(): return
     bpy.app.timers.register(lambda: delayed_shader_update(self, context))
 
 class VMDLShaderProperties(bpy.types.PropertyGroup):
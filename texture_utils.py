@@ -1,7 +1,185 @@
 import bpy
+import io
 import os
 import shutil
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
 from bpy_extras.io_utils import ExportHelper
+from .vmdl_archive import COPY_CHUNK_SIZE, content_hasher
+
+
+def resolve_image_source(image, staging_dir, staged_name):
+    """
+    Běží na hlavním vlákně (sahá na bpy). Vrátí zdroj dat obrázku, se kterým
+    už se dá pracovat ve vlákně: cestu k souboru na disku, nebo bytes zabaleného
+    obrázku. Obrázky, které existují jen v paměti Blenderu, se nejdřív uloží
+    (zakódují) do staging_dir pod jménem staged_name.
+    """
+    src_path = bpy.path.abspath(image.filepath_raw)
+    if image.packed_file and not image.is_dirty:
+        return image.packed_file.data
+    if image.packed_file or not os.path.exists(src_path):
+        staged_path = os.path.join(staging_dir, staged_name)
+        # Dočasná kopie, abychom mohli změnit formát bez ovlivnění originálu
+        temp_image = image.copy()
+        try:
+            temp_image.filepath_raw = staged_path
+            temp_image.file_format = image.file_format or 'PNG' # Výchozí formát, pokud není znám
+            temp_image.save()
+        finally:
+            bpy.data.images.remove(temp_image)
+        return staged_path
+    return src_path
+
+
+def image_has_source(image):
+    """
+    Má obrázek odkud vzít data? Na rozdíl od image.has_data platí i pro obrázky,
+    které Blender ještě nenačetl do paměti (typicky v režimu bez UI, blender -b).
+    """
+    if image.has_data or image.packed_file or image.source == 'GENERATED':
+        return True
+    return os.path.exists(bpy.path.abspath(image.filepath_raw))
+
+
+def image_manifest_info(image):
+    """
+    Formát a barevný prostor obrázku pro manifest archivu. Rozměry a počet kanálů
+    jen u obrázků už načtených v paměti: image.size by jinak obrázek celý dekódoval
+    na hlavním vlákně (v režimu bez UI všechny). Ostatním je doplní read_image_header().
+    """
+    info = {
+        'format': image.file_format,
+        'colorspace': image.colorspace_settings.name,
+    }
+    if image.has_data:
+        width, height = image.size[:]
+        info.update(width=width, height=height, channels=image.channels)
+    return info
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Počet kanálů podle typu barvy v IHDR (paleta bez průhlednosti má 3)
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+# Markery SOFn; C4 (DHT), C8 (JPG) a CC (DAC) mají stejný rozsah, ale nejsou to rámce
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _read_jpeg_header(f):
+    f.read(2)  # SOI
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return {}
+        while marker[1] == 0xFF:  # výplňové bajty mezi markery
+            marker = marker[1:] + f.read(1)
+        length = struct.unpack('>H', f.read(2))[0]
+        if marker[1] in JPEG_SOF_MARKERS:
+            _, height, width, components = struct.unpack('>BHHB', f.read(6))
+            return {'width': width, 'height': height, 'channels': components}
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_image_header(source):
+    """
+    Rozměry a počet kanálů PNG nebo JPEG z hlavičky souboru, bez dekódování pixelů.
+    source je cesta nebo bytes (jako u resolve_image_source). Nesahá na bpy, běží
+    ve vlákně přípravy textur. Pro jiné formáty nebo poškozenou hlavičku vrací {}.
+    """
+    f = io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else open(source, 'rb')
+    try:
+        start = f.read(26)
+        if start[:8] == PNG_SIGNATURE and start[12:16] == b"IHDR":
+            width, height = struct.unpack('>II', start[16:24])
+            return {'width': width, 'height': height, 'channels': PNG_CHANNELS.get(start[25], 4)}
+        if start[:2] == b"\xff\xd8":
+            f.seek(0)
+            return _read_jpeg_header(f)
+    except (OSError, struct.error):
+        pass
+    finally:
+        f.close()
+    return {}
+
+
+# Hash obsahu (vmdl_archive.content_hasher) importované textury; podle něj import
+# znovu použije už načtený obrázek místo dalšího datablocku se stejnými daty
+IMAGE_HASH_PROP = "vmdl_content_hash"
+
+
+def image_content_hash(image):
+    """
+    Hash dat, pod kterým by export uložil obrázek (stejná data jako resolve_image_source),
+    nebo None u obrázků, které existují jen v paměti Blenderu a musely by se znovu zakódovat.
+    """
+    if image.is_dirty:
+        return None
+    hasher = content_hasher()
+    if image.packed_file:
+        hasher.update(image.packed_file.data)
+        return hasher.hexdigest()
+    src_path = bpy.path.abspath(image.filepath_raw)
+    if not os.path.exists(src_path):
+        return None
+    with open(src_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def image_hash_index():
+    """Obrázky v souboru podle hashe obsahu, ze kterého byly importovány."""
+    index = {}
+    for image in bpy.data.images:
+        content_hash = image.get(IMAGE_HASH_PROP)
+        # Upravené a nezabalené obrázky už nemusí odpovídat původním datům
+        if content_hash and image.packed_file and not image.is_dirty:
+            index.setdefault(content_hash, image)
+    return index
+
+
+# Přípony pro obrázky, které Blender sám kóduje (zabalené nebo jen v paměti)
+FILE_FORMAT_EXTENSIONS = {
+    'PNG': ".png",
+    'JPEG': ".jpg",
+    'TARGA': ".tga",
+    'TARGA_RAW': ".tga",
+    'BMP': ".bmp",
+    'TIFF': ".tif",
+    'OPEN_EXR': ".exr",
+    'HDR': ".hdr",
+    'WEBP': ".webp",
+}
+
+
+def image_file_extension(image, source):
+    """Přípona souboru odpovídající datům vráceným z resolve_image_source()."""
+    if isinstance(source, str):
+        ext = os.path.splitext(source)[1].lower()
+        if ext:
+            return ext
+    return FILE_FORMAT_EXTENSIONS.get(image.file_format, ".png")
+
+
+def write_image_source(source, dest_filepath):
+    """Zapíše zdroj z resolve_image_source() do souboru. Nesahá na bpy, může běžet ve vlákně."""
+    start = time.perf_counter()
+    if isinstance(source, (bytes, bytearray)):
+        with open(dest_filepath, 'wb') as f:
+            f.write(source)
+    elif os.path.abspath(source) != os.path.abspath(dest_filepath):
+        shutil.copyfile(source, dest_filepath)
+    return time.perf_counter() - start
+
+
+def print_texture_timings(title, rows):
+    """Vypíše časy zpracování jednotlivých textur: (jméno, bajty, čas bpy, čas vlákna)."""
+    print(f"\n{title}")
+    for name, size, bpy_time, worker_time in rows:
+        print(f"  {name:<48} {size / 1048576:9.2f} MB   bpy {bpy_time:7.3f} s   vlákno {worker_time:7.3f} s")
+    if rows:
+        print(f"  Celkem: {len(rows)} textur, bpy {sum(r[2] for r in rows):.3f} s, vlákna {sum(r[3] for r in rows):.3f} s")
 
 class VMDL_OT_extract_textures(bpy.types.Operator, ExportHelper):
     """
@@ -59,41 +237,42 @@ class VMDL_OT_extract_textures(bpy.types.Operator, ExportHelper):
             self.report({'INFO'}, "Na modelu nebyly nalezeny žádné VMDL textury k extrahování.")
             return {'FINISHED'}
 
-        # Uložení každého unikátního obrázku
+        # Uložení každého unikátního obrázku. Kódování obrázků z paměti musí
+        # proběhnout na hlavním vlákně, kopírování a zápis souborů běží ve vláknech.
         extracted_count = 0
         output_dir = self.filepath # Cesta k adresáři vybraná uživatelem
+        timings = []
         
-        for image in unique_images:
-            if not image.has_data:
-                print(f"Přeskakuji texturu '{image.name}', protože nemá data (je prázdná).")
-                continue
-            
-            # Název výstupního souboru bude jméno datablocku obrázku
-            dest_filename = os.path.basename(image.name)
-            dest_filepath = os.path.join(output_dir, dest_filename)
-            
-            # Robustní způsob uložení/kopírování
-            try:
-                # Pokud je obrázek zabalený v .blend souboru nebo nemá platnou cestu,
-                # uložíme ho z paměti Blenderu.
-                if image.packed_file or not os.path.exists(bpy.path.abspath(image.filepath_raw)):
-                    # Vytvoříme dočasnou kopii obrázku, abychom mohli změnit formát bez ovlivnění originálu
-                    temp_image = image.copy()
-                    temp_image.filepath_raw = dest_filepath
-                    temp_image.file_format = image.file_format or 'PNG' # Výchozí formát, pokud není znám
-                    temp_image.save()
-                    bpy.data.images.remove(temp_image) # Uklidíme dočasnou kopii
-                    print(f"Uloženo (z paměti): {dest_filename}")
-                else:
-                    # Pokud obrázek existuje na disku, jednoduše ho zkopírujeme. Je to rychlejší.
-                    shutil.copy(bpy.path.abspath(image.filepath_raw), dest_filepath)
-                    print(f"Zkopírováno: {dest_filename}")
+        with ThreadPoolExecutor(max_workers=context.scene.vmdl_export.texture_workers) as pool:
+            jobs = []
+            for image in unique_images:
+                if not image.has_data:
+                    print(f"Přeskakuji texturu '{image.name}', protože nemá data (je prázdná).")
+                    continue
                 
-                extracted_count += 1
-            except Exception as e:
-                self.report({'ERROR'}, f"Nepodařilo se uložit '{image.name}': {e}")
-                print(f"Chyba při ukládání '{image.name}': {e}")
+                # Název výstupního souboru bude jméno datablocku obrázku
+                dest_filename = os.path.basename(image.name)
+                dest_filepath = os.path.join(output_dir, dest_filename)
+                start = time.perf_counter()
+                try:
+                    source = resolve_image_source(image, output_dir, dest_filename)
+                except Exception as e:
+                    self.report({'ERROR'}, f"Nepodařilo se uložit '{image.name}': {e}")
+                    print(f"Chyba při ukládání '{image.name}': {e}")
+                    continue
+                bpy_time = time.perf_counter() - start
+                jobs.append((image.name, dest_filepath, bpy_time, pool.submit(write_image_source, source, dest_filepath)))
 
+            for image_name, dest_filepath, bpy_time, future in jobs:
+                try:
+                    worker_time = future.result()
+                except Exception as e:
+                    self.report({'ERROR'}, f"Nepodařilo se uložit '{image_name}': {e}")
+                    print(f"Chyba při ukládání '{image_name}': {e}")
+                    continue
+                extracted_count += 1
+                timings.append((os.path.basename(dest_filepath), os.path.getsize(dest_filepath), bpy_time, worker_time))
 
+        print_texture_timings("Extrakce textur:", timings)
         self.report({'INFO'}, f"Úspěšně extrahováno {extracted_count} textur do '{output_dir}'.")
         return {'FINISHED'}
\ No newline at end of file
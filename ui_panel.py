@@ -2,6 +2,7 @@
 # FILE: ui_panel.py (opraveno)
 # ================================================
 import bpy
+from .instrumentation import LAST_RESULTS
 from .shader_definitions import SHADER_DEFINITIONS
 
 class VMDL_PT_main_panel(bpy.types.Panel):
@@ -92,6 +93,8 @@ class VMDL_PT_vertex_color_panel(bpy.types.Panel):
         tools = context.scene.vmdl_vc_tools
         obj = context.active_object
 
+        layout.prop(tools, "scope")
+
         # Sekce pro malování na výběr
         paint_box = layout.box()
         paint_box.label(text="Paint on Selection", icon='VPAINT_HLT')
@@ -174,7 +177,34 @@ class VMDL_PT_export_panel(bpy.types.Panel):
         layout = self.layout; export_props = context.scene.vmdl_export; box = layout.box()
         box.label(text="Export VMDL Archive", icon='EXPORT')
         box.operator("vmdl.export_vmdl", text="Export .vmdl", icon='PACKAGE')
+        box.operator("vmdl.export_vmdl_batch", text="Exportovat všechny rooty", icon='PACKAGE')
+        op = box.operator("vmdl.export_vmdl", text="Aktualizovat jen metadata", icon='FILE_REFRESH')
+        op.metadata_only = True
+        box.prop(export_props, "compression_policy")
+        if export_props.compression_policy == 'CUSTOM':
+            row = box.row(align=True)
+            row.prop(export_props, "compression_method", text="")
+            row.prop(export_props, "compression_level")
+        box.prop(export_props, "texture_workers")
+        box.prop(export_props, "compact_vertex_colors")
+        box.prop(export_props, "use_build_cache")
+        if export_props.use_build_cache:
+            box.prop(export_props, "cache_dir")
         box.prop(export_props, "debug_show_extras")
+        measure_box = layout.box()
+        measure_box.label(text="Měření", icon='TIME')
+        measure_box.prop(export_props, "track_memory")
+        measure_box.prop(export_props, "phase_log_path")
+        measure_box.prop(export_props, "profile_operators")
+        if export_props.profile_operators:
+            measure_box.prop(export_props, "profile_dir")
+        for operation, result in LAST_RESULTS.items():
+            col = measure_box.column(align=True)
+            col.label(text=f"{operation}: {result['elapsed']:.2f} s", icon='SORTTIME')
+            for phase, seconds in result['phases'].items():
+                memory = result['memory'].get(phase, {})
+                peak = memory.get('python_peak_mb')
+                col.label(text=f"    {phase}: {seconds:.3f} s" + (f", {peak:.1f} MB" if peak is not None else ""))
         tools_box = layout.box()
         tools_box.label(text="Texture Tools", icon='TEXTURE')
         tools_box.operator("vmdl.extract_textures", text="Extract Textures", icon='PACKAGE')
\ No newline at end of file
@@ -0,0 +1,156 @@
+# ================================================
+# FILE: vertex_color_engine.py
+# ================================================
+"""
+Hromadné úpravy vrstev Color1/Color2 přes foreach_get/foreach_set a NumPy.
+Vrstvy meshe se načtou do jednoho pole (vrstva, loop, kanál), zápisy se
+maskují po kanálech (a volitelně po loopech) a zpět do meshe jde každá
+změněná vrstva jedním voláním. Mesh musí být v Object Mode.
+"""
+import numpy as np
+
+LAYER_NAMES = ('Color1', 'Color2')
+ALL_CHANNELS = (True, True, True, True)
+
+
+def channel_mask(r=True, g=True, b=True, a=True):
+    return np.array((r, g, b, a), dtype=bool)
+
+
+def selected_face_loop_mask(mesh):
+    """
+    Bool pole přes loopy meshe: True pro loopy vybraných ploch. Výběr a rozsahy
+    loopů ploch se čtou jako pole (foreach_get), mesh musí být v Object Mode.
+    """
+    polygon_count = len(mesh.polygons)
+    select = np.empty(polygon_count, dtype=bool)
+    loop_start = np.empty(polygon_count, dtype=np.int64)
+    loop_total = np.empty(polygon_count, dtype=np.int64)
+    mesh.polygons.foreach_get('select', select)
+    mesh.polygons.foreach_get('loop_start', loop_start)
+    mesh.polygons.foreach_get('loop_total', loop_total)
+    loop_mask = np.zeros(len(mesh.loops), dtype=bool)
+    starts = loop_start[select]
+    totals = loop_total[select]
+    if starts.size:
+        # Indexy loopů: začátek každé plochy zopakovaný loop_total krát plus pořadí uvnitř plochy
+        offsets = np.arange(totals.sum()) - np.repeat(np.cumsum(totals) - totals, totals)
+        loop_mask[np.repeat(starts, totals) + offsets] = True
+    return loop_mask
+
+
+class VertexColorBuffer:
+    """
+    Color1 a Color2 (nebo jiné zadané vrstvy) jednoho meshe jako jedno pole float32.
+    Vrstva se z meshe čte jen tehdy, když zápis nepřepíše všechny její hodnoty.
+
+        buffer = VertexColorBuffer(mesh)
+        buffer.set_channels('Color1', (0, 0.8, 1, 1), channel_mask(r=False, a=False))
+        buffer.flush()
+    """
+
+    def __init__(self, mesh, layer_names=LAYER_NAMES):
+        self.mesh = mesh
+        self.layer_names = tuple(layer_names)
+        self.created = []
+        for name in self.layer_names:
+            if name not in mesh.vertex_colors:
+                mesh.vertex_colors.new(name=name)
+                self.created.append(name)
+        self.colors = np.empty((len(self.layer_names), len(mesh.loops), 4), dtype=np.float32)
+        self._loaded = [False] * len(self.layer_names)
+        self._dirty = [False] * len(self.layer_names)
+
+    @property
+    def loop_count(self):
+        return self.colors.shape[1]
+
+    def _index(self, layer_name):
+        return self.layer_names.index(layer_name)
+
+    def _load(self, index):
+        if not self._loaded[index]:
+            layer = self.mesh.vertex_colors[self.layer_names[index]]
+            layer.data.foreach_get('color', self.colors[index].reshape(-1))
+            self._loaded[index] = True
+
+    def layer(self, layer_name):
+        """Hodnoty vrstvy jako pole (loop, kanál); úpravy je nutné ohlásit přes mark_dirty()."""
+        index = self._index(layer_name)
+        self._load(index)
+        return self.colors[index]
+
+    def mark_dirty(self, layer_name):
+        self._dirty[self._index(layer_name)] = True
+
+    def set_channels(self, layer_name, values, mask=ALL_CHANNELS, loop_mask=None):
+        """
+        Zapíše hodnoty (RGBA, nebo pole loop × RGBA) do kanálů zapnutých v mask,
+        s loop_mask (bool pole o délce počtu loopů) jen do vybraných loopů.
+        Vrací počet změněných loopů.
+        """
+        index = self._index(layer_name)
+        mask = np.asarray(mask, dtype=bool)
+        if not mask.any():
+            return 0
+        values = np.asarray(values, dtype=np.float32)
+        colors = self.colors[index]
+        if mask.all() and loop_mask is None and not self._loaded[index]:
+            # Přepisuje se celá vrstva, původní hodnoty netřeba číst
+            colors[...] = values
+            self._loaded[index] = True
+        else:
+            self._load(index)
+            where = mask[None, :] if loop_mask is None else np.logical_and.outer(loop_mask, mask)
+            np.copyto(colors, values, where=where)
+        self._dirty[index] = True
+        return self.loop_count if loop_mask is None else int(np.count_nonzero(loop_mask))
+
+    def flush(self, update=True):
+        """Zapíše změněné vrstvy zpět do meshe, každou jedním foreach_set."""
+        for index, name in enumerate(self.layer_names):
+            if self._dirty[index]:
+                self.mesh.vertex_colors[name].data.foreach_set('color', self.colors[index].reshape(-1))
+                self._dirty[index] = False
+        if update:
+            self.mesh.update()
+
+
+def set_layer_channels(mesh, layer_name, values, mask=ALL_CHANNELS, loop_mask=None):
+    """Jednorázový maskovaný zápis do jedné vrstvy. Vrací (počet změněných loopů, vytvořené vrstvy)."""
+    buffer = VertexColorBuffer(mesh, (layer_name,))
+    changed = buffer.set_channels(layer_name, values, mask, loop_mask)
+    buffer.flush()
+    return changed, buffer.created
+
+
+def corner_colors_per_vertex(mesh, layer_name, tolerance=0.5 / 255):
+    """
+    Hodnoty vrstvy v doméně rohů převedené na vrcholy, pokud se všechny rohy
+    každého vrcholu shodují (jinak None). Čte přes color_attributes ('color').
+    """
+    attr = mesh.color_attributes.get(layer_name)
+    if attr is None or attr.domain != 'CORNER':
+        return None
+    values = np.empty((len(mesh.loops), 4), dtype=np.float32)
+    attr.data.foreach_get('color', values.reshape(-1))
+    loop_vertex = np.empty(len(mesh.loops), dtype=np.int64)
+    mesh.loops.foreach_get('vertex_index', loop_vertex)
+    per_vertex = np.zeros((len(mesh.vertices), 4), dtype=np.float32)
+    per_vertex[loop_vertex] = values
+    if np.abs(values - per_vertex[loop_vertex]).max(initial=0.0) > tolerance:
+        return None
+    return per_vertex
+
+
+def convert_layer_to_point(mesh, layer_name, per_vertex):
+    """Nahradí vrstvu rohů bajtovým atributem v doméně vrcholů se stejným jménem."""
+    color_attributes = mesh.color_attributes
+    active_name = color_attributes.active_color_name
+    default_name = color_attributes.default_color_name
+    color_attributes.remove(color_attributes[layer_name])
+    attr = color_attributes.new(name=layer_name, type='BYTE_COLOR', domain='POINT')
+    attr.data.foreach_set('color', per_vertex.reshape(-1))
+    # Odstranění atributu posune aktivní a renderovanou vrstvu, vrátíme je
+    if active_name in color_attributes: color_attributes.active_color_name = active_name
+    if default_name in color_attributes: color_attributes.default_color_name = default_name
@@ -2,7 +2,8 @@
 # Vložte do souboru: vertex_color_utils.py (OPRAVENÁ VERZE)
 # ================================================
 import bpy
-import bmesh
+from .vmdl_utils import root_of
+from .vertex_color_engine import LAYER_NAMES, VertexColorBuffer, channel_mask, selected_face_loop_mask
 
 DEFAULT_COLOR_1 = (0.0, 0.8, 1.0, 1.0)
 DEFAULT_COLOR_2 = (0.0, 0.0, 0.0, 1.0)
@@ -22,6 +23,14 @@ class VMDLVertexColorToolsProperties(bpy.types.PropertyGroup):
     mask_g: bpy.props.BoolProperty(name="G", default=True, description="Aplikovat zelený kanál")
     mask_b: bpy.props.BoolProperty(name="B", default=True, description="Aplikovat modrý kanál")
     mask_a: bpy.props.BoolProperty(name="A", default=True, description="Aplikovat alfa kanál")
+    scope: bpy.props.EnumProperty(
+        name="Rozsah",
+        description="Na které objekty se použijí operace vyplnění, výchozích barev a globálních hodnot",
+        items=[('ACTIVE', "Aktivní", "Jen aktivní objekt"),
+               ('SELECTED', "Vybrané", "Všechny vybrané MESH objekty"),
+               ('HIERARCHY', "Celý VMDL", "Všechny MESH objekty pod ROOT aktivního objektu ('.model' i '.col')")],
+        default='ACTIVE'
+    )
     
     # Vlastnosti pro globální nastavení
     global_roughness: bpy.props.FloatProperty(
@@ -36,11 +45,52 @@ class VMDLVertexColorToolsProperties(bpy.types.PropertyGroup):
     )
 
 
+def scope_objects(context, scope):
+    """MESH objekty podle rozsahu; objekty se sdíleným meshem se vrátí jen jednou."""
+    active = context.active_object
+    if scope == 'SELECTED':
+        candidates = list(context.selected_objects) + ([active] if active else [])
+    elif scope == 'HIERARCHY':
+        root = root_of(active) if active else None
+        candidates = [root] + list(root.children_recursive) if root else [active]
+    else:
+        candidates = [active]
+    unique = {}
+    for obj in candidates:
+        if obj and obj.type == 'MESH':
+            unique.setdefault(obj.data, obj)
+    return list(unique.values())
+
+
+def apply_to_scope(context, write, layer_names=LAYER_NAMES):
+    """
+    Zavolá write(VertexColorBuffer) pro každý mesh v rozsahu z nastavení nástrojů.
+    Do Object Mode se přepne jednou pro všechny objekty, mesh.update() proběhne
+    jednou na objekt a průběh se ukazuje ve window_manager. Vrací
+    (počet objektů, počet vytvořených vrstev).
+    """
+    objects = scope_objects(context, context.scene.vmdl_vc_tools.scope)
+    if context.mode != 'OBJECT': bpy.ops.object.mode_set(mode='OBJECT')
+    wm = context.window_manager
+    wm.progress_begin(0, len(objects))
+    created = 0
+    try:
+        for index, obj in enumerate(objects):
+            colors = VertexColorBuffer(obj.data, layer_names)
+            created += len(colors.created)
+            write(colors)
+            colors.flush()
+            wm.progress_update(index + 1)
+    finally:
+        wm.progress_end()
+    return len(objects), created
+
+
 # Operátor pro globální aplikaci
 class VMDL_OT_apply_global_vertex_data(bpy.types.Operator):
     bl_idname = "vmdl.apply_global_vertex_data"
     bl_label = "Apply Global Values to Color1"
-    bl_description = "Nastaví hodnoty Roughness (G) a Normal (B) na celém objektu"
+    bl_description = "Nastaví hodnoty Roughness (G) a Normal (B) na celých objektech v rozsahu"
     bl_options = {'REGISTER', 'UNDO'}
 
     @classmethod
@@ -48,31 +98,14 @@ class VMDL_OT_apply_global_vertex_data(bpy.types.Operator):
         return context.active_object and context.active_object.type == 'MESH'
 
     def execute(self, context):
-        obj = context.active_object
-        mesh = obj.data
         tools = context.scene.vmdl_vc_tools
-        
-        if context.mode != 'OBJECT':
-            bpy.ops.object.mode_set(mode='OBJECT')
-        
-        if "Color1" not in mesh.vertex_colors:
-            mesh.vertex_colors.new(name="Color1")
-            self.report({'INFO'}, "Vytvořena chybějící vrstva 'Color1'.")
-        
-        color_layer = mesh.vertex_colors["Color1"]
-        
-        new_g = tools.global_roughness
-        new_b = tools.global_normal_strength
-        
-        # Projdeme všechny loopy a upravíme jen G a B kanály
-        for loop_color in color_layer.data:
-            current_color = loop_color.color
-            
-            # === ZDE JE OPRAVA: POUŽÍVÁME INDEXY [0] A [3] MÍSTO .r A .a ===
-            loop_color.color = (current_color[0], new_g, new_b, current_color[3])
-            
-        mesh.update()
-        self.report({'INFO'}, f"Globální hodnoty pro Roughness a Normal aplikovány.")
+        # Upravíme jen G a B kanály, R a A zůstanou
+        values = (0.0, tools.global_roughness, tools.global_normal_strength, 0.0)
+        count, created = apply_to_scope(
+            context, lambda colors: colors.set_channels("Color1", values, channel_mask(r=False, a=False)), ("Color1",))
+        if created:
+            self.report({'INFO'}, f"Vytvořena chybějící vrstva 'Color1' ({created}x).")
+        self.report({'INFO'}, f"Globální hodnoty pro Roughness a Normal aplikovány ({count} objektů).")
         return {'FINISHED'}
 
 
@@ -80,7 +113,7 @@ class VMDL_OT_apply_global_vertex_data(bpy.types.Operator):
 class VMDL_OT_set_selection_vertex_color(bpy.types.Operator):
     bl_idname = "vmdl.set_selection_vertex_color"
     bl_label = "Apply to Selection"
-    bl_description = "Aplikuje barvu a masku kanálů na vybrané plochy"
+    bl_description = "Aplikuje barvu a masku kanálů na vybrané plochy všech objektů v Edit Mode"
     bl_options = {'REGISTER', 'UNDO'}
     
     @classmethod
@@ -90,36 +123,33 @@ class VMDL_OT_set_selection_vertex_color(bpy.types.Operator):
                 context.mode == 'EDIT_MESH')
                 
     def execute(self, context):
-        obj = context.active_object
-        mesh = obj.data
         tools = context.scene.vmdl_vc_tools
         layer_name = tools.target_layer
-        
-        bm = bmesh.from_edit_mesh(mesh)
-        color_layer = bm.loops.layers.color.get(layer_name)
-        if color_layer is None:
-            color_layer = bm.loops.layers.color.new(layer_name)
-            self.report({'INFO'}, f"Vytvořena chybějící vrstva '{layer_name}'.")
-
-        source_color = tools.source_color
-        selected_loops = [loop for face in bm.faces if face.select for loop in face.loops]
-        
-        if not selected_loops:
+        # total_face_sel platí i v Edit Mode, objekty bez výběru se vůbec neupravují
+        objects = [obj for obj in (context.objects_in_mode_unique_data or [context.active_object])
+                   if obj.type == 'MESH' and obj.data.total_face_sel]
+        if not objects:
             self.report({'WARNING'}, "Nejsou vybrány žádné plochy (faces).")
             return {'CANCELLED'}
-            
-        for loop in selected_loops:
-            current_color = loop[color_layer]
-            new_color = (
-                source_color[0] if tools.mask_r else current_color[0],
-                source_color[1] if tools.mask_g else current_color[1],
-                source_color[2] if tools.mask_b else current_color[2],
-                source_color[3] if tools.mask_a else current_color[3],
-            )
-            loop[color_layer] = new_color
-            
-        bmesh.update_edit_mesh(mesh)
-        self.report({'INFO'}, f"Barva aplikována na výběr ve vrstvě '{layer_name}'.")
+
+        # Jeden přechod do Object Mode zapíše edit-meshe všech objektů do meshů,
+        # barvy se pak zapíšou polem a jeden návrat do Edit Mode je načte zpět
+        bpy.ops.object.mode_set(mode='OBJECT')
+        mask = channel_mask(tools.mask_r, tools.mask_g, tools.mask_b, tools.mask_a)
+        painted = 0
+        created = 0
+        try:
+            for obj in objects:
+                colors = VertexColorBuffer(obj.data, (layer_name,))
+                created += len(colors.created)
+                painted += colors.set_channels(layer_name, tools.source_color, mask, selected_face_loop_mask(obj.data))
+                colors.flush()
+        finally:
+            bpy.ops.object.mode_set(mode='EDIT')
+
+        if created:
+            self.report({'INFO'}, f"Vytvořena chybějící vrstva '{layer_name}' ({created}x).")
+        self.report({'INFO'}, f"Barva aplikována na {painted} loopů výběru ve vrstvě '{layer_name}' ({len(objects)} objektů).")
         return {'FINISHED'}
 
 class VMDL_OT_toggle_vertex_color_view(bpy.types.Operator):
@@ -158,7 +188,7 @@ class VMDL_OT_toggle_vertex_color_view(bpy.types.Operator):
 class VMDL_OT_fill_vertex_color(bpy.types.Operator):
     bl_idname = "vmdl.fill_vertex_color"
     bl_label = "Fill Entire Object"
-    bl_description = "Vyplní cílovou Vertex Color vrstvu barvou nastavenou v UI"
+    bl_description = "Vyplní cílovou Vertex Color vrstvu barvou nastavenou v UI na objektech v rozsahu"
     bl_options = {'REGISTER', 'UNDO'}
     
     @classmethod
@@ -166,24 +196,17 @@ class VMDL_OT_fill_vertex_color(bpy.types.Operator):
         return context.active_object and context.active_object.type == 'MESH'
         
     def execute(self, context):
-        obj = context.active_object
-        mesh = obj.data
         tools = context.scene.vmdl_vc_tools
         layer_name = tools.target_layer
-        
-        if context.mode != 'OBJECT': bpy.ops.object.mode_set(mode='OBJECT')
-        if layer_name not in mesh.vertex_colors: mesh.vertex_colors.new(name=layer_name)
-        color_layer = mesh.vertex_colors[layer_name]
-        color_to_apply = tools.source_color
-        for loop in mesh.loops: color_layer.data[loop.index].color = color_to_apply
-        mesh.update()
-        self.report({'INFO'}, f"Celý objekt vyplněn barvou ve vrstvě '{layer_name}'.")
+        color = tuple(tools.source_color)
+        count, _ = apply_to_scope(context, lambda colors: colors.set_channels(layer_name, color), (layer_name,))
+        self.report({'INFO'}, f"Vyplněno {count} objektů barvou ve vrstvě '{layer_name}'.")
         return {'FINISHED'}
 
 class VMDL_OT_set_default_vertex_colors(bpy.types.Operator):
     bl_idname = "vmdl.set_default_vertex_colors"
     bl_label = "Set Default Vertex Colors"
-    bl_description = "Vyplní Color1 a Color2 standardními hodnotami pro PBR workflow"
+    bl_description = "Vyplní Color1 a Color2 standardními hodnotami pro PBR workflow na objektech v rozsahu"
     bl_options = {'REGISTER', 'UNDO'}
     
     @classmethod
@@ -191,15 +214,10 @@ class VMDL_OT_set_default_vertex_colors(bpy.types.Operator):
         return context.active_object and context.active_object.type == 'MESH'
         
     def execute(self, context):
-        obj = context.active_object
-        mesh = obj.data
-        if context.mode != 'OBJECT': bpy.ops.object.mode_set(mode='OBJECT')
-        if "Color1" not in mesh.vertex_colors: mesh.vertex_colors.new(name="Color1")
-        color_layer_1 = mesh.vertex_colors["Color1"]
-        for loop in mesh.loops: color_layer_1.data[loop.index].color = DEFAULT_COLOR_1
-        if "Color2" not in mesh.vertex_colors: mesh.vertex_colors.new(name="Color2")
-        color_layer_2 = mesh.vertex_colors["Color2"]
-        for loop in mesh.loops: color_layer_2.data[loop.index].color = DEFAULT_COLOR_2
-        mesh.update()
-        self.report({'INFO'}, "Vertex barvy nastaveny na výchozí PBR hodnoty.")
+        def write_defaults(colors):
+            colors.set_channels("Color1", DEFAULT_COLOR_1)
+            colors.set_channels("Color2", DEFAULT_COLOR_2)
+
+        count, _ = apply_to_scope(context, write_defaults)
+        self.report({'INFO'}, f"Vertex barvy nastaveny na výchozí PBR hodnoty ({count} objektů).")
         return {'FINISHED'}
\ No newline at end of file
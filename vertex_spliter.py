@@ -1,19 +1,34 @@
 
 import bpy
-from bpy.props import StringProperty
+import numpy as np
+from contextlib import contextmanager
+from bpy.props import EnumProperty, StringProperty
 
 
 bl_info = {
     "name": "Vertex Color Channel Tool (Auto-Active)",
     "author": "ChatGPT + Mousi",
-    "version": (4, 0, 0), # Verze s automatickým výběrem
+    "version": (4, 1, 0), # Verze s přemapováním kanálů po polích
     "blender": (3, 0, 0),
     "location": "View3D > Sidebar > Vertex Colors",
-    "description": "Automaticky rozdělí aktivní vertex color vrstvu a umožní spojení kanálů.",
+    "description": "Rozdělí aktivní vertex color vrstvu, spojí a přemapuje kanály na všech vybraných objektech.",
     "category": "Mesh",
 }
 
 
+CHANNELS = "RGBA"
+# Zdroj pro kanál cíle: kanál zdrojové vrstvy, konstanta, nebo ponechat hodnotu cíle
+CHANNEL_SOURCE_ITEMS = [
+    ('R', "R", "Červený kanál zdrojové vrstvy"),
+    ('G', "G", "Zelený kanál zdrojové vrstvy"),
+    ('B', "B", "Modrý kanál zdrojové vrstvy"),
+    ('A', "A", "Alfa kanál zdrojové vrstvy"),
+    ('ZERO', "0", "Konstanta 0"),
+    ('ONE', "1", "Konstanta 1"),
+    ('KEEP', "Ponechat", "Ponechá hodnotu v cílové vrstvě"),
+]
+
+
 class VERTEXCOLOR_Props(bpy.types.PropertyGroup):
     """Vlastnosti pro náš nástroj. Sekce pro rozdělení byla odstraněna."""
     # Pro spojování zůstávají StringProperty, které obsluhuje robustní prop_search
@@ -27,11 +42,26 @@ class VERTEXCOLOR_Props(bpy.types.PropertyGroup):
         default="VC_Recombined"
     )
 
+    # Obecné přemapování: každý kanál cíle z libovolného kanálu libovolné vrstvy
+    remap_r_channel: EnumProperty(name="R z", items=CHANNEL_SOURCE_ITEMS, default='R')
+    remap_g_channel: EnumProperty(name="G z", items=CHANNEL_SOURCE_ITEMS, default='G')
+    remap_b_channel: EnumProperty(name="B z", items=CHANNEL_SOURCE_ITEMS, default='B')
+    remap_a_channel: EnumProperty(name="A z", items=CHANNEL_SOURCE_ITEMS, default='A')
+    remap_target: StringProperty(name="Cílová vrstva", default="VC_Remapped")
+    remap_domain: EnumProperty(
+        name="Doména cíle",
+        description="Doména nově vytvořené cílové vrstvy; existující vrstva si svou doménu ponechá",
+        items=[('SOURCE', "Jako zdroj", "Doména první zdrojové vrstvy"),
+               ('CORNER', "Face Corner", "Hodnota pro každý roh plochy"),
+               ('POINT', "Vertex", "Hodnota pro každý vrchol")],
+        default='SOURCE'
+    )
+
 
-def ensure_layer(obj, name):
-    """Ponecháváme původní metodu s 'POINT' doménou."""
+def ensure_layer(obj, name, domain='POINT'):
+    """Nové vrstvy mají jako dřív 'POINT' doménu, pokud se nezadá jiná."""
     if name not in obj.data.color_attributes:
-        obj.data.color_attributes.new(name=name, type='BYTE_COLOR', domain='POINT')
+        obj.data.color_attributes.new(name=name, type='BYTE_COLOR', domain=domain)
     return obj.data.color_attributes[name]
 
 
@@ -42,8 +72,108 @@ def redraw_ui(context):
             area.tag_redraw()
 
 
+@contextmanager
+def object_mode(context):
+    """Data vrstev jdou číst a zapisovat jen v Object Mode; Edit Mode se po úpravě obnoví."""
+    was_edit = context.mode == 'EDIT_MESH'
+    if was_edit: bpy.ops.object.mode_set(mode='OBJECT')
+    try:
+        yield
+    finally:
+        if was_edit: bpy.ops.object.mode_set(mode='EDIT')
+
+
+def selected_meshes(context):
+    """Všechny vybrané MESH objekty, jinak aktivní objekt. Každý mesh jen jednou."""
+    objects = [obj for obj in context.selected_objects if obj.type == 'MESH'] or \
+              ([context.object] if context.object and context.object.type == 'MESH' else [])
+    unique = {}
+    for obj in objects:
+        unique.setdefault(obj.data, obj)
+    return list(unique.values())
+
+
+class ChannelReader:
+    """
+    Čte barevné vrstvy meshe celé najednou (foreach_get) a převádí je mezi
+    doménami: POINT -> CORNER přes vertex_index loopů, CORNER -> POINT průměrem
+    rohů každého vrcholu. Každá vrstva v každé doméně se čte jen jednou.
+    """
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self._values = {}
+        self._loop_vertex = None
+
+    @property
+    def loop_vertex(self):
+        if self._loop_vertex is None:
+            self._loop_vertex = np.empty(len(self.mesh.loops), dtype=np.int64)
+            self.mesh.loops.foreach_get('vertex_index', self._loop_vertex)
+        return self._loop_vertex
+
+    def read(self, name, domain):
+        key = (name, domain)
+        if key not in self._values:
+            attr = self.mesh.color_attributes.get(name)
+            if attr is None:
+                raise KeyError(name)
+            values = np.empty((len(attr.data), 4), dtype=np.float32)
+            attr.data.foreach_get('color', values.reshape(-1))
+            self._values[key] = self.convert(values, attr.domain, domain)
+        return self._values[key]
+
+    def convert(self, values, src_domain, dst_domain):
+        if src_domain == dst_domain:
+            return values
+        if src_domain == 'POINT' and dst_domain == 'CORNER':
+            return values[self.loop_vertex]
+        if src_domain == 'CORNER' and dst_domain == 'POINT':
+            vertex_count = len(self.mesh.vertices)
+            counts = np.maximum(np.bincount(self.loop_vertex, minlength=vertex_count), 1)
+            return np.stack([np.bincount(self.loop_vertex, weights=values[:, c], minlength=vertex_count) / counts
+                             for c in range(4)], axis=1).astype(np.float32)
+        raise ValueError(f"Nepodporovaná doména '{src_domain}' -> '{dst_domain}'.")
+
+
+def remap_channels(obj, target_name, sources, domain='SOURCE', reader=None):
+    """
+    Zapíše cílovou vrstvu jedním foreach_set. sources jsou čtyři položky pro
+    R, G, B, A cíle: (jméno vrstvy, kanál 0-3), číslo (konstanta) nebo None
+    (ponechat). Zdrojem může být i samotná cílová vrstva (swizzle na místě).
+    """
+    mesh = obj.data
+    reader = reader or ChannelReader(mesh)
+    layer_sources = [src for src in sources if isinstance(src, tuple)]
+    existing = mesh.color_attributes.get(target_name)
+    if existing is not None:
+        domain = existing.domain
+    elif domain == 'SOURCE':
+        domain = mesh.color_attributes[layer_sources[0][0]].domain if layer_sources else 'POINT'
+    # Zdroje se načtou před vytvořením cíle, nový atribut zneplatní odkazy na ostatní
+    columns = [reader.read(src[0], domain)[:, src[1]] if isinstance(src, tuple) else src for src in sources]
+
+    target = ensure_layer(obj, target_name, domain)
+    result = np.empty((len(target.data), 4), dtype=np.float32)
+    if any(src is None for src in sources):
+        target.data.foreach_get('color', result.reshape(-1))
+    for channel, column in enumerate(columns):
+        if column is not None:
+            result[:, channel] = column
+    target.data.foreach_set('color', result.reshape(-1))
+    mesh.update()
+    return target
+
+
+def channel_source(layer_name, choice):
+    if choice == 'ZERO': return 0.0
+    if choice == 'ONE': return 1.0
+    if choice == 'KEEP': return None
+    return (layer_name, CHANNELS.index(choice))
+
+
 class VERTEXCOLOR_OT_split_active(bpy.types.Operator): # Přejmenováno pro přehlednost
-    """HLAVNÍ ZMĚNA: Tento operátor nyní pracuje pouze s aktivní vrstvou."""
+    """Rozdělí aktivní vrstvu na čtyři vrstvy po kanálech, na všech vybraných objektech."""
     bl_idname = "vertexcolor.split_active" # Změněno ID pro přehlednost
     bl_label = "Rozdělit aktivní vrstvu"
     bl_options = {'REGISTER', 'UNDO'}
@@ -58,65 +188,82 @@ class VERTEXCOLOR_OT_split_active(bpy.types.Operator): # Přejmenováno pro pře
         return False
 
     def execute(self, context):
-        obj = context.object
-        mesh = obj.data
-
-        # Získáme přímo aktivní vrstvu. Díky `poll` víme, že existuje.
-        src_layer = mesh.color_attributes.active_color
-        layer_name = src_layer.name
-
+        # Rozděluje se vrstva stejného jména, jako je aktivní na aktivním objektu
+        layer_name = context.object.data.color_attributes.active_color.name
         self.report({'INFO'}, f"Rozděluji vrstvu: '{layer_name}'...")
 
-        # Zbytek logiky je stejný jako ve vaší původní, funkční verzi
-        for ch in "RGBA":
-            ensure_layer(obj, f"{layer_name}_{ch}")
+        split = 0
+        with object_mode(context):
+            for obj in selected_meshes(context):
+                if layer_name not in obj.data.color_attributes: continue
+                reader = ChannelReader(obj.data)
+                for index, ch in enumerate(CHANNELS):
+                    # Kanál na své místo, ostatní 0 a alfa 1 (alfa vrstva má jen alfu)
+                    sources = [0.0, 0.0, 0.0, 1.0 if ch != 'A' else 0.0]
+                    sources[index] = (layer_name, index)
+                    remap_channels(obj, f"{layer_name}_{ch}", sources, 'SOURCE', reader)
+                split += 1
 
-        for i in range(len(mesh.loops)):
-            color = src_layer.data[i].color
-            mesh.color_attributes[f"{layer_name}_R"].data[i].color = (color[0], 0, 0, 1)
-            mesh.color_attributes[f"{layer_name}_G"].data[i].color = (0, color[1], 0, 1)
-            mesh.color_attributes[f"{layer_name}_B"].data[i].color = (0, 0, color[2], 1)
-            mesh.color_attributes[f"{layer_name}_A"].data[i].color = (0, 0, 0, color[3])
-        
         redraw_ui(context)
-        self.report({'INFO'}, f"Vrstva '{layer_name}' byla úspěšně rozdělena.")
+        self.report({'INFO'}, f"Vrstva '{layer_name}' byla úspěšně rozdělena ({split} objektů).")
         return {'FINISHED'}
 
 
 class VERTEXCOLOR_OT_combine_selected(bpy.types.Operator):
-    """Tento operátor zůstává beze změny, je již robustní."""
+    """Spojí kanály R, G, B, A ze zvolených vrstev do jedné, na všech vybraných objektech."""
     bl_idname = "vertexcolor.combine_selected"
     bl_label = "Spojit vybrané kanály"
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        obj = context.object
-        mesh = obj.data
         props = context.scene.vertexcolor_tool
+        names = (props.combine_r, props.combine_g, props.combine_b, props.combine_a)
+        objects = [obj for obj in selected_meshes(context)
+                   if all(name in obj.data.color_attributes for name in names)]
 
-        layers = {
-            'R': mesh.color_attributes.get(props.combine_r),
-            'G': mesh.color_attributes.get(props.combine_g),
-            'B': mesh.color_attributes.get(props.combine_b),
-            'A': mesh.color_attributes.get(props.combine_a),
-        }
-
-        if not all(layers.values()):
+        if not objects:
             self.report({'ERROR'}, "Chybí některé vrstvy pro spojení")
             return {'CANCELLED'}
 
-        result = ensure_layer(obj, props.combine_name)
+        with object_mode(context):
+            for obj in objects:
+                mesh = obj.data
+                # Doména jako dřív 'POINT', pokud cílová vrstva ještě neexistuje
+                result = remap_channels(obj, props.combine_name, [(name, index) for index, name in enumerate(names)], 'POINT')
+                mesh.color_attributes.active_color_index = list(mesh.color_attributes).index(result)
+        redraw_ui(context)
+        self.report({'INFO'}, f"Vrstvy spojeny do '{props.combine_name}' ({len(objects)} objektů).")
+        return {'FINISHED'}
+
+
+class VERTEXCOLOR_OT_remap_channels(bpy.types.Operator):
+    """Přemapuje kanály aktivní vrstvy do cílové vrstvy (swizzle, kopie kanálu, konstanty), na všech vybraných objektech."""
+    bl_idname = "vertexcolor.remap_channels"
+    bl_label = "Přemapovat kanály"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.type == 'MESH' and obj.data.color_attributes.active_color is not None
 
-        for i in range(len(mesh.loops)):
-            rc = layers['R'].data[i].color[0]
-            gc = layers['G'].data[i].color[1]
-            bc = layers['B'].data[i].color[2]
-            ac = layers['A'].data[i].color[3]
-            result.data[i].color = (rc, gc, bc, ac)
+    def execute(self, context):
+        props = context.scene.vertexcolor_tool
+        layer_name = context.object.data.color_attributes.active_color.name
+        choices = (props.remap_r_channel, props.remap_g_channel, props.remap_b_channel, props.remap_a_channel)
+        sources = [channel_source(layer_name, choice) for choice in choices]
+        if not props.remap_target:
+            self.report({'ERROR'}, "Není zadána cílová vrstva."); return {'CANCELLED'}
+
+        remapped = 0
+        with object_mode(context):
+            for obj in selected_meshes(context):
+                if layer_name not in obj.data.color_attributes: continue
+                remap_channels(obj, props.remap_target, sources, props.remap_domain)
+                remapped += 1
 
-        mesh.color_attributes.active_color_index = list(mesh.color_attributes).index(result)
         redraw_ui(context)
-        self.report({'INFO'}, f"Vrstvy spojeny do '{props.combine_name}'.")
+        self.report({'INFO'}, f"Kanály '{layer_name}' přemapovány do '{props.remap_target}' ({remapped} objektů).")
         return {'FINISHED'}
 
 
@@ -170,12 +317,27 @@ class VERTEXCOLOR_PT_main_panel(bpy.types.Panel):
         else:
             box.label(text="Objekt nemá žádné vrstvy.", icon='INFO')
 
+        box = layout.box()
+        box.label(text="Přemapování kanálů aktivní vrstvy:")
+        if active_layer:
+            row = box.row(align=True)
+            row.prop(props, "remap_r_channel", text="R")
+            row.prop(props, "remap_g_channel", text="G")
+            row.prop(props, "remap_b_channel", text="B")
+            row.prop(props, "remap_a_channel", text="A")
+            box.prop(props, "remap_target")
+            box.prop(props, "remap_domain")
+            box.operator("vertexcolor.remap_channels")
+        else:
+            box.label(text="Vyberte aktivní vrstvu v 'Object Data'", icon='INFO')
+
 
 # Registrace nyní obsahuje nový operátor
 classes = (
     VERTEXCOLOR_Props,
     VERTEXCOLOR_OT_split_active, # Používáme nový operátor
     VERTEXCOLOR_OT_combine_selected,
+    VERTEXCOLOR_OT_remap_channels,
     VERTEXCOLOR_PT_main_panel,
 )
 
@@ -0,0 +1,801 @@
+# ================================================
+# FILE: vmdl_archive.py
+# ================================================
+"""
+Práce s .vmdl archivy bez závislosti na bpy.
+
+Archiv je obyčejný ZIP se členy 'model.glb', 'metadata.json' a 'tex/*'.
+Modul lze používat uvnitř Blenderu i samostatně (nástroje, CI).
+"""
+import hashlib
+import io
+import json
+import lzma
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+
+GLB_NAME = "model.glb"
+METADATA_NAME = "metadata.json"
+MANIFEST_NAME = "manifest.json"
+TEXTURE_DIR = "tex/"
+MANIFEST_VERSION = 1
+
+# Zarovnání dat nekomprimovaných členů pro mmap (velikost stránky)
+PAGE_ALIGNMENT = 4096
+# Extra pole lokální hlavičky s výplní pro zarovnání (stejné ID jako Android zipalign):
+# ID, délka, zarovnání (uint16) a nulová výplň
+ALIGNMENT_EXTRA_ID = 0xD935
+ALIGNMENT_EXTRA = struct.Struct('<HHH')
+
+# Jména metod komprese v manifestu
+COMPRESSION_NAMES = {
+    zipfile.ZIP_STORED: "STORED",
+    zipfile.ZIP_DEFLATED: "DEFLATED",
+    zipfile.ZIP_BZIP2: "BZIP2",
+    zipfile.ZIP_LZMA: "LZMA",
+}
+
+# GLB kontejner: hlavička (magic, verze, délka) a hlavičky chunků (délka, typ)
+GLB_MAGIC = b"glTF"
+GLB_HEADER = struct.Struct('<4sII')
+GLB_CHUNK_HEADER = struct.Struct('<II')
+GLB_CHUNK_JSON = 0x4E4F534A
+GLB_CHUNK_BIN = 0x004E4942
+
+# Bit 1 obecných příznaků: LZMA data končí značkou konce proudu
+LZMA_EOS_FLAG = 0x02
+
+# Velikost bloku při kopírování dat do archivu
+COPY_CHUNK_SIZE = 1024 * 1024
+# Komprimovaná data připravená ve vlákně se drží v paměti až do této velikosti
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+
+# Formáty, které jsou už komprimované; DEFLATE/LZMA by jen pálily CPU
+PRECOMPRESSED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".ktx2", ".basis"}
+
+
+def referenced_textures(vmdl_metadata):
+    """Vrátí odkazy na textury (hash obsahu nebo u starších archivů jméno souboru) použité materiály."""
+    return {
+        texture_ref
+        for mat_data in vmdl_metadata.get('materials', {}).values()
+        for texture_ref in mat_data.get('textures', {}).values()
+        if texture_ref
+    }
+
+
+def texture_member_name(texture_table, texture_ref):
+    """Člen archivu pro odkaz na texturu z materiálu (hash obsahu, u starších archivů jméno souboru)."""
+    entry = (texture_table or {}).get(texture_ref)
+    return entry['file'] if entry else TEXTURE_DIR + texture_ref
+
+
+def read_manifest_document(zf):
+    """Celý 'manifest.json' otevřeného ZipFile; archivy bez manifestu vrací {}."""
+    try:
+        return json.loads(zf.read(MANIFEST_NAME).decode('utf-8'))
+    except KeyError:
+        return {}
+
+
+def read_manifest(zf):
+    """Záznamy členů z 'manifest.json' otevřeného ZipFile; archivy bez manifestu vrací {}."""
+    return read_manifest_document(zf).get('members', {})
+
+
+def check_manifest(manifest, infolist):
+    """
+    Porovná manifest s centrálním adresářem ZIPu (velikosti, CRC, metoda),
+    bez dekomprese dat. Vrací seznam nesrovnalostí.
+    """
+    problems = []
+    entries = manifest
+    infos = {zinfo.filename: zinfo for zinfo in infolist if zinfo.filename != MANIFEST_NAME}
+    for name in sorted(set(infos) - set(entries)):
+        problems.append(f"Člen '{name}' chybí v manifestu.")
+    for name, entry in sorted(entries.items()):
+        zinfo = infos.get(name)
+        if zinfo is None:
+            problems.append(f"Člen '{name}' z manifestu v archivu chybí.")
+        elif (zinfo.file_size, zinfo.CRC, COMPRESSION_NAMES.get(zinfo.compress_type)) != \
+                (entry.get('size'), entry.get('crc'), entry.get('method')):
+            problems.append(f"Člen '{name}' neodpovídá manifestu (velikost, CRC nebo komprese).")
+    return problems
+
+
+def verify_archive(path):
+    """
+    Zkontroluje strukturu archivu, CRC všech členů a odkazy materiálů na textury.
+    Vrací seznam nalezených problémů (prázdný seznam = archiv je v pořádku).
+    """
+    problems = []
+    try:
+        with zipfile.ZipFile(path) as zf:
+            bad_member = zf.testzip()
+            if bad_member:
+                problems.append(f"Člen '{bad_member}' je poškozený (nesedí CRC).")
+            names = set(zf.namelist())
+            if GLB_NAME not in names:
+                problems.append(f"Chybí '{GLB_NAME}'.")
+            if METADATA_NAME not in names:
+                problems.append(f"Chybí '{METADATA_NAME}'.")
+                return problems
+            metadata = json.loads(zf.read(METADATA_NAME).decode('utf-8'))
+    except (OSError, zipfile.BadZipFile, ValueError) as e:
+        return problems + [f"Archiv nelze přečíst: {e}"]
+
+    if MANIFEST_NAME in names:
+        try:
+            with zipfile.ZipFile(path) as zf:
+                problems.extend(check_manifest(read_manifest(zf), zf.infolist()))
+            with VmdlArchive(path) as archive:
+                problems.extend(archive.verify_mapped())
+        except (OSError, zipfile.BadZipFile, ValueError) as e:
+            problems.append(f"Manifest nelze přečíst: {e}")
+
+    texture_table = metadata.get('textures', {})
+    for mat_name, mat_data in metadata.get('materials', {}).items():
+        for slot_name, texture_ref in mat_data.get('textures', {}).items():
+            if texture_ref and texture_member_name(texture_table, texture_ref) not in names:
+                problems.append(f"Materiál '{mat_name}': textura '{slot_name}' odkazuje na chybějící člen "
+                                f"'{texture_member_name(texture_table, texture_ref)}'.")
+    return problems
+
+
+class CompressionPolicy:
+    """
+    Volba komprese pro jednotlivé členy archivu. Už komprimované formáty
+    (PNG, JPG...) se mohou ukládat jako ZIP_STORED, zbytek (JSON, GLB, TGA...)
+    se komprimuje zvolenou metodou a úrovní. S alignment začínají data
+    nekomprimovaných členů na násobku alignment bajtů od začátku souboru.
+    """
+
+    def __init__(self, method=zipfile.ZIP_DEFLATED, level=None, store_precompressed=True, alignment=None):
+        self.method = method
+        self.level = level
+        self.store_precompressed = store_precompressed
+        self.alignment = alignment
+
+    def for_extension(self, ext):
+        if self.store_precompressed and ext.lower() in PRECOMPRESSED_EXTENSIONS:
+            return zipfile.ZIP_STORED, None
+        return self.method, self.level
+
+    def for_member(self, name):
+        return self.for_extension(os.path.splitext(name)[1])
+
+
+COMPRESSION_PRESETS = {
+    # Původní chování: vše DEFLATE s výchozí úrovní
+    'LEGACY': CompressionPolicy(zipfile.ZIP_DEFLATED, None, store_precompressed=False),
+    'BALANCED': CompressionPolicy(zipfile.ZIP_DEFLATED, 6),
+    'SMALLEST': CompressionPolicy(zipfile.ZIP_LZMA, 9),
+    'FASTEST_LOAD': CompressionPolicy(zipfile.ZIP_STORED, None),
+    # Textury i GLB lze mapovat přímo z archivu (mmap) bez rozbalování
+    'MMAP': CompressionPolicy(zipfile.ZIP_STORED, None, alignment=PAGE_ALIGNMENT),
+}
+
+
+def archive_policy(zf, preferred=None):
+    """
+    CompressionPolicy, se kterou se dá do archivu (otevřený ZipFile) dopsat bez změny
+    jeho rozložení: metoda podle 'metadata.json', zarovnání podle manifestu. Úroveň
+    se převezme z preferred, pokud používá stejnou metodu (ZIP ji neukládá).
+    """
+    compress_type = zf.getinfo(METADATA_NAME).compress_type
+    level = None
+    if preferred is not None and preferred.for_member(METADATA_NAME)[0] == compress_type:
+        level = preferred.for_member(METADATA_NAME)[1]
+    return CompressionPolicy(compress_type, level, alignment=read_manifest_document(zf).get('alignment'))
+
+
+class _LZMACompressor:
+    """Jako zipfile.LZMACompressor, ale s volitelným presetem (úrovní) komprese."""
+
+    def __init__(self, preset=None):
+        self._preset = lzma.PRESET_DEFAULT if preset is None else preset
+        self._comp = None
+
+    def _init(self):
+        props = lzma._encode_filter_properties({'id': lzma.FILTER_LZMA1, 'preset': self._preset})
+        self._comp = lzma.LZMACompressor(lzma.FORMAT_RAW, filters=[
+            lzma._decode_filter_properties(lzma.FILTER_LZMA1, props)
+        ])
+        return struct.pack('<BBH', 9, 4, len(props)) + props
+
+    def compress(self, data):
+        if self._comp is None:
+            return self._init() + self._comp.compress(data)
+        return self._comp.compress(data)
+
+    def flush(self):
+        if self._comp is None:
+            return self._init() + self._comp.flush()
+        return self._comp.flush()
+
+
+def _make_compressor(compress_type, level):
+    if compress_type == zipfile.ZIP_STORED:
+        return None
+    if compress_type == zipfile.ZIP_LZMA:
+        return _LZMACompressor(level)
+    return zipfile._get_compressor(compress_type, level)
+
+
+def member_data_offset(fp, zinfo):
+    """Absolutní pozice dat členu v souboru archivu (za lokální hlavičkou)."""
+    fp.seek(zinfo.header_offset)
+    header = fp.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Poškozená lokální hlavička členu '{zinfo.filename}'.")
+    fields = struct.unpack(zipfile.structFileHeader, header)
+    return zinfo.header_offset + zipfile.sizeFileHeader + fields[zipfile._FH_FILENAME_LENGTH] + fields[zipfile._FH_EXTRA_FIELD_LENGTH]
+
+
+def content_hasher():
+    """Hash obsahu, pod kterým se v archivu ukládají textury (tex/<hash>.<přípona>)."""
+    return hashlib.blake2b(digest_size=16)
+
+
+class PreparedMember:
+    """
+    Člen archivu připravený mimo hlavní vlákno: CRC, velikosti a komprimovaná data.
+    U ZIP_STORED se data nekopírují, při zápisu se čtou znovu ze zdroje.
+    """
+
+    def __init__(self, name, compress_type):
+        self.name = name
+        self.compress_type = compress_type
+        self.crc = 0
+        self.file_size = 0
+        self.compress_size = 0
+        self.digest = None
+        self.elapsed = 0.0
+        self.source = None
+        self.payload = None
+        # Další údaje pro manifest zjištěné při přípravě (např. rozměry obrázku)
+        self.info = {}
+
+    def open_payload(self):
+        """Vrátí proud s (komprimovanými) daty přesně tak, jak půjdou do archivu."""
+        if self.payload is not None:
+            self.payload.seek(0)
+            return self.payload
+        if isinstance(self.source, (bytes, bytearray, memoryview)):
+            return io.BytesIO(self.source)
+        return open(self.source, 'rb')
+
+    def release(self):
+        if self.payload is not None:
+            self.payload.close()
+            self.payload = None
+
+    def describe(self):
+        """Popis členu bez dat (pro uložení do cache)."""
+        return {
+            'name': self.name,
+            'compress_type': self.compress_type,
+            'crc': self.crc,
+            'file_size': self.file_size,
+            'compress_size': self.compress_size,
+            'digest': self.digest,
+            'info': self.info,
+        }
+
+    @property
+    def file_backed(self):
+        """Nekomprimovaný člen, jehož data se při zápisu čtou přímo ze zdrojového souboru."""
+        return self.compress_type == zipfile.ZIP_STORED and self.payload is None and isinstance(self.source, str)
+
+    @classmethod
+    def from_description(cls, info, payload_path=None, source=None):
+        """
+        Obnoví člen z describe() a souboru s daty uloženého přes save_payload(),
+        nebo u file_backed členu ze zdrojového souboru source.
+        """
+        member = cls(info['name'], info['compress_type'])
+        member.crc = info['crc']
+        member.file_size = info['file_size']
+        member.compress_size = info['compress_size']
+        member.digest = info['digest']
+        member.info = info.get('info', {})
+        if payload_path is not None:
+            member.payload = open(payload_path, 'rb')
+        else:
+            member.source = source
+        return member
+
+    def save_payload(self, path):
+        """Uloží data členu (už komprimovaná) do souboru, zápis je atomický."""
+        src = self.open_payload()
+        try:
+            with open(path + ".part", 'wb') as dst:
+                shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+            os.replace(path + ".part", path)
+        finally:
+            if src is not self.payload:
+                src.close()
+
+
+def file_stamp(path):
+    """Velikost a čas změny souboru; podle nich se pozná, že se zdroj file_backed členu nezměnil."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _iter_source(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for offset in range(0, len(view), COPY_CHUNK_SIZE):
+            yield view[offset:offset + COPY_CHUNK_SIZE]
+        return
+    with open(source, 'rb') as f:
+        while True:
+            chunk = f.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def prepare_member(name, source, compress_type=zipfile.ZIP_DEFLATED, compresslevel=None):
+    """
+    Spočítá CRC, hash obsahu a zkomprimuje zdroj (cesta k souboru nebo bytes)
+    pro pozdější VmdlArchiveWriter.write_prepared(). Nesahá na bpy ani na ZipFile,
+    takže může běžet ve vlákně; zlib, lzma i hashlib během výpočtu uvolňují GIL.
+    Jméno členu může být None a doplnit se až podle member.digest.
+    """
+    start = time.perf_counter()
+    member = PreparedMember(name, compress_type)
+    member.source = source
+    compressor = _make_compressor(compress_type, compresslevel)
+    if compressor:
+        member.payload = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    hasher = content_hasher()
+    crc = 0
+    size = 0
+    for chunk in _iter_source(source):
+        crc = zlib.crc32(chunk, crc)
+        hasher.update(chunk)
+        size += len(chunk)
+        if compressor:
+            member.payload.write(compressor.compress(chunk))
+    if compressor:
+        member.payload.write(compressor.flush())
+        member.compress_size = member.payload.tell()
+    else:
+        member.compress_size = size
+    member.crc = crc
+    member.digest = hasher.hexdigest()
+    member.file_size = size
+    member.elapsed = time.perf_counter() - start
+    return member
+
+
+class _LimitedReader:
+    """Čte z proudu nejvýše zadaný počet bajtů."""
+
+    def __init__(self, fp, size):
+        self._fp = fp
+        self._remaining = size
+
+    def read(self, n=-1):
+        if n < 0 or n > self._remaining:
+            n = self._remaining
+        data = self._fp.read(n)
+        self._remaining -= len(data)
+        return data
+
+
+class VmdlArchiveWriter:
+    """
+    Streamovaný zápis .vmdl archivu. Data se komprimují a zapisují rovnou
+    do ZIPu, bez mezikopie do dočasného adresáře. Metodu a úroveň komprese
+    pro každý člen určuje CompressionPolicy.
+
+    Archiv vzniká nejdřív jako '<cesta>.part' a na cílové místo se přesune
+    až po úspěšném dokončení, takže nepovedený export nepoškodí starý soubor.
+    """
+
+    def __init__(self, path, policy=None):
+        self.path = path
+        self.policy = policy or COMPRESSION_PRESETS['BALANCED']
+        self._part_path = path + ".part"
+        self._zf = zipfile.ZipFile(self._part_path, 'w')
+        # Záznamy manifestu pro všechny zapsané členy (viz write_manifest)
+        self.manifest = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write_json(self, name, data):
+        """Serializuje JSON přímo do členu archivu."""
+        self.write_bytes(name, json.dumps(data, ensure_ascii=False, indent=4).encode('utf-8'))
+
+    def write_bytes(self, name, data):
+        """Zapíše data z paměti (např. zabalený obrázek z .blend)."""
+        self._write_stream(name, data, len(data))
+
+    def write_file(self, name, src_path):
+        """Zkopíruje soubor z disku do archivu po blocích."""
+        self._write_stream(name, src_path, os.path.getsize(src_path))
+
+    def _write_stream(self, name, source, size_hint):
+        # Lokální hlavička se zapíše předem a po zápisu dat se přepíše
+        # skutečným CRC a velikostmi (stejně jako ZipFile.open(name, 'w')).
+        compress_type, level = self.policy.for_member(name)
+        compressor = _make_compressor(compress_type, level)
+        zinfo = self._new_zinfo(name, compress_type)
+        zf = self._zf
+        self._begin_member(zinfo)
+        zip64 = size_hint * 1.05 > zipfile.ZIP64_LIMIT
+        padding = self._alignment_padding(zinfo, zip64)
+        zf.fp.write(self._local_header(zinfo, zip64, padding))
+        data_start = zf.fp.tell()
+        crc = 0
+        size = 0
+        hasher = content_hasher()
+        for chunk in _iter_source(source):
+            crc = zlib.crc32(chunk, crc)
+            hasher.update(chunk)
+            size += len(chunk)
+            zf.fp.write(compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            zf.fp.write(compressor.flush())
+        end = zf.fp.tell()
+        zinfo.CRC = crc
+        zinfo.file_size = size
+        zinfo.compress_size = end - data_start
+        zf.fp.seek(zinfo.header_offset)
+        zf.fp.write(self._local_header(zinfo, zip64, padding))
+        zf.fp.seek(end)
+        self._end_member(zinfo, hasher.hexdigest(), data_start)
+
+    def write_prepared(self, member):
+        """
+        Zapíše člen připravený funkcí prepare_member(). Data se už znovu
+        nekomprimují, jen se přepíší za lokální hlavičku.
+        """
+        zinfo = self._new_zinfo(member.name, member.compress_type)
+        zinfo.CRC = member.crc
+        zinfo.file_size = member.file_size
+        zinfo.compress_size = member.compress_size
+        src = member.open_payload()
+        try:
+            self._append_raw(zinfo, src, member.digest)
+        finally:
+            if src is not member.payload:
+                src.close()
+            member.release()
+
+    def copy_members_raw(self, src_path, skip=()):
+        """
+        Zkopíruje členy jiného archivu bez dekomprese a nové komprese
+        (kromě jmen ve skip a starého manifestu, jehož záznamy se převezmou).
+        Vrací počet zkopírovaných členů.
+        """
+        copied = 0
+        with zipfile.ZipFile(src_path, 'r') as src_zf, open(src_path, 'rb') as fp:
+            src_manifest = read_manifest(src_zf)
+            for src_info in src_zf.infolist():
+                if src_info.filename in skip or src_info.filename == MANIFEST_NAME:
+                    continue
+                zinfo = zipfile.ZipInfo(src_info.filename, date_time=src_info.date_time)
+                zinfo.compress_type = src_info.compress_type
+                zinfo.external_attr = src_info.external_attr
+                zinfo.CRC = src_info.CRC
+                zinfo.file_size = src_info.file_size
+                zinfo.compress_size = src_info.compress_size
+                fp.seek(member_data_offset(fp, src_info))
+                src_entry = src_manifest.get(src_info.filename, {})
+                self._append_raw(zinfo, _LimitedReader(fp, src_info.compress_size), src_entry.get('hash'))
+                if 'image' in src_entry:
+                    self.annotate(src_info.filename, image=src_entry['image'])
+                copied += 1
+        return copied
+
+    def _append_raw(self, zinfo, src, digest):
+        # Ekvivalent ZipFile._open_to_write + _ZipWriteFile.close pro data,
+        # jejichž CRC a velikosti známe předem.
+        self._begin_member(zinfo)
+        zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+        self._zf.fp.write(self._local_header(zinfo, zip64, self._alignment_padding(zinfo, zip64)))
+        data_start = self._zf.fp.tell()
+        shutil.copyfileobj(src, self._zf.fp, COPY_CHUNK_SIZE)
+        self._end_member(zinfo, digest, data_start)
+
+    def _alignment_padding(self, zinfo, zip64):
+        """Extra pole s výplní, po kterém data členu začnou na zarovnané pozici (jinak b"")."""
+        alignment = self.policy.alignment
+        if not alignment or zinfo.compress_type != zipfile.ZIP_STORED:
+            return b""
+        data_start = zinfo.header_offset + len(zinfo.FileHeader(zip64)) + ALIGNMENT_EXTRA.size
+        padding = -data_start % alignment
+        return ALIGNMENT_EXTRA.pack(ALIGNMENT_EXTRA_ID, 2 + padding, alignment) + bytes(padding)
+
+    @staticmethod
+    def _local_header(zinfo, zip64, padding):
+        # Výplň patří jen do lokální hlavičky; centrální adresář se zapisuje
+        # ze zinfo.extra až při close() a zůstane bez ní.
+        if not padding:
+            return zinfo.FileHeader(zip64)
+        extra = zinfo.extra
+        zinfo.extra = extra + padding
+        try:
+            return zinfo.FileHeader(zip64)
+        finally:
+            zinfo.extra = extra
+
+    @staticmethod
+    def _new_zinfo(name, compress_type):
+        zinfo = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+        zinfo.compress_type = compress_type
+        zinfo.external_attr = 0o644 << 16
+        zinfo.CRC = 0
+        zinfo.compress_size = 0
+        return zinfo
+
+    def _begin_member(self, zinfo):
+        zf = self._zf
+        if zf._writing:
+            raise ValueError("Do archivu se právě zapisuje jiný člen.")
+        zf._writecheck(zinfo)
+        if zinfo.compress_type == zipfile.ZIP_LZMA:
+            # Proud LZMA končí značkou konce (EOS), ZIP to hlásí bitem 1 (jako zipfile)
+            zinfo.flag_bits |= LZMA_EOS_FLAG
+        zf._didModify = True
+        zinfo.header_offset = zf.fp.tell()
+
+    def _end_member(self, zinfo, digest, data_offset):
+        zf = self._zf
+        zf.filelist.append(zinfo)
+        zf.NameToInfo[zinfo.filename] = zinfo
+        zf.start_dir = zf.fp.tell()
+        if zinfo.filename != MANIFEST_NAME:
+            self.manifest[zinfo.filename] = {
+                'size': zinfo.file_size,
+                'compressed_size': zinfo.compress_size,
+                'method': COMPRESSION_NAMES.get(zinfo.compress_type),
+                'crc': zinfo.CRC,
+                'hash': digest,
+                # Absolutní pozice dat v souboru archivu (náhodný přístup bez lokální hlavičky)
+                'offset': data_offset,
+            }
+
+    def annotate(self, name, **info):
+        """Doplní k záznamu manifestu další údaje (např. image={'width': ..., ...})."""
+        self.manifest[name].update(info)
+
+    def write_manifest(self):
+        """
+        Zapíše 'manifest.json' se záznamem každého dosud zapsaného členu:
+        nekomprimovaná velikost, metoda komprese, CRC, hash obsahu a pozice dat
+        v souboru (u textur i rozměry a formát zdrojového obrázku). Volá se jako
+        poslední zápis.
+        """
+        manifest = {'manifest_version': MANIFEST_VERSION, 'members': self.manifest}
+        if self.policy.alignment:
+            manifest['alignment'] = self.policy.alignment
+        self.write_json(MANIFEST_NAME, manifest)
+
+    def close(self):
+        if self._zf is None:
+            return
+        self._zf.close()
+        self._zf = None
+        os.replace(self._part_path, self.path)
+
+    def abort(self):
+        """Zahodí rozepsaný archiv."""
+        if self._zf is None:
+            return
+        try:
+            self._zf.close()
+        finally:
+            self._zf = None
+            if os.path.exists(self._part_path):
+                os.remove(self._part_path)
+
+
+class VmdlArchive:
+    """
+    Čtení .vmdl archivu bez bpy. Nic se nenačítá předem: metadata se parsují
+    při prvním přístupu, z GLB se čte jen hlavička a JSON chunk (binární buffery
+    zůstanou nedotčené) a textury jsou dostupné jako proudy nebo, u nekomprimovaných
+    členů, jako paměťově mapované pohledy bez kopírování.
+
+        with VmdlArchive("auto.vmdl") as archive:
+            print(archive.metadata['materials'].keys(), len(archive.gltf['meshes']))
+            with archive.open_texture(texture_ref) as f: ...
+
+    Pohledy z member_view() je potřeba uvolnit (view.release()) před close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._zf = zipfile.ZipFile(path)
+        self._metadata = None
+        self._manifest = None
+        self._gltf = None
+        self._glb_layout = None
+        self._file = None
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Někdo ještě drží pohled; mapování se uvolní s posledním z nich
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._zf is not None:
+            self._zf.close()
+            self._zf = None
+
+    # --- Členy archivu ---
+
+    def infolist(self):
+        return self._zf.infolist()
+
+    def info(self, name):
+        """ZipInfo členu, nebo None, pokud v archivu není."""
+        try:
+            return self._zf.getinfo(name)
+        except KeyError:
+            return None
+
+    def open_member(self, name):
+        """Proud s rozbalenými daty členu; čte se po částech, nic se nenačítá celé."""
+        return self._zf.open(name)
+
+    def read_member(self, name):
+        return self._zf.read(name)
+
+    def member_view(self, name):
+        """
+        memoryview na data nekomprimovaného (ZIP_STORED) členu přímo v mmap
+        souboru archivu, bez kopírování. Pro komprimované členy vrací None.
+        """
+        zinfo = self._zf.getinfo(name)
+        if zinfo.compress_type != zipfile.ZIP_STORED:
+            return None
+        if self._mmap is None:
+            self._file = open(self.path, 'rb')
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        offset = member_data_offset(self._file, zinfo)
+        return memoryview(self._mmap)[offset:offset + zinfo.file_size]
+
+    def verify_mapped(self):
+        """
+        Ověří přístup bez kopírování: u každého nekomprimovaného členu z manifestu
+        porovná pozici dat s manifestem a zarovnáním a hash dat čtených přímo
+        z mmap pohledu. Pokud manifest uvádí zarovnání, je chybou i komprimovaný
+        člen (nedá se mapovat). Vrací seznam nesrovnalostí.
+        """
+        problems = []
+        alignment = self.alignment
+        for name, entry in sorted(self.manifest.items()):
+            zinfo = self.info(name)
+            if zinfo is None:
+                continue
+            if zinfo.compress_type != zipfile.ZIP_STORED:
+                if alignment:
+                    problems.append(f"Člen '{name}' je komprimovaný ({COMPRESSION_NAMES.get(zinfo.compress_type)}), "
+                                    f"v archivu zarovnaném pro mmap se nedá mapovat.")
+                continue
+            view = self.member_view(name)
+            try:
+                offset = member_data_offset(self._file, zinfo)
+                if entry.get('offset') is not None and entry['offset'] != offset:
+                    problems.append(f"Člen '{name}': data jsou na pozici {offset}, manifest uvádí {entry['offset']}.")
+                if alignment and offset % alignment:
+                    problems.append(f"Člen '{name}': data na pozici {offset} nejsou zarovnaná na {alignment} B.")
+                if entry.get('hash'):
+                    hasher = content_hasher()
+                    hasher.update(view)
+                    if hasher.hexdigest() != entry['hash']:
+                        problems.append(f"Člen '{name}': hash dat v mmap neodpovídá manifestu.")
+            finally:
+                view.release()
+        return problems
+
+    # --- Metadata a textury ---
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            self._metadata = json.loads(self._zf.read(METADATA_NAME).decode('utf-8'))
+        return self._metadata
+
+    @property
+    def manifest(self):
+        """Záznamy členů z 'manifest.json' ({jméno: záznam}); starší archivy bez manifestu vrací {}."""
+        if self._manifest is None:
+            self._manifest = read_manifest_document(self._zf)
+        return self._manifest.get('members', {})
+
+    @property
+    def alignment(self):
+        """Zarovnání dat nekomprimovaných členů podle manifestu, nebo None."""
+        self.manifest
+        return self._manifest.get('alignment')
+
+    def manifest_entry(self, name):
+        return self.manifest.get(name)
+
+    @property
+    def texture_table(self):
+        return self.metadata.get('textures', {})
+
+    def texture_refs(self):
+        return referenced_textures(self.metadata)
+
+    def texture_member(self, texture_ref):
+        return texture_member_name(self.texture_table, texture_ref)
+
+    def texture_info(self, texture_ref):
+        return self.info(self.texture_member(texture_ref))
+
+    def open_texture(self, texture_ref):
+        return self.open_member(self.texture_member(texture_ref))
+
+    def texture_view(self, texture_ref):
+        return self.member_view(self.texture_member(texture_ref))
+
+    # --- GLB ---
+
+    def _read_glb_json(self):
+        with self._zf.open(GLB_NAME) as f:
+            magic, version, length = GLB_HEADER.unpack(f.read(GLB_HEADER.size))
+            if magic != GLB_MAGIC:
+                raise ValueError(f"'{GLB_NAME}' není GLB soubor.")
+            chunk_length, chunk_type = GLB_CHUNK_HEADER.unpack(f.read(GLB_CHUNK_HEADER.size))
+            if chunk_type != GLB_CHUNK_JSON:
+                raise ValueError(f"První chunk '{GLB_NAME}' není JSON.")
+            self._gltf = json.loads(f.read(chunk_length).decode('utf-8'))
+        json_end = GLB_HEADER.size + GLB_CHUNK_HEADER.size + chunk_length
+        self._glb_layout = {
+            'version': version,
+            'length': length,
+            'json_length': chunk_length,
+            # BIN chunk (pokud existuje) začíná hned za JSON chunkem
+            'bin_offset': json_end + GLB_CHUNK_HEADER.size if json_end < length else None,
+            'bin_length': length - json_end - GLB_CHUNK_HEADER.size if json_end < length else 0,
+        }
+
+    @property
+    def gltf(self):
+        """JSON část GLB (scény, meshe, accessory...), bez binárních bufferů."""
+        if self._gltf is None:
+            self._read_glb_json()
+        return self._gltf
+
+    @property
+    def glb_layout(self):
+        """Verze a délka GLB, délka JSON chunku a pozice BIN chunku uvnitř GLB."""
+        if self._glb_layout is None:
+            self._read_glb_json()
+        return self._glb_layout
@@ -0,0 +1,210 @@
+# ================================================
+# FILE: vmdl_cli.py
+# ================================================
+"""
+Příkazová řádka VMDL Tools pro Blender bez UI (build farmy, CI).
+
+Spouští se jako skript Blenderu, argumenty skriptu následují za '--':
+
+    blender -b scena.blend -P vmdl_cli.py -- export --output out/ [--root Auto_VMDL ...] [--selected]
+    blender -b scena.blend -P vmdl_cli.py -- export --output out/Auto.vmdl --root Auto_VMDL [--metadata-only]
+    blender -b scena.blend -P vmdl_cli.py -- validate [--root Auto_VMDL ...]
+    blender -b -P vmdl_cli.py -- validate out/*.vmdl
+    blender -b -P vmdl_cli.py -- inspect out/Auto.vmdl
+
+Volby exportu (--policy, --workers, --no-cache, --cache-dir, --compact-vertex-colors) přepíšou nastavení
+uložené ve scéně. Výsledek se vypíše na stdout jako JSON (Blender tam vypisuje
+i vlastní hlášky), s --json SOUBOR se navíc zapíše do souboru.
+
+Návratové kódy: 0 = vše v pořádku, 1 = některý root/archiv selhal nebo má
+problémy, 2 = chybné argumenty nebo add-on nejde načíst.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+
+import bpy
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def load_addon():
+    """
+    Načte balík add-onu, ve kterém skript leží, a zaregistruje ho, pokud už
+    není zapnutý v nastavení Blenderu. Vrací modul balíku.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    package_name = os.path.basename(package_dir)
+    if package_name not in sys.modules:
+        sys.path.insert(0, os.path.dirname(package_dir))
+    addon = importlib.import_module(package_name)
+    if not hasattr(bpy.types.Scene, 'vmdl_export'):
+        addon.register()
+    return addon
+
+
+def script_args(argv):
+    return argv[argv.index("--") + 1:] if "--" in argv else []
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="blender -b [soubor.blend] -P vmdl_cli.py --",
+                                     description="Export, kontrola a výpis .vmdl archivů bez UI.")
+    parser.add_argument("--json", metavar="SOUBOR", help="zapíše výsledek i do JSON souboru")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="exportuje VMDL rooty z otevřeného .blend souboru")
+    export.add_argument("--output", required=True,
+                        help="adresář (archiv pro každý root), nebo cesta k .vmdl pro jediný root")
+    export.add_argument("--root", action="append", default=[], help="jméno rootu, lze opakovat (výchozí: všechny)")
+    export.add_argument("--selected", action="store_true", help="jen rooty objektů vybraných v uloženém souboru")
+    export.add_argument("--metadata-only", action="store_true", help="přepíše jen metadata.json v existujících archivech")
+    export.add_argument("--policy", choices=['BALANCED', 'SMALLEST', 'FASTEST_LOAD', 'MMAP', 'LEGACY'], help="politika komprese")
+    export.add_argument("--workers", type=int, help="počet vláken pro přípravu textur")
+    export.add_argument("--no-cache", action="store_true", help="nepoužívat build cache")
+    export.add_argument("--cache-dir", help="adresář build cache")
+    export.add_argument("--compact-vertex-colors", action="store_true",
+                        help="Color1/Color2 v doméně vrcholů, kde to jde, a v GLB jako uint8")
+
+    validate = commands.add_parser("validate", help="zkontroluje rooty ve scéně, nebo zadané archivy")
+    validate.add_argument("archives", nargs="*", help=".vmdl archivy; bez nich se kontrolují rooty scény")
+    validate.add_argument("--root", action="append", default=[], help="jméno rootu, lze opakovat (výchozí: všechny)")
+
+    inspect = commands.add_parser("inspect", help="vypíše obsah .vmdl archivů")
+    inspect.add_argument("archives", nargs="+", help=".vmdl archivy")
+    return parser
+
+
+def select_roots(addon, context, names, selected_only=False):
+    """Rooty podle jmen (chybějící jméno je chyba), jinak všechny nebo vybrané."""
+    if not names:
+        return addon.export_vmdl.find_export_roots(context, selected_only), []
+    roots, missing = [], []
+    for name in names:
+        obj = bpy.data.objects.get(name)
+        if obj and obj.vmdl_enum_type == "ROOT":
+            roots.append(obj)
+        else:
+            missing.append(name)
+    return roots, missing
+
+
+def apply_export_settings(settings, args):
+    if args.policy: settings.compression_policy = args.policy
+    if args.workers: settings.texture_workers = args.workers
+    if args.no_cache: settings.use_build_cache = False
+    if args.cache_dir: settings.cache_dir = args.cache_dir
+    if args.compact_vertex_colors: settings.compact_vertex_colors = True
+
+
+def result_from_stats(stats):
+    return {'root': stats['root'], 'ok': True, 'filepath': stats['filepath'],
+            'elapsed': round(stats['elapsed'], 4), 'stats': stats}
+
+
+def run_export(addon, context, args):
+    export_vmdl = addon.export_vmdl
+    roots, missing = select_roots(addon, context, args.root, args.selected)
+    results = [{'root': name, 'ok': False, 'error': "Root neexistuje."} for name in missing]
+    if not roots and not missing:
+        results.append({'root': None, 'ok': False, 'error': "Nelze najít žádný VMDL Root objekt pro export."})
+    apply_export_settings(context.scene.vmdl_export, args)
+
+    output = os.path.abspath(args.output)
+    single_file = output.lower().endswith(".vmdl")
+    if single_file and len(roots) > 1:
+        raise ValueError("Výstup je jeden .vmdl soubor, ale k exportu je více rootů; zadejte adresář.")
+
+    if args.metadata_only or single_file:
+        for root_obj in roots:
+            filepath = output if single_file else os.path.join(output, export_vmdl.root_archive_name(root_obj))
+            try:
+                if single_file: os.makedirs(os.path.dirname(filepath), exist_ok=True)
+                if args.metadata_only:
+                    stats = export_vmdl.update_archive_metadata(context, root_obj, filepath)
+                else:
+                    stats = export_vmdl.export_root(context, root_obj, filepath)
+                results.append(result_from_stats(stats))
+            except Exception as e:
+                results.append({'root': root_obj.name, 'ok': False, 'filepath': filepath, 'error': str(e)})
+    elif roots:
+        for root_name, stats, error in export_vmdl.export_roots(context, roots, output):
+            results.append(result_from_stats(stats) if stats else {'root': root_name, 'ok': False, 'error': error})
+    return results
+
+
+def run_validate(addon, context, args):
+    if args.archives:
+        results = []
+        for path in args.archives:
+            problems = addon.vmdl_archive.verify_archive(path)
+            results.append({'archive': path, 'ok': not problems, 'problems': problems})
+        return results
+
+    roots, missing = select_roots(addon, context, args.root)
+    results = [{'root': name, 'ok': False, 'problems': ["Root neexistuje."]} for name in missing]
+    for root_obj in roots:
+        problems = addon.export_vmdl.validate_root(context, root_obj)
+        results.append({'root': root_obj.name, 'ok': not problems, 'problems': problems})
+    if not results:
+        results.append({'root': None, 'ok': False, 'problems': ["Nelze najít žádný VMDL Root objekt."]})
+    return results
+
+
+def run_inspect(addon, context, args):
+    # Stejný souhrn jako inspector.py, aby se výstupy CLI a inspektoru nerozcházely
+    inspector = importlib.import_module(f"{addon.__name__}.inspector")
+    results = []
+    for path in args.archives:
+        summary = inspector.inspect_path(path)
+        summary['ok'] = 'error' not in summary
+        results.append(summary)
+    return results
+
+
+COMMANDS = {
+    'export': run_export,
+    'validate': run_validate,
+    'inspect': run_inspect,
+}
+
+
+def write_report(report, json_path):
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+def main(argv):
+    try:
+        args = build_parser().parse_args(script_args(argv))
+    except SystemExit as e:
+        return EXIT_USAGE if e.code else EXIT_OK
+
+    report = {'command': args.command, 'blend_file': bpy.data.filepath or None, 'ok': False, 'results': []}
+    try:
+        addon = load_addon()
+    except Exception as e:
+        report['error'] = f"Add-on VMDL Tools nelze načíst: {e}"
+        write_report(report, args.json)
+        return EXIT_USAGE
+
+    try:
+        report['results'] = COMMANDS[args.command](addon, bpy.context, args)
+    except ValueError as e:
+        report['error'] = str(e)
+        write_report(report, args.json)
+        return EXIT_USAGE
+    report['ok'] = all(result['ok'] for result in report['results'])
+    write_report(report, args.json)
+    return EXIT_OK if report['ok'] else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,250 @@
+# ================================================
+# FILE: vmdl_farm.py
+# ================================================
+"""
+Hromadný export .vmdl z mnoha .blend souborů (nepotřebuje Blender, jen Python).
+
+Pro každý .blend soubor spustí Blender bez UI s vmdl_cli.py a najednou jich běží
+nejvýš --jobs. Spadlé procesy (signál, výjimka v Pythonu, chybějící JSON výsledek)
+se zkusí znovu až --retries krát, každý běh má časový limit --timeout. Výsledky
+všech souborů se sloučí do jednoho reportu.
+
+Každý .blend se exportuje do vlastního podadresáře <output>/<jméno>_<hash cesty>/,
+takže stejně pojmenované rooty z různých souborů se navzájem nepřepíšou.
+
+    python vmdl_farm.py "scenes/**/*.blend" --output out/ --jobs 4 --blender /opt/blender/blender \\
+        --timeout 900 --retries 2 --skip mtime --report farm_report.json
+
+Přeskakování (--skip): stav posledního běhu je v <output>/.vmdl_farm_state.json.
+'mtime' přeskočí soubor, jehož všechny dříve exportované archivy existují a jsou
+novější než .blend; 'hash' porovná obsah .blend s hashem z posledního úspěšného
+exportu. Přeskočí se jen archivy exportované se stejnými volbami (--policy,
+--compact-vertex-colors...). Změny externích textur se neporovnávají, na ty je --skip none.
+
+Návratový kód je 0, pokud všechny soubory prošly nebo byly přeskočeny, jinak 1.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+CLI_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vmdl_cli.py")
+STATE_NAME = ".vmdl_farm_state.json"
+# Návratový kód Blenderu při nezachycené výjimce ve skriptu (--python-exit-code)
+PYTHON_ERROR_EXIT = 3
+# Kolik posledních řádků výstupu Blenderu se uloží do reportu u selhání
+LOG_TAIL_LINES = 40
+
+
+def expand_inputs(patterns, list_file=None):
+    paths = []
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        paths.extend(matches if matches else [pattern])
+    if list_file:
+        with open(list_file, 'r', encoding='utf-8') as f:
+            paths.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    unique = {}
+    for path in paths:
+        unique.setdefault(os.path.normcase(os.path.abspath(path)), os.path.abspath(path))
+    return sorted(unique.values())
+
+
+def blend_output_dir(output_dir, blend_path):
+    """Podadresář pro archivy jednoho .blend souboru (jméno a krátký hash celé cesty)."""
+    path_hash = hashlib.blake2b(blend_path.encode('utf-8'), digest_size=4).hexdigest()
+    return os.path.join(output_dir, f"{os.path.splitext(os.path.basename(blend_path))[0]}_{path_hash}")
+
+
+def file_hash(path):
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class FarmState:
+    """Otisky .blend souborů a jejich archivů z posledních úspěšných exportů."""
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, STATE_NAME)
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"VAROVÁNÍ: Stav '{self.path}' nelze načíst, exportuje se vše: {e}")
+
+    def is_up_to_date(self, blend_path, mode, output_dir, options):
+        entry = self.entries.get(blend_path)
+        if mode == 'none' or not entry or not entry.get('archives'):
+            return False
+        # Archivy ze starších běhů mimo podadresář souboru nebo s jinými volbami se neberou
+        if entry.get('output_dir') != output_dir or entry.get('options') != options:
+            return False
+        if not all(os.path.exists(archive) for archive in entry['archives']):
+            return False
+        if mode == 'mtime':
+            blend_mtime = os.stat(blend_path).st_mtime_ns
+            return all(os.stat(archive).st_mtime_ns >= blend_mtime for archive in entry['archives'])
+        return entry.get('hash') == file_hash(blend_path)
+
+    def record(self, blend_path, output_dir, options, archives):
+        entry = {'hash': file_hash(blend_path), 'mtime_ns': os.stat(blend_path).st_mtime_ns,
+                 'output_dir': output_dir, 'options': options, 'archives': archives}
+        with self._lock:
+            self.entries[blend_path] = entry
+
+    def save(self):
+        with self._lock:
+            with open(self.path + ".part", 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(self.path + ".part", self.path)
+
+
+def export_options(args):
+    """Volby exportu předávané vmdl_cli; ukládají se do stavu, změna znamená nový export."""
+    options = []
+    if args.policy: options += ["--policy", args.policy]
+    if args.workers: options += ["--workers", str(args.workers)]
+    if args.no_cache: options.append("--no-cache")
+    if args.cache_dir: options += ["--cache-dir", args.cache_dir]
+    if args.compact_vertex_colors: options.append("--compact-vertex-colors")
+    return options
+
+
+def build_command(args, blend_path, json_path):
+    return [args.blender, "-b", blend_path, "--factory-startup", "--python-exit-code", str(PYTHON_ERROR_EXIT),
+            "-P", CLI_SCRIPT, "--", "--json", json_path, "export",
+            "--output", blend_output_dir(args.output, blend_path)] + export_options(args)
+
+
+def run_once(args, blend_path, json_path):
+    """Jeden běh Blenderu. Vrací (stav, návratový kód, report z vmdl_cli nebo None, výstup)."""
+    if os.path.exists(json_path):
+        os.remove(json_path)
+    try:
+        proc = subprocess.run(build_command(args, blend_path, json_path), stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, timeout=args.timeout or None,
+                              encoding='utf-8', errors='replace')
+    except subprocess.TimeoutExpired as e:
+        output = e.stdout.decode('utf-8', 'replace') if isinstance(e.stdout, bytes) else (e.stdout or "")
+        return 'timeout', None, None, output
+    report = None
+    if os.path.exists(json_path):
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+        except ValueError:
+            report = None
+    if report is None or proc.returncode not in (0, 1, 2):
+        return 'crashed', proc.returncode, report, proc.stdout
+    return ('exported' if proc.returncode == 0 else 'failed'), proc.returncode, report, proc.stdout
+
+
+def run_job(args, state, blend_path, json_dir):
+    result = {'blend': blend_path, 'status': None, 'attempts': 0, 'elapsed': 0.0}
+    if not os.path.exists(blend_path):
+        result.update(status='failed', error="Soubor neexistuje.")
+        return result
+    output_dir = blend_output_dir(args.output, blend_path)
+    options = export_options(args)
+    if state.is_up_to_date(blend_path, args.skip, output_dir, options):
+        result['status'] = 'skipped'
+        result['archives'] = state.entries[blend_path]['archives']
+        return result
+
+    json_path = os.path.join(json_dir, hashlib.blake2b(blend_path.encode('utf-8'), digest_size=8).hexdigest() + ".json")
+    start = time.perf_counter()
+    # Opakuje se jen pád procesu; chybná data (návratový kód 1) a timeout by dopadly stejně
+    while True:
+        result['attempts'] += 1
+        status, returncode, report, output = run_once(args, blend_path, json_path)
+        if status != 'crashed' or result['attempts'] > args.retries:
+            break
+        print(f"VAROVÁNÍ: Blender spadl u '{blend_path}' (kód {returncode}), pokus {result['attempts'] + 1}.")
+    result['elapsed'] = round(time.perf_counter() - start, 3)
+    result.update(status=status, returncode=returncode)
+    if report:
+        result['roots'] = report.get('results', [])
+        if report.get('error'): result['error'] = report['error']
+    if status == 'exported':
+        result['archives'] = [root['filepath'] for root in result['roots'] if root.get('ok')]
+        state.record(blend_path, output_dir, options, result['archives'])
+    else:
+        result['log_tail'] = output.splitlines()[-LOG_TAIL_LINES:]
+    return result
+
+
+def print_summary(results, elapsed):
+    print("\n============== VMDL FARMA ==============")
+    for result in results:
+        roots = result.get('roots', [])
+        failed_roots = [root.get('root') for root in roots if not root.get('ok')]
+        detail = f"rooty {len(roots) - len(failed_roots)}/{len(roots)}" if roots else result.get('error', "")
+        if result['status'] in ('crashed', 'timeout'): detail += f" (kód {result.get('returncode')})"
+        if failed_roots: detail += f", selhaly: {', '.join(str(name) for name in failed_roots)}"
+        print(f"  {result['status']:<9} {result['elapsed']:8.2f} s  x{result['attempts']}  {result['blend']}  {detail}")
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    print(f"  Celkem {len(results)} souborů za {elapsed:.2f} s: " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paralelní export .vmdl z mnoha .blend souborů.")
+    parser.add_argument("inputs", nargs="*", help=".blend soubory nebo glob vzory (i '**')")
+    parser.add_argument("--list", help="soubor se seznamem .blend souborů, jeden na řádek")
+    parser.add_argument("--output", required=True, help="adresář pro .vmdl archivy")
+    parser.add_argument("--blender", default=os.environ.get("VMDL_BLENDER", "blender"), help="cesta k Blenderu")
+    parser.add_argument("--jobs", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="počet souběžných Blenderů")
+    parser.add_argument("--timeout", type=float, default=1800, help="limit na jeden běh v sekundách (0 = bez limitu)")
+    parser.add_argument("--retries", type=int, default=1, help="kolikrát zopakovat spadlý běh")
+    parser.add_argument("--skip", choices=['mtime', 'hash', 'none'], default='mtime', help="jak poznat aktuální archivy")
+    parser.add_argument("--report", help="JSON report se všemi výsledky")
+    parser.add_argument("--policy", choices=['BALANCED', 'SMALLEST', 'FASTEST_LOAD', 'MMAP', 'LEGACY'])
+    parser.add_argument("--workers", type=int, help="vlákna pro textury v každém Blenderu")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--cache-dir")
+    parser.add_argument("--compact-vertex-colors", action="store_true")
+    args = parser.parse_args(argv)
+    args.output = os.path.abspath(args.output)
+
+    blend_files = expand_inputs(args.inputs, args.list)
+    if not blend_files:
+        parser.error("Nejsou zadané žádné .blend soubory.")
+    os.makedirs(args.output, exist_ok=True)
+    state = FarmState(args.output)
+
+    start = time.perf_counter()
+    results = []
+    with tempfile.TemporaryDirectory(prefix="vmdl_farm_") as json_dir, \
+            ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(run_job, args, state, path, json_dir) for path in blend_files]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"[{len(results)}/{len(blend_files)}] {result['status']}: {result['blend']}")
+    state.save()
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda r: r['blend'])
+    print_summary(results, elapsed)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'elapsed': round(elapsed, 3), 'jobs': args.jobs, 'results': results}, f, indent=2, ensure_ascii=False)
+    return 0 if all(r['status'] in ('exported', 'skipped') for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
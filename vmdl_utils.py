@@ -1,5 +1,24 @@
 import bpy
 
+
+def root_of(obj):
+    """Nejbližší ROOT objektu (včetně něj samotného), jinak None."""
+    node = obj
+    while node:
+        if node.vmdl_enum_type == "ROOT": return node
+        node = node.parent
+    return None
+
+
+def find_export_root(context):
+    """Root aktivního objektu (nebo jeho předka), jinak první ROOT ve scéně."""
+    root = root_of(context.active_object)
+    if root: return root
+    for obj in context.scene.objects:
+        if obj.vmdl_enum_type == "ROOT": return obj
+    return None
+
+
 class VMDL_OT_create_vmdl_object(bpy.types.Operator):
     bl_idname = "vmdl.create_vmdl_object"
     bl_label = "Create VMDL Object"